@@ -781,7 +781,8 @@ def main():
     # allow the camera to warmup
     time.sleep(0.1)
     
-    # Setup 3D Printer
+    # Setup 3D Printer (opens the serial port)
+    printer.connect()
     csv_filename = "testing/file2.csv"
     path_list = printer.get_path_list_csv(csv_filename)
     printer.initial_setup(path_list)
@@ -1128,10 +1129,11 @@ def main():
     window.close()
     
     # Closing 3D Printer Serial Connection
-    printer.printer.close()
+    printer.disconnect()
     
     # For loop to show camera feed
     pass
 
-main()
 # call main function
+if __name__ == "__main__":
+    main()
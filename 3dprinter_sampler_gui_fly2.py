@@ -29,6 +29,37 @@ Current TODO List:
          https://csveda.com/creating-tabbed-interface-using-pysimplegui/
 
 Changelog
+18 Oct 2026: The estimate and disk check count only the wells the sampling schedule visits
+18 Oct 2026: Video width/height are checked with clip time and bitrate before an experiment starts
+18 Oct 2026: The camera goes back to preview after a failed video run
+18 Oct 2026: The experiment index is flushed every round and closed even if the run fails
+18 Oct 2026: Experiment cleanup (staging, archiver, stacks, thumbnails, montages) runs even if the run fails
+18 Oct 2026: Jog buttons, the G-code box and Change Plate run on the command worker
+18 Oct 2026: Experiments don't start while a command uses the printer/camera, and hold both while running
+18 Oct 2026: Edited connection settings (port, baudrate) reconnect like a profile switch, not during an experiment
+18 Oct 2026: Optional per-well time-lapse videos made when the experiment ends (settings.TIMELAPSE_AT_END)
+18 Oct 2026: A contact sheet of every round in plate layout is saved in montages/ (settings.MONTAGES)
+18 Oct 2026: Previews and thumbnails of every picture are made in the background (settings.THUMBNAILS)
+18 Oct 2026: Picture format (JPEG quality, PNG, lossless WebP, raw numpy) follows settings.PICTURE_FORMAT
+18 Oct 2026: Optional per-well time-lapse stacks (decoded, downscaled frames) written during the experiment (settings.WELL_STACKS)
+18 Oct 2026: Optional per-round archives of the pictures, packed in the background (settings.ARCHIVE_ROUNDS)
+18 Oct 2026: Experiment files go in round (or well) subfolders with a manifest.json (settings.OUTPUT_LAYOUT)
+18 Oct 2026: Disk space and write speed are checked before an experiment starts (module_disk_preflight)
+18 Oct 2026: Pictures are staged on tmpfs and moved to the save folder in the background (settings.USE_STAGING)
+18 Oct 2026: Experiments write a SQLite index of every capture (round, well, coordinates, file, camera metadata)
+18 Oct 2026: Jog moves are streamed (no fixed sleeps) when the printer acknowledges G-code lines
+18 Oct 2026: Startup waits until the printer answers instead of a fixed reboot wait
+18 Oct 2026: Startup skips homing if the printer is still homed from the last session ("--force-home" to always home), added "Home" button
+18 Oct 2026: Printer profile can be switched from Tab 3 (or --profile / PRINTER_PROFILE), connection_settings.yaml edits are picked up without a restart
+18 Oct 2026: Faster startup: printer opened by printer.connect(), picamera2/numpy/Xlib imported on first use, main() only runs as a script
+18 Oct 2026: Preview window moves come from X11 ConfigureNotify events (WindowTracker) instead of polling the window tree
+18 Oct 2026: Main loop reads both windows at once with a longer idle timeout, handlers are looked up in EVENT_HANDLERS
+18 Oct 2026: Z stack, pictures and get/save location run on a worker thread (GUI no longer freezes)
+18 Oct 2026: Video mode records a per-well clip with the hardware H.264 encoder (clip length, size, bitrate, .h264/.mp4)
+18 Oct 2026: Added sparse/staggered sampling (per-well intervals from CSV, rotating subsets)
+18 Oct 2026: Added adaptive dwell option (waits until the preview image stops moving)
+18 Oct 2026: Added "Start Plate Jobs" (several plates with their own period on one printer)
+18 Oct 2026: Added "Estimate" button (dry run of experiment duration and disk usage)
 01 Jan 2025: Replace PySimpleGUI with FreeSimpleGUI
 10 Oct 2023: Created easy_rot quick access camera rotation variable
 24 Aug 2022: User can choose where to save experiment folder (CAM tab)
@@ -45,20 +76,18 @@ Changelog
 
 """
 
-# Import FreeSimpleGUI, cv2, numpy, time libraries
-# Import picamera2 libraries (Raspberry Pi 4)
+# Import FreeSimpleGUI, time libraries
+# picamera2 (Raspberry Pi 4), numpy and Xlib are imported where they are first used,
+# so importing this file (or the helper modules) doesn't load the camera stack
 
 from datetime import datetime
-from picamera2 import Picamera2
-from Xlib.display import Display
 import csv
 import FreeSimpleGUI as sg
-import cv2
-import numpy as np
 import os
 import time
 import threading
 import random
+import sys
 
 # Import modules
 import settings as C
@@ -67,9 +96,24 @@ import printer_connection as printer
 import prepare_experiment as P
 import module_get_cam_settings as GCS
 import module_experiment_timer as ET
+import module_experiment_estimator as EST
+import module_plate_scheduler as PS
+import module_settle_detector as SD
+import module_sampling_schedule as SS
+import module_video_capture as VC
+import module_command_executor as CE
+import module_experiment_index as EI
+import module_staging_store as STG
+import module_disk_preflight as DP
+import module_round_archiver as RA
+import module_well_stacks as WS
+import module_image_format as IF
+import module_thumbnails as TH
+import module_plate_montage as PM
+import module_timelapse as TL
 import module_well_location_helper as WL
 import module_well_location_calculator as WLC
-from module_snake_path import generate_snake_csv
+from module_snake_path import generate_snake_csv, get_snake_shape
 
 
 easy_rot = 180 #global variable for camera rotation, moved for access
@@ -80,6 +124,10 @@ easy_rot = 180 #global variable for camera rotation, moved for access
 OPEN_CSV_PROMPT = "Open CSV:"
 OPEN_CSV_FILEBROWSE_KEY = "-CSV_INPUT-"
 START_EXPERIMENT = "Start Experiment"
+ESTIMATE_EXPERIMENT = "Estimate"
+PLATE_JOBS_PROMPT = "Plate Jobs (YAML):"
+PLATE_JOBS_KEY = "-PLATE_JOBS_INPUT-"
+START_PLATE_JOBS = "Start Plate Jobs"
 STOP_EXPERIMENT = "Stop Experiment"
 PAUSE_EXPERIMENT = "Pause"
 RESUME_EXPERIMENT = "Resume"
@@ -95,6 +143,26 @@ EXP_RADIO_VID_TEXT = "Video"
 EXP_RADIO_PREVIEW_TEXT = "Preview"
 EXP_RADIO_PROMPT = "Experiment mode"
 
+# ---- ADAPTIVE DWELL ----
+ADAPTIVE_DWELL_KEY = "-ADAPTIVE_DWELL-"
+ADAPTIVE_DWELL_TEXT = "Adaptive dwell (take sample once image stops moving)"
+SETTLE_CACHE_FILE = "settle_times.json"
+
+# ---- CORNER CAPTURE (Movement tab), button key -> corner name ----
+CORNER_BUTTON_KEYS = {"--SET_TL--": "TL", "--SET_TR--": "TR", "--SET_BL--": "BL", "--SET_BR--": "BR"}
+
+# ---- VIDEO CLIPS (Video experiment mode) ----
+VIDEO_CLIP_TIME_KEY = "-VIDEO_CLIP_TIME-"
+VIDEO_BITRATE_KEY = "-VIDEO_BITRATE-"
+VIDEO_WIDTH_KEY = "-VIDEO_WIDTH-"
+VIDEO_HEIGHT_KEY = "-VIDEO_HEIGHT-"
+VIDEO_CONTAINER_KEY = "-VIDEO_CONTAINER-"
+VIDEO_INPUTS_ERROR = "Video clip time, bitrate, width and height must be numbers above 0"
+
+# ---- SAMPLING (which wells each round) ----
+SAMPLING_MODE_KEY = "-SAMPLING_MODE-"
+SAMPLING_GROUPS_KEY = "-SAMPLING_GROUPS-"
+
 # ---- CAMERA TAB ----
 # CONSTANTS
 PIC_SAVE_FOLDER = r"/home/pi/Projects/3dprinter_sampling"
@@ -109,6 +177,9 @@ VID_WIDTH = 960
 VID_HEIGHT = 720
 VID_RES = (VID_WIDTH, VID_HEIGHT)
 
+# Low resolution stream for adaptive dwell (watching for the image to stop moving)
+LORES_RES = (320, 240)
+
 # Image Capture Resolution
 # Take a Picture, 12MP: 4056x3040
 PIC_WIDTH = 1920 #KEEF
@@ -123,6 +194,14 @@ MON_RES = (MON_WIDTH, MON_HEIGHT)
 # GUI CONSTANTS
 # Button Labels:
 UPDATE_CAMERA_TEXT = "Update Camera Settings"
+USE_PROFILE_TEXT = "Use Profile"
+HOME_TEXT = "Home"
+
+# Command line option: home at startup even if the saved session says the printer is homed
+FORCE_HOME_ARG = "--force-home"
+
+# Printer Profile GUI Keys
+PRINTER_PROFILE_KEY = "-PRINTER_PROFILE-"
 
 # Camera GUI Keys
 CAMERA_ROTATION_KEY = "-ROTATION_INPUT-"
@@ -213,6 +292,12 @@ EXPO_SETTLE_TIME_KEY = "-EXPO SETTLE TIME-"
 SET_EXPOSURE_MODE = "Set Expo"
 
 is_running_experiment = False
+# Main loop timing: sleep up to IDLE_TIMEOUT_MS waiting for events (button states are refreshed at least this often)
+IDLE_TIMEOUT_MS = 1000
+
+# Event sent by the WindowTracker thread when the preview pseudo window moves, value is (x, y, width, height)
+PREVIEW_MOVED_EVENT = "-PREVIEW_MOVED-"
+
 # Camera access lock to avoid preview/still races
 CAMERA_LOCK = threading.Lock()
 
@@ -227,6 +312,11 @@ NUMERIC_KEYS = [
     "-PREVIEW HEIGHT KEY-",
     "-ALPHA KEY-",
     "-EXPO SETTLE TIME-",
+    "-SAMPLING_GROUPS-",
+    "-VIDEO_CLIP_TIME-",
+    "-VIDEO_BITRATE-",
+    "-VIDEO_WIDTH-",
+    "-VIDEO_HEIGHT-",
 ]
 
 # Small-slice sleep so Stop is responsive
@@ -292,13 +382,9 @@ def run_relative(direction, values):
     print("relative_coordinates:", relative_coordinates)
 
     # This is where you would run the GCode
-    # Run Relative Mode
-    printer.run_gcode("G91")
-    time.sleep(0.15)  # Let printer process G91 before sending move (avoids buffer overflow)
-
-    # Run relative_coordinates GCODE created in this function
-    printer.run_gcode(relative_coordinates)
-    time.sleep(0.1)   # Let printer accept move command before next action
+    # Run Relative Mode, then the relative_coordinates GCODE created in this function
+    # (streamed when the printer acknowledges lines, else sent with a short delay to avoid buffer overflow)
+    printer.run_gcode_list(["G91", relative_coordinates])
 #   TODO: Extruder Speed Adjustment
 
 
@@ -442,6 +528,7 @@ def run_experiment2(event, values, thread_event, pause_event, camera, preview_wi
     
     # Get Timer Values (num_rounds, run_seconds between each run)
     num_rounds, run_seconds = ET.get_hour_min(event, values)
+    experiment_mode = get_experiment_mode(values)
         
     start_time = time.monotonic()
     
@@ -460,139 +547,651 @@ def run_experiment2(event, values, thread_event, pause_event, camera, preview_wi
     # Get GCODE Location List from path_list
     gcode_string_list = P.convert_list_to_gcode_strings(path_list)
     
-    # Go into Absolute Positioning Mode
-    printer.run_gcode(C.ABSOLUTE_POS)
+    # Which wells to visit each round (all, every Nth round, or rotating subsets), planned up front
+    sampling_schedule = get_sampling_schedule(values, path_list)
     
-    folder_path = None
-    # Create New Folder If not in "Preview" Mode
-    if values[EXP_RADIO_PREVIEW_KEY] == False:
-        dest_folder = PIC_SAVE_FOLDER
-        folder_path = P.create_and_get_folder_path2(dest_folder)
-        print("Not in Preview Mode, creating folder:", folder_path)
-        GCS.SAVE_CSV_FOLDER = folder_path
-        GCS.init_csv_file()
+    # Don't start an experiment the save folder can't hold or keep up with
+    if not is_disk_ready(values, sampling_schedule, num_rounds, run_seconds):
+        print("Experiment not started, see the disk check above")
+        is_running_experiment = False
+        return
     
-    # Create While loop to check if thread_event is not set (closing)
+    video_recorder = None
+    settle_detector = None
+    folder_path = None
+    output_layout = None
+    experiment_index = None
+    staging_store = None
+    round_archiver = None
+    well_stacks = None
+    thumbnails = None
+    montage = None
     count_run = 0
-    while not thread_event.is_set():
-        # Honor pause requests
-        while pause_event.is_set() and not thread_event.is_set():
-            time.sleep(0.1)
+    # Cleanup runs even if a move, capture or write fails, so staged pictures are moved and workers finish
+    try:
+        # Video mode: switch the camera to the video configuration once, not at every well
+        if experiment_mode == EXP_RADIO_VID_TEXT:
+            video_recorder = get_video_recorder(values, camera)
+            video_recorder.start()
+    
+        # Adaptive dwell watches the preview for the image to stop moving, instead of a fixed wait
+        settle_detector = get_settle_detector(values)
+        # Where the extruder is coming from, unknown before the first move
+        previous_location = None
+    
+        # Go into Absolute Positioning Mode
+        printer.run_gcode(C.ABSOLUTE_POS)
+    
+        # Create New Folder If not in "Preview" Mode
+        if values[EXP_RADIO_PREVIEW_KEY] == False:
+            dest_folder = PIC_SAVE_FOLDER
+            folder_path = P.create_and_get_folder_path2(dest_folder)
+            print("Not in Preview Mode, creating folder:", folder_path)
+            GCS.SAVE_CSV_FOLDER = folder_path
+            GCS.init_csv_file()
+            # File paths (round/well subfolders), described in manifest.json
+            output_layout = P.OutputLayout(folder_path, total_wells=len(gcode_string_list), num_rounds=num_rounds)
+            output_layout.write_manifest(mode=experiment_mode, csv_file=csv_filename, wait_seconds=run_seconds)
+            # SQLite index of every capture (round, well, coordinates, camera metadata)
+            experiment_index = get_experiment_index(folder_path, experiment_mode, csv_filename)
+            staging_store = get_staging_store()
+            round_archiver = get_round_archiver(experiment_mode, staging_store)
+            well_stacks = get_well_stacks(experiment_mode, folder_path)
+            thumbnails = get_thumbnail_worker(experiment_mode, folder_path)
+            montage = get_montage_worker(experiment_mode, folder_path, path_list)
+    
+        # Create While loop to check if thread_event is not set (closing)
+        while not thread_event.is_set():
+            # Honor pause requests
+            while pause_event.is_set() and not thread_event.is_set():
+                time.sleep(0.1)
         
-        # TODO: Put in the rest of the code for Pic, Video, Preview from 3dprinter_start_experiment or prepare_experiment
+            # TODO: Put in the rest of the code for Pic, Video, Preview from 3dprinter_start_experiment or prepare_experiment
         
         
         
         
-        if run_time_left <= 0:
-            print("=========================")
-            print("Run #", count_run)
-            well_number = 1
+            if run_time_left <= 0:
+                print("=========================")
+                print("Run #", count_run)
+                # Only the wells scheduled for this round, in their planned order
+                round_wells = sampling_schedule.get_round(count_run)
+                print(f"Visiting {len(round_wells)} of {len(gcode_string_list)} wells")
+                round_files = []
             
-            for location in gcode_string_list:
-                # Respect pause while iterating wells
-                while pause_event.is_set() and not thread_event.is_set():
-                    time.sleep(0.1)
-                if thread_event.is_set():
-                    break
-                printer.run_gcode(location)
-                print("Going to Well Number:", well_number)
-                if well_number == 1:
-                    print(f"Pausing at well {well_number} for 10 seconds")
-                    sleep_with_stop(10, thread_event)
-                    print("pause is complete")
-                else:
-                    sleep_with_stop(4, thread_event)
-                if values[EXP_RADIO_PREVIEW_KEY] == True:
-                    print("Preview Mode is On, only showing preview camera \n")
-                    # camera.start_preview(fullscreen=False, window=(30, 30, 500, 500))
-                    # time.sleep(5)
-                    
-                    # camera.stop_preview()
-                elif values[EXP_RADIO_VID_KEY] == True:
-                    print("Recording Video Footage")
-                    if folder_path:
-                        file_full_path = P.get_file_full_path(folder_path, well_number, total_wells=len(gcode_string_list))
-                    # TODO: Change to Video Captures
-                    # camera.capture(file_full_path)ffd4
-                elif values[EXP_RADIO_PIC_KEY] == True:
-                    print("Taking Pictures Only")
-                    if folder_path:
-                        file_full_path = P.get_file_full_path(folder_path, well_number, total_wells=len(gcode_string_list))
-                    # print(file_full_path)
-                    
-                    # Change Image Capture Resolution
-                    # pic_width = PIC_WIDTH
-                    # pic_height = PIC_HEIGHT
-                    
-                    #camera.stop_preview()
-                    #camera.resolution = (pic_width, pic_height)
-                    # time.sleep(.1)
-                    #camera.capture(file_full_path)
-                    # camera.start_preview()
-                    #start_camera_preview(event, values, camera, preview_win_id)
-                    
-                    if folder_path:
-                        get_well_picture(camera, file_full_path)
-                        data_row = GCS.gen_cam_data(file_full_path, camera)
-                        GCS.append_to_csv_file(data_row)
-                    
-                    # Return to streaming resolution: 640 x 480 (or it will crash)
-                    # Bug: Crashes anyway because of threading
-                    #camera.resolution = (VID_WIDTH, VID_HEIGHT)
-                    # TODO: Look up Camera settings to remove white balance (to deal with increasing brightness)
-                # Outside if/elif chain
-                well_number += 1
-            # Outside of location for loop
-            count_run += 1
-            # Reset run_time_left
-            run_time_left = run_seconds
-
-            # Reset run_start
-            run_start = time.monotonic()
-
-            print(f"Will wait {run_seconds} sec before doing next run.")
-
-            # Display rounds left
-            print(f"Rounds left: {num_rounds - count_run}")
-            # May implement the following to break out of loop first. Helpful for lots of wells
-            """    
-            if is_running_experiment == False:
-                print("Stopping Experiment...")
-                return
-            """
+                for visit_index, well_index in enumerate(round_wells):
+                    # Respect pause while iterating wells
+                    while pause_event.is_set() and not thread_event.is_set():
+                        time.sleep(0.1)
+                    if thread_event.is_set():
+                        break
+                    # Well numbers always match the CSV row, even when wells are skipped
+                    well_number = well_index + 1
+                    location = gcode_string_list[well_index]
+                    path_location = path_list[well_index]
+                    printer.run_gcode(location)
+                    print("Going to Well Number:", well_number)
+                    if visit_index == 0:
+                        print(f"Pausing at well {well_number} for up to {C.FIRST_WELL_DWELL_TIME} seconds")
+                        wait_at_well(settle_detector, camera, previous_location, path_location, C.FIRST_WELL_DWELL_TIME, thread_event)
+                        print("pause is complete")
+                    else:
+                        wait_at_well(settle_detector, camera, previous_location, path_location, C.WELL_DWELL_TIME, thread_event)
+                    previous_location = path_location
+                    file_full_path, metadata = take_well_sample(experiment_mode, camera, output_layout, count_run,
+                                                                well_number, video_recorder=video_recorder,
+                                                                thread_event=thread_event, staging_store=staging_store,
+                                                                well_stacks=well_stacks, thumbnails=thumbnails,
+                                                                montage=montage)
+                    index_well_sample(experiment_index, count_run, well_number, path_location, file_full_path, metadata,
+                                      staging_store=staging_store)
+                    if file_full_path:
+                        round_files.append(file_full_path)
+                # Outside of location for loop
+                if experiment_index:
+                    # Write the round's rows now, not up to BATCH_SIZE captures later
+                    experiment_index.flush()
+                if round_archiver:
+                    round_archiver.add_round(folder_path, output_layout.get_round_name(count_run), round_files)
+                if montage:
+                    montage.end_round(output_layout.get_round_name(count_run))
+                count_run += 1
+                # Reset run_time_left
+                run_time_left = run_seconds
+
+                # Reset run_start
+                run_start = time.monotonic()
+
+                print(f"Will wait {run_seconds} sec before doing next run.")
+
+                # Display rounds left
+                print(f"Rounds left: {num_rounds - count_run}")
+                # May implement the following to break out of loop first. Helpful for lots of wells
+                """    
+                if is_running_experiment == False:
+                    print("Stopping Experiment...")
+                    return
+                """
             
-        # Out of if run_time < 0 statement
+            # Out of if run_time < 0 statement
         
         
-        current_time = time.monotonic()
-        elapsed_seconds = current_time - start_time
+            current_time = time.monotonic()
+            elapsed_seconds = current_time - start_time
         
-        run_elapsed = current_time - run_start
-        run_time_left = run_seconds - run_elapsed
+            run_elapsed = current_time - run_start
+            run_time_left = run_seconds - run_elapsed
 
-        if count_run >= num_rounds:
-            print(f"Completed {num_rounds} round(s), stopping experiment.")
-            is_running_experiment = False
-            break
+            if count_run >= num_rounds:
+                print(f"Completed {num_rounds} round(s), stopping experiment.")
+                is_running_experiment = False
+                break
         
         
-        # Use For Loop to go through each location
-        # TODO: Preview doesn't show preview camera
-        # Original
-        # for location in gcode_string_list:
-            # # print(location)
-            # printer.run_gcode(location)
-            # time.sleep(5)
+            # Use For Loop to go through each location
+            # TODO: Preview doesn't show preview camera
+            # Original
+            # for location in gcode_string_list:
+                # # print(location)
+                # printer.run_gcode(location)
+                # time.sleep(5)
         
         
-    print("=========================")
-    print("Experiment Stopped")
-    print("=========================")
-    print(f"Ran experiment for {elapsed_seconds:.1f} seconds, or {elapsed_seconds/60:.1f} minutes, or {elapsed_seconds/60/60:.1f} hours")
-    print(f"Data saved to: {folder_path}")
-    print("-------------------------")
-    is_running_experiment = False
+    finally:
+        # First, so the buffered index rows are written even if a later cleanup step fails
+        if experiment_index:
+            experiment_index.close()
+        if settle_detector:
+            settle_detector.save()
+        if output_layout:
+            output_layout.finish(count_run)
+        if staging_store:
+            # Waits until every staged picture is in the experiment folder
+            staging_store.close()
+        if round_archiver:
+            round_archiver.close()
+        if well_stacks:
+            well_stacks.close()
+        if thumbnails:
+            thumbnails.close()
+        if montage:
+            montage.close()
+        if video_recorder:
+            # Back to the preview configuration, or the live preview stays broken after a failed run
+            video_recorder.finish(get_preview_config(camera))
+        make_experiment_timelapses(experiment_mode, folder_path)
+        print("=========================")
+        print("Experiment Stopped")
+        print("=========================")
+        print(f"Ran experiment for {elapsed_seconds:.1f} seconds, or {elapsed_seconds/60:.1f} minutes, or {elapsed_seconds/60/60:.1f} hours")
+        print(f"Data saved to: {folder_path}")
+        print("-------------------------")
+        is_running_experiment = False
+
+def get_sampling_schedule(values, path_list):
+    """
+    Description: Builds the per-round well schedule from the Sampling options in Tab 1
+    Input: values, a dictionary from PySimpleGUI Window Reads, and the path_list from the CSV
+    Return/Output: SamplingSchedule (see module_sampling_schedule)
+    """
+    sampling_mode = values.get(SAMPLING_MODE_KEY, SS.SAMPLING_ALL)
+    try:
+        num_groups = int(values.get(SAMPLING_GROUPS_KEY, 1))
+    except ValueError:
+        num_groups = 1
+    sampling_schedule = SS.get_sampling_schedule(path_list, sampling_mode, csv_filename=values[OPEN_CSV_FILEBROWSE_KEY],
+                                                 num_groups=num_groups)
+    print(f"Sampling: {sampling_mode}, pattern repeats every {sampling_schedule.pattern_rounds} round(s), "
+          f"{sampling_schedule.get_mean_wells_per_round():.1f} wells per round on average")
+    return sampling_schedule
+
+
+def get_settle_detector(values):
+    # Returns a SettleDetector if adaptive dwell is on, else None (fixed dwell times)
+    if not values.get(ADAPTIVE_DWELL_KEY, False):
+        return None
+    os.makedirs(TEMP_FOLDER, exist_ok=True)
+    return SD.SettleDetector(cache_path=os.path.join(TEMP_FOLDER, SETTLE_CACHE_FILE))
+
+
+def wait_at_well(settle_detector, camera, previous_location, location, dwell_seconds, thread_event):
+    """
+    Description: Waits at a well after sending the move. With adaptive dwell, waits until the
+                 preview image stops moving (dwell_seconds becomes the timeout), else sleeps dwell_seconds.
+    Inputs: previous_location and location, [x, y, z] lists (previous_location is None if unknown)
+    """
+    if settle_detector is None:
+        sleep_with_stop(dwell_seconds, thread_event)
+        return
+    distance = EST.get_distance(previous_location, location) if previous_location is not None else None
+    waited = settle_detector.wait_until_settled(camera, distance, thread_event, timeout=dwell_seconds,
+                                                camera_lock=CAMERA_LOCK)
+    print(f"Image settled after {waited:.2f} sec")
+
+
+def take_well_sample(experiment_mode, camera, output_layout, round_index, well_number, video_recorder=None,
+                     thread_event=None, staging_store=None, well_stacks=None, thumbnails=None, montage=None):
+    """
+    Description: Takes the sample for one well: a picture, a video, or nothing (preview)
+    Inputs:
+      - experiment_mode, "Picture", "Video", or "Preview" (see get_experiment_mode)
+      - output_layout, P.OutputLayout of the experiment folder to save into (None in Preview mode)
+      - round_index and well_number, used for the file path
+      - video_recorder, a started VC.WellVideoRecorder (Video mode), thread_event stops a clip early
+      - staging_store, a started STG.StagingStore (pictures are captured there and moved in the background)
+      - well_stacks, a started WS.WellStackWriter (pictures are also added to the well's time-lapse stack)
+      - thumbnails, a started TH.ThumbnailWorker (makes the picture's preview and thumbnail)
+      - montage, a started PM.MontageWorker (adds the picture to the round's contact sheet)
+    Return/Output: (file path, camera metadata), or (None, None) if nothing was saved
+    """
+    if experiment_mode == EXP_RADIO_PREVIEW_TEXT:
+        print("Preview Mode is On, only showing preview camera \n")
+    elif experiment_mode == EXP_RADIO_VID_TEXT:
+        print("Recording Video Footage")
+        if output_layout and video_recorder:
+            file_full_path = output_layout.get_file_full_path(round_index, well_number,
+                                                              extension=C.FILENAME_VIDEO_EXTENSION)
+            return video_recorder.record_clip(file_full_path, stop_event=thread_event), None
+    elif experiment_mode == EXP_RADIO_PIC_TEXT:
+        print("Taking Pictures Only")
+        if output_layout:
+            file_full_path = output_layout.get_file_full_path(round_index, well_number,
+                                                              extension=C.FILENAME_PICTURE_EXTENSION)
+            # Straight to the save folder if staging is off, or full because the mover can't keep up
+            capture_path = file_full_path
+            if staging_store and staging_store.wait_for_room():
+                capture_path = staging_store.get_staging_path(file_full_path)
+            get_well_picture(camera, capture_path)
+            if well_stacks or thumbnails or montage:
+                # Read now, before the mover or the round archiver takes the file away
+                with open(capture_path, "rb") as file:
+                    image_bytes = file.read()
+                if well_stacks:
+                    well_stacks.add_frame(well_number, round_index, image_bytes, time.time())
+                if thumbnails:
+                    thumbnails.add_image(file_full_path, image_bytes)
+                if montage:
+                    montage.add_image(well_number, image_bytes)
+            if capture_path != file_full_path:
+                staging_store.commit(capture_path, file_full_path)
+            # One metadata read for both the CSV and the experiment index
+            metadata = GCS.get_cam_metadata(camera)
+            data_row = GCS.gen_cam_data(file_full_path, camera, metadata=metadata)
+            GCS.append_to_csv_file(data_row)
+            return file_full_path, metadata
+        # TODO: Look up Camera settings to remove white balance (to deal with increasing brightness)
+    return None, None
+
+
+def get_experiment_index(folder_path, experiment_mode, csv_filename=""):
+    # Opens the SQLite capture index in the experiment folder (call from the experiment thread)
+    experiment_index = EI.ExperimentIndex(os.path.join(folder_path, EI.INDEX_FILENAME))
+    experiment_index.start_experiment(folder_path, mode=experiment_mode, csv_file=csv_filename, profile=C.PROFILE.key)
+    return experiment_index
+
+
+def index_well_sample(experiment_index, round_index, well_number, location, file_full_path, metadata, plate=None,
+                      staging_store=None):
+    # Adds one capture to the experiment index, with where the printer says it is (M114) if enabled
+    if experiment_index is None or file_full_path is None:
+        return
+    # A staged file may not be at file_full_path yet
+    file_bytes = staging_store.get_pending_bytes(file_full_path) if staging_store else None
+    actual = None
+    if C.INDEX_ACTUAL_POSITION:
+        try:
+            position = printer.query_position()
+        except Exception as e:
+            print(f"Could not get position for the index: {e}")
+            position = None
+        if position is not None:
+            actual = (position["X"], position["Y"], position["Z"])
+    experiment_index.add_capture(round_index, well_number, file_full_path, planned=location, actual=actual,
+                                 metadata=metadata, plate=plate, file_bytes=file_bytes)
+
+
+def get_staging_store():
+    # Returns a started STG.StagingStore if staging is on, else None (captures go straight to the save folder)
+    if not C.USE_STAGING:
+        return None
+    try:
+        staging_store = STG.StagingStore(C.STAGING_FOLDER, C.STAGING_QUOTA_MB * 1024 * 1024, verify=C.STAGING_VERIFY)
+    except OSError as e:
+        print(f"Not staging, could not use {C.STAGING_FOLDER}: {e}")
+        return None
+    staging_store.start()
+    return staging_store
+
+
+def get_round_archiver(experiment_mode, staging_store):
+    # Returns a started RA.RoundArchiver if round archives are on (pictures only), else None
+    if not C.ARCHIVE_ROUNDS or experiment_mode != EXP_RADIO_PIC_TEXT:
+        return None
+    round_archiver = RA.RoundArchiver(C.ARCHIVE_FORMAT, delete_loose=C.ARCHIVE_DELETE_LOOSE,
+                                      max_rate_mb=C.ARCHIVE_MAX_MB_PER_SEC,
+                                      is_pending=staging_store.is_pending if staging_store else None)
+    round_archiver.start()
+    return round_archiver
+
+
+def get_well_stacks(experiment_mode, folder_path):
+    # Returns a started WS.WellStackWriter if well stacks are on (pictures only), else None
+    if not C.WELL_STACKS or experiment_mode != EXP_RADIO_PIC_TEXT:
+        return None
+    well_stacks = WS.WellStackWriter(os.path.join(folder_path, WS.STACK_FOLDER), scales=C.WELL_STACK_SCALES,
+                                     chunk_rounds=C.WELL_STACK_CHUNK_ROUNDS)
+    well_stacks.start()
+    return well_stacks
+
+
+def get_thumbnail_worker(experiment_mode, folder_path):
+    # Returns a started TH.ThumbnailWorker if thumbnails are on (pictures only), else None
+    if not C.THUMBNAILS or experiment_mode != EXP_RADIO_PIC_TEXT:
+        return None
+    thumbnails = TH.ThumbnailWorker(folder_path)
+    thumbnails.start()
+    return thumbnails
+
+
+def get_montage_worker(experiment_mode, folder_path, path_list):
+    # Returns a started PM.MontageWorker if round contact sheets are on (pictures only), else None
+    if not C.MONTAGES or experiment_mode != EXP_RADIO_PIC_TEXT or not path_list:
+        return None
+    rows, cols = get_snake_shape(path_list)
+    if C.MONTAGE_COLS:
+        cols = C.MONTAGE_COLS
+        rows = C.MONTAGE_ROWS or -(-len(path_list) // cols)
+    elif C.MONTAGE_ROWS:
+        rows = C.MONTAGE_ROWS
+        cols = -(-len(path_list) // rows)
+    if rows * cols < len(path_list):
+        print(f"Montage layout {rows} x {cols} is too small for {len(path_list)} wells, using one row")
+        rows, cols = 1, len(path_list)
+    montage = PM.MontageWorker(folder_path, rows, cols, PM.get_tile_size((PIC_WIDTH, PIC_HEIGHT), C.MONTAGE_TILE_PX))
+    montage.start()
+    return montage
+
+
+def make_experiment_timelapses(experiment_mode, folder_path):
+    # Makes one time-lapse video per well if they are on (pictures only), after the previews/thumbnails are done
+    if not C.TIMELAPSE_AT_END or experiment_mode != EXP_RADIO_PIC_TEXT or folder_path is None:
+        return
+    try:
+        TL.make_timelapses(folder_path, size=C.TIMELAPSE_SIZE, fps=C.TIMELAPSE_FPS, timestamp=C.TIMELAPSE_TIMESTAMP)
+    except Exception as e:
+        # The pictures are safe, the videos can be made later from the command line
+        print(f"Could not make time-lapse videos: {e}")
+
+
+def run_plate_jobs(jobs_filename, values, thread_event, pause_event, camera):
+    """
+    Description: Runs several plates (jobs) with their own period and mode on one printer,
+                 using the earliest-deadline-first scheduler in module_plate_scheduler.
+                 Each plate gets its own subfolder in the experiment folder.
+    Input: jobs_filename, YAML file listing the plate jobs
+           values, a dictionary from PySimpleGUI Window Reads (for the adaptive dwell option)
+    """
+    global is_running_experiment
+    print("run_plate_jobs")
+    
+    jobs = PS.load_jobs_yaml(jobs_filename)
+    try:
+        estimate = get_plate_jobs_estimate(values, jobs)
+    except ValueError:
+        print(f"Plate jobs not started. {VIDEO_INPUTS_ERROR}")
+        is_running_experiment = False
+        return
+    # Same disk check as a single plate, for all plates together
+    if not is_estimate_disk_ready(estimate):
+        print("Plate jobs not started, see the disk check above")
+        is_running_experiment = False
+        return
+    
+    # One experiment folder, one subfolder per plate
+    folder_path = P.create_and_get_folder_path2(PIC_SAVE_FOLDER)
+    GCS.SAVE_CSV_FOLDER = folder_path
+    GCS.init_csv_file()
+    experiment_index = None
+    staging_store = None
+    round_archiver = None
+    settle_detector = None
+    job_layouts = {}
+    job_stacks = {}
+    job_thumbnails = {}
+    job_montages = {}
+    # Cleanup runs even if a move, capture or write fails, so staged pictures are moved and workers finish
+    try:
+        # One index for all plates (the plate column tells them apart)
+        experiment_index = get_experiment_index(folder_path, "Plate Jobs", jobs_filename)
+        staging_store = get_staging_store()
+        round_archiver = get_round_archiver(EXP_RADIO_PIC_TEXT, staging_store)
+        for job in jobs:
+            job_folder = os.path.join(folder_path, job.name)
+            os.makedirs(job_folder, exist_ok=True)
+            job_layouts[job.name] = P.OutputLayout(job_folder, total_wells=len(job.path_list),
+                                                   num_rounds=job.num_rounds)
+            job_layouts[job.name].write_manifest(mode=job.mode, csv_file=job.csv_filename, plate=job.name,
+                                                 period_seconds=job.period_seconds)
+        # Well numbers repeat between plates, so each plate gets its own stacks
+        job_stacks = {job.name: get_well_stacks(job.mode, job_layouts[job.name].folder_path) for job in jobs}
+        job_thumbnails = {job.name: get_thumbnail_worker(job.mode, job_layouts[job.name].folder_path) for job in jobs}
+        job_montages = {job.name: get_montage_worker(job.mode, job_layouts[job.name].folder_path, job.path_list)
+                        for job in jobs}
+    
+        settle_detector = get_settle_detector(values)
+        # Where the extruder is coming from, unknown before the first move
+        previous_location = None
+    
+        # Go into Absolute Positioning Mode
+        printer.run_gcode(C.ABSOLUTE_POS)
+    
+        # Video plates switch the camera to video mode for their round only
+        video_recorder = None
+        if any(job.mode == EXP_RADIO_VID_TEXT for job in jobs):
+            video_recorder = get_video_recorder(values, camera)
+    
+        def run_round(job, visits, round_index):
+            nonlocal previous_location
+            if job.mode == EXP_RADIO_VID_TEXT:
+                video_recorder.start()
+            # The camera goes back to the preview configuration even if the round fails
+            try:
+                round_files = []
+                for visit_index, (well_number, gcode_string, location) in enumerate(visits):
+                    while pause_event.is_set() and not thread_event.is_set():
+                        time.sleep(0.1)
+                    if thread_event.is_set():
+                        break
+                    printer.run_gcode(gcode_string)
+                    print(f"Plate '{job.name}', Going to Well Number: {well_number}")
+                    if visit_index == 0:
+                        wait_at_well(settle_detector, camera, previous_location, location, C.FIRST_WELL_DWELL_TIME, thread_event)
+                    else:
+                        wait_at_well(settle_detector, camera, previous_location, location, C.WELL_DWELL_TIME, thread_event)
+                    previous_location = location
+                    if thread_event.is_set():
+                        break
+                    file_full_path, metadata = take_well_sample(job.mode, camera, job_layouts[job.name], round_index,
+                                                                well_number, video_recorder=video_recorder,
+                                                                thread_event=thread_event, staging_store=staging_store,
+                                                                well_stacks=job_stacks[job.name],
+                                                                thumbnails=job_thumbnails[job.name],
+                                                                montage=job_montages[job.name])
+                    index_well_sample(experiment_index, round_index, well_number, location, file_full_path, metadata,
+                                      plate=job.name, staging_store=staging_store)
+                    if file_full_path:
+                        round_files.append(file_full_path)
+                # Write the round's rows now, not up to BATCH_SIZE captures later
+                experiment_index.flush()
+                if round_archiver and job.mode == EXP_RADIO_PIC_TEXT:
+                    job_layout = job_layouts[job.name]
+                    round_archiver.add_round(job_layout.folder_path, job_layout.get_round_name(round_index), round_files)
+                if job_montages[job.name]:
+                    job_montages[job.name].end_round(job_layouts[job.name].get_round_name(round_index))
+            finally:
+                if job.mode == EXP_RADIO_VID_TEXT:
+                    video_recorder.finish(get_preview_config(camera))
+    
+        scheduler = PS.PlateScheduler(jobs, log_path=os.path.join(folder_path, "schedule_log.csv"))
+        scheduler.run(run_round, thread_event, pause_event)
+    finally:
+        # First, so the buffered index rows are written even if a later cleanup step fails
+        if experiment_index:
+            experiment_index.close()
+        if settle_detector:
+            settle_detector.save()
+        for job in jobs:
+            if job.name in job_layouts:
+                job_layouts[job.name].finish(job.rounds_done)
+        if staging_store:
+            staging_store.close()
+        if round_archiver:
+            round_archiver.close()
+        for well_stacks in job_stacks.values():
+            if well_stacks:
+                well_stacks.close()
+        for thumbnails in job_thumbnails.values():
+            if thumbnails:
+                thumbnails.close()
+        for montage in job_montages.values():
+            if montage:
+                montage.close()
+        for job in jobs:
+            if job.name in job_layouts:
+                make_experiment_timelapses(job.mode, job_layouts[job.name].folder_path)
+        
+        print("=========================")
+        print("Plate Jobs Stopped")
+        print("=========================")
+        print(f"Data saved to: {folder_path}")
+        is_running_experiment = False
+
+
+def get_video_inputs(values):
+    # (clip seconds, bitrate in bits/sec, (width, height)) from the video inputs in Tab 1
+    # ValueError if they aren't numbers or aren't above 0
+    clip_seconds = float(values[VIDEO_CLIP_TIME_KEY])
+    bitrate = int(values[VIDEO_BITRATE_KEY]) * 1000000
+    res = (int(values[VIDEO_WIDTH_KEY]), int(values[VIDEO_HEIGHT_KEY]))
+    if clip_seconds <= 0 or bitrate <= 0 or min(res) <= 0:
+        raise ValueError("video inputs must be above 0")
+    return clip_seconds, bitrate, res
+
+
+def get_video_recorder(values, camera):
+    # Builds a VC.WellVideoRecorder from the video inputs in Tab 1 (not started yet), ValueError on bad inputs
+    clip_seconds, bitrate, res = get_video_inputs(values)
+    return VC.WellVideoRecorder(camera,
+                                res=res,
+                                bitrate=bitrate,
+                                clip_seconds=clip_seconds,
+                                container=values[VIDEO_CONTAINER_KEY],
+                                camera_lock=CAMERA_LOCK)
+
+
+def get_preview_config(camera):
+    # Preview configuration the GUI normally runs in (camera feed + lores stream for adaptive dwell)
+    return camera.create_preview_configuration(main={"size": (VID_WIDTH, VID_HEIGHT)}, lores={"size": LORES_RES})
+
+
+def get_experiment_mode(values):
+    # Returns the experiment mode text (Picture, Video, or Preview) from the radio buttons
+    if values[EXP_RADIO_VID_KEY] == True:
+        return EXP_RADIO_VID_TEXT
+    elif values[EXP_RADIO_PREVIEW_KEY] == True:
+        return EXP_RADIO_PREVIEW_TEXT
+    return EXP_RADIO_PIC_TEXT
+
+
+def show_experiment_estimate(values):
+    """
+    Description: Dry run of the experiment set up in Tab 1. Predicts round duration, total runtime
+                 and disk usage without moving the printer or using the camera.
+    Input: values, a dictionary from PySimpleGUI Window Reads
+    """
+    csv_filename = values[OPEN_CSV_FILEBROWSE_KEY]
+    if not os.path.isfile(csv_filename):
+        print(f"Can't estimate, CSV file not found: {csv_filename}")
+        return
+    try:
+        num_rounds = int(values[ET.NUM_ROUNDS_KEY])
+        run_seconds = int(values[ET.RUN_MIN_KEY]) * 60
+    except ValueError:
+        print("Rounds and Min(s) must be whole numbers")
+        return
+    sampling_schedule = get_sampling_schedule(values, P.get_path_list_csv(csv_filename))
+    try:
+        estimate = get_experiment_estimate(values, sampling_schedule, num_rounds, run_seconds)
+    except ValueError:
+        print(VIDEO_INPUTS_ERROR)
+        return
+    report = EST.format_report(estimate)
+    if estimate["bytes_per_sample"]:
+        # Space only here, the write test runs when the experiment starts (it takes a few seconds)
+        report += "\n" + DP.format_preflight(DP.run_preflight(estimate, PIC_SAVE_FOLDER, benchmark=False))
+    print(report)
+    sg.popup_scrolled(report, title="Experiment Estimate", size=(80, 16), non_blocking=True)
+
+
+def get_experiment_estimate(values, sampling_schedule, num_rounds, run_seconds):
+    # EST.estimate_experiment with the mode, resolution and video settings from Tab 1, counting only
+    # the wells the sampling schedule visits. The video inputs are only read in Video mode (ValueError if bad)
+    experiment_mode = get_experiment_mode(values)
+    video_inputs = {}
+    if experiment_mode == EXP_RADIO_VID_TEXT:
+        clip_seconds, bitrate, _ = get_video_inputs(values)
+        video_inputs = {"clip_seconds": clip_seconds, "bitrate": bitrate}
+    return EST.estimate_experiment(sampling_schedule.path_list, num_rounds, run_seconds,
+                                   mode=experiment_mode,
+                                   pic_res=(PIC_WIDTH, PIC_HEIGHT),
+                                   bytes_per_pixel=EST.get_bytes_per_pixel(C.PICTURE_FORMAT),
+                                   num_samples=sampling_schedule.get_total_visits(num_rounds),
+                                   **video_inputs)
+
+
+def is_disk_ready(values, sampling_schedule, num_rounds, run_seconds):
+    # Checks the save folder's free space and write speed, returns False if the experiment shouldn't start
+    try:
+        estimate = get_experiment_estimate(values, sampling_schedule, num_rounds, run_seconds)
+    except ValueError:
+        print(VIDEO_INPUTS_ERROR)
+        return False
+    return is_estimate_disk_ready(estimate)
+
+
+def get_plate_jobs_estimate(values, jobs):
+    # One estimate for all plate jobs (EST.combine_estimates), ValueError on bad video inputs
+    estimates = []
+    for job in jobs:
+        video_inputs = {}
+        if job.mode == EXP_RADIO_VID_TEXT:
+            clip_seconds, bitrate, _ = get_video_inputs(values)
+            video_inputs = {"clip_seconds": clip_seconds, "bitrate": bitrate}
+        if job.num_rounds is None:
+            print(f"Plate '{job.name}' runs until stopped, the disk check counts one round of it")
+        estimate = EST.estimate_experiment(job.path_list, job.num_rounds or 1, job.period_seconds, mode=job.mode,
+                                           pic_res=(PIC_WIDTH, PIC_HEIGHT),
+                                           bytes_per_pixel=EST.get_bytes_per_pixel(C.PICTURE_FORMAT),
+                                           **video_inputs)
+        # Rounds of a plate start every period_seconds (the scheduler), not right after each other
+        estimate["period_seconds"] = max(job.period_seconds, estimate["round_seconds"])
+        estimates.append(estimate)
+    return EST.combine_estimates(estimates)
+
+
+def is_estimate_disk_ready(estimate):
+    # Runs the disk preflight for an estimate, returns False if the experiment shouldn't start
+    if not estimate["bytes_per_sample"]:
+        return True
+    preflight = DP.run_preflight(estimate, PIC_SAVE_FOLDER)
+    print(DP.format_preflight(preflight))
+    if preflight["go"]:
+        return True
+    if not C.PREFLIGHT_STOP_ON_NO_GO:
+        print("Starting anyway (PREFLIGHT_STOP_ON_NO_GO is off)")
+        return True
+    return False
+
 
 # Takes in event and values to check for radio selection (Pictures, Videos, or Preview)
 # Takes in CSV filename or location list generated from opening CSV file
@@ -800,20 +1399,28 @@ def get_video(camera):
     # Create Unique Filename
     current_time = datetime.now()
     current_time_str = current_time.strftime("%Y-%m-%d_%H%M%S")
-    filename = f"video_{current_time_str}.h264"
+    filename = f"{PIC_SAVE_FOLDER}/video_{current_time_str}.h264"
     
     # Set Recording Time (in seconds)
     recording_time = int(1 * 5)
     
-    camera.start_recording(filename)
-    camera.wait_recording(recording_time)
-    camera.stop_recording()
+    # Picamera2 has no start_recording(filename), use the H.264 encoder, then go back to preview
+    video_recorder = VC.WellVideoRecorder(camera, clip_seconds=recording_time, camera_lock=CAMERA_LOCK)
+    video_recorder.start()
+    filename = video_recorder.record_clip(filename)
+    video_recorder.finish(get_preview_config(camera))
     
-    print(f"Recorded Video: {filename}")
+    print(f"Saved Video: {filename}")
 
 
 def capture_still(camera, file_full_path):
-    """Safely capture a still by stopping camera, configuring for still, then restoring preview."""
+    """
+    Safely capture a still by stopping camera, configuring for still, then restoring preview.
+    The file extension picks the format (see module_image_format): JPEG is saved by picamera2,
+    the others are encoded from the captured array after the camera is back in preview.
+    """
+    image_format = IF.get_format(file_full_path)
+    image = None
     with CAMERA_LOCK:
         # Picamera2 requires camera to be stopped before configuring
         camera.stop()
@@ -821,12 +1428,20 @@ def capture_still(camera, file_full_path):
         still_config = camera.create_still_configuration(main={"size": (PIC_WIDTH, PIC_HEIGHT)})
         camera.configure(still_config)
         camera.start()
-        camera.capture_file(file_full_path)
+        if image_format == IF.FORMAT_JPEG:
+            camera.options["quality"] = C.JPEG_QUALITY
+            camera.capture_file(file_full_path)
+        else:
+            # Still configuration is "BGR888", which numpy sees as RGB
+            image = camera.capture_array("main")
         # Restore preview configuration
         camera.stop()
-        preview_config = camera.create_preview_configuration(main={"size": (VID_WIDTH, VID_HEIGHT)})
+        preview_config = camera.create_preview_configuration(main={"size": (VID_WIDTH, VID_HEIGHT)}, lores={"size": LORES_RES})
         camera.configure(preview_config)
         camera.start()
+    if image is not None:
+        # Encoding doesn't need the camera, so the preview runs again meanwhile
+        IF.save_image(image, file_full_path)
 
 
 def get_picture(camera):
@@ -858,10 +1473,14 @@ def get_well_picture(camera, file_full_path):
 
 
 
-def get_x_pictures(x, delay_seconds, camera):
+def get_x_pictures(x, delay_seconds, camera, progress=None, stop_event=None):
+    # progress/stop_event are given when run by the CommandExecutor (see module_command_executor)
     
     # Run loop x times
     for i in range(x):
+        if stop_event is not None and stop_event.is_set():
+            print(f"Stopped after {i} pictures.")
+            return
     
         # Create Unique ID
         unique_id = get_unique_id()
@@ -873,8 +1492,13 @@ def get_x_pictures(x, delay_seconds, camera):
         capture_still(camera, pic_save_full_path)
         # Print that picture was saved
         print(f"Saved Image: {pic_save_full_path}")
+        if progress:
+            progress(f"Picture {i + 1}/{x}")
         # Wait Delay Amount
-        time.sleep(delay_seconds)
+        if stop_event is not None:
+            sleep_with_stop(delay_seconds, stop_event)
+        else:
+            time.sleep(delay_seconds)
     
     print(f"Done taking {x} pictures.")
     
@@ -897,7 +1521,7 @@ def check_for_digits_in_key(key_str, window, event, values):
             window[key_str].update(values[key_str][:-1])
 
 
-def create_z_stack(z_start, z_end, z_increment, save_folder_location, camera):
+def create_z_stack(z_start, z_end, z_increment, save_folder_location, camera, progress=None, stop_event=None):
     # Assumes all inputs are floating or integers, no letters!
     print("create_z_stack")
     print("Pausing Video Stream")
@@ -929,7 +1553,12 @@ def create_z_stack(z_start, z_end, z_increment, save_folder_location, camera):
 
     # Mark where we think z_focus is?
 
-    for z in np.arange(z_start, z_end+z_increment, z_increment):
+    import numpy as np
+    z_list = np.arange(z_start, z_end+z_increment, z_increment)
+    for z_index, z in enumerate(z_list):
+        if stop_event is not None and stop_event.is_set():
+            print("Z Stack stopped early")
+            break
         print(f"z: {z}")
         # Make sure number gets rounded to 2 decimal places (ex: 25.23)
 
@@ -949,22 +1578,21 @@ def create_z_stack(z_start, z_end, z_increment, save_folder_location, camera):
         # Possible bug, could this module be used elsewhere? This code may have to run in the same location as the GUI.
         printer.run_gcode(gcode_str)
         # Wait x seconds for extruder to get to location.
-        time.sleep(2)
+        if stop_event is not None:
+            sleep_with_stop(2, stop_event)
+        else:
+            time.sleep(2)
 
 
         # Take Picture and save to folder location
         save_file_name = f"_image_{z_rounded_str}_.jpg"
         save_full_path = f"{save_folder_path}/{save_file_name}"
         
-        # Change to max resolution (picamera2)
-        still_config = camera.create_still_configuration(main={"size": PIC_RES})
-        camera.configure(still_config)
-        
-        camera.capture_file(save_full_path)
-        
-        # Change back to streaming resolution
-        preview_config = camera.create_preview_configuration(main={"size": VID_RES})
-        camera.configure(preview_config)
+        # Change to max resolution, capture, change back to streaming resolution (picamera2)
+        # Uses the camera lock, since this now runs on the command worker thread
+        capture_still(camera, save_full_path)
+        if progress:
+            progress(f"Z {z_rounded} ({z_index + 1}/{len(z_list)})")
 
     
     print(f"Done Creating Z Stack at {save_folder_path}")
@@ -972,6 +1600,50 @@ def create_z_stack(z_start, z_end, z_increment, save_folder_location, camera):
     pass
 
 
+# Define function to switch printer profiles (runs on the command worker thread)
+# Only reconnects (wait until ready + homing) if the serial port settings changed
+def switch_printer_profile(name):
+    old_profile = C.PROFILE
+    new_profile = C.select_profile(name)
+    if all(getattr(old_profile, f) == getattr(new_profile, f) for f in C.CONNECTION_FIELDS):
+        print("Same serial connection, no need to reconnect")
+        return new_profile
+    print(f"Reconnecting to {new_profile.device_path} at {new_profile.baudrate} baud")
+    printer.disconnect()
+    printer.connect()
+    printer.start_session()
+    return new_profile
+
+
+# Define function to submit a hardware command to the CommandExecutor (runs off the GUI thread)
+def submit_command(executor, name, func, *args, **kwargs):
+    # Printer/camera commands would fight with a running experiment, so reject them
+    if is_running_experiment:
+        print(f"Can't run '{name}' while an experiment is running")
+        return False
+    return executor.submit(name, func, *args, **kwargs)
+
+
+# Define function to handle progress/results sent back by the CommandExecutor
+def handle_command_event(command, window, corners):
+    name = command["name"]
+    status = command["status"]
+    if status == CE.STATUS_STARTED:
+        print(f"Running: {name}")
+    elif status == CE.STATUS_PROGRESS:
+        print(f"{name}: {command['message']}")
+    elif status == CE.STATUS_FAILED:
+        print(f"{name} failed: {command['message']}")
+    elif status == CE.STATUS_DONE:
+        print(f"Done: {name}")
+        # Corner buttons: fill in the location that was found
+        if name in CORNER_BUTTON_KEYS:
+            loc = command["result"]
+            corner = CORNER_BUTTON_KEYS[name]
+            corners[corner] = loc
+            window[f"--{corner}_COORD--"].update(f"{loc['X']:.2f},{loc['Y']:.2f},{loc['Z']:.2f}")
+
+
 # Define function to get current location
 def get_current_location():
     printer.run_gcode("M114")
@@ -1080,6 +1752,12 @@ def save_current_location():
 
 
 # === Start Camera Preview Window Functions ===
+def get_display():
+    # Xlib is imported on first use (only needed once the preview window exists)
+    from Xlib.display import Display
+    return Display()
+
+
 def get_max_screen_resolution():
     """
     Gets Max Screen Resolution,
@@ -1088,7 +1766,7 @@ def get_max_screen_resolution():
     max_screen_width = 0
     max_screen_height = 0
     
-    d = Display()
+    d = get_display()
     
     info = d.screen(DEFAULT_SCREEN_INDEX)
     
@@ -1109,7 +1787,7 @@ def get_max_screen_resolution():
 
 
 def get_xy_loc_of_all_windows():
-    disp = Display()
+    disp = get_display()
     root = disp.screen().root
     children = root.query_tree().children
     
@@ -1159,7 +1837,7 @@ def get_unique_xy_loc():
 
 def get_window_pid(x_start, y_start):
     print("***get_window_pid()***")
-    disp = Display()
+    disp = get_display()
     root = disp.screen().root
     children = root.query_tree().children
     
@@ -1198,7 +1876,7 @@ def get_window_location_from_pid(search_pid):
     # print(f"search_pid: {search_pid}")
     
     try:
-        disp = Display()
+        disp = get_display()
         root = disp.screen().root
         children = root.query_tree().children
         
@@ -1226,7 +1904,7 @@ def get_window_location_from_pid(search_pid):
 def move_window_pid(search_pid, x_new, y_new):
     print("***move_window_pid()***")
     # print(f"search_pid: {search_pid}")
-    disp = Display()
+    disp = get_display()
     root = disp.screen().root
     children = root.query_tree().children
     
@@ -1254,7 +1932,7 @@ def change_window_name(search_pid, new_window_name):
     print("***change_window_name()***")
     # Change Window Name of Specific PID
     # print(f"search_pid: {search_pid}")
-    disp = Display()
+    disp = get_display()
     root = disp.screen().root
     children = root.query_tree().children
     
@@ -1487,6 +2165,544 @@ def start_camera_preview(event, values, camera, preview_win_id):
     print(f"x_win:{x_win}, y_win:{y_win}")
 
 
+# === Start Main Window Event Handlers ===
+# Each handler takes (ctx, event, values) and is looked up in EVENT_HANDLERS by event key,
+# so the main loop does one dictionary lookup instead of walking a long if/elif chain.
+
+class GuiContext:
+    """State shared by the main window event handlers (was local variables in main)."""
+
+    def __init__(self, window, camera, executor):
+        self.window = window
+        self.camera = camera
+        self.executor = executor
+        # Initialize empty experiment_thread object, will be used with "Start Experiment" is pushed
+        self.experiment_thread = threading.Thread()
+        # Initialize threading event (Allows you to stop the thread)
+        self.thread_event = threading.Event()
+        self.pause_event = threading.Event()
+        self.preview_win_id = 0
+        # Watches the preview pseudo window for moves (see start_window_tracker)
+        self.window_tracker = None
+        self.crosshair_overlay = None
+        self.corners = {"TL": None, "TR": None, "BL": None, "BR": None}
+        self.last_snake_csv = os.path.join(os.getcwd(), "testing", "Well_Location", "snake_path.csv")
+        # Last settings pushed to each widget, see update_widget
+        self.widget_states = {}
+
+    def update_widget(self, key, **kwargs):
+        # Only call update() when the widget's state actually changes (each update costs Tk work)
+        state = tuple(sorted(kwargs.items()))
+        if self.widget_states.get(key) != state:
+            self.widget_states[key] = state
+            self.window[key].update(**kwargs)
+
+    def start_window_tracker(self):
+        # Get told by the X server when the preview window moves, instead of polling for it
+        import module_window_tracker as WT
+        try:
+            self.window_tracker = WT.WindowTracker(
+                self.preview_win_id,
+                on_change=lambda geometry: self.window.write_event_value(PREVIEW_MOVED_EVENT, geometry),
+                default_location=(PREVIEW_LOC_X, PREVIEW_LOC_Y))
+            self.window_tracker.start()
+        except Exception as e:
+            print(f"Can't track preview window {self.preview_win_id}: {e}")
+            self.window_tracker = None
+
+    def get_preview_location(self):
+        # Cached location from the tracker, falls back to searching the window tree
+        if self.window_tracker is not None:
+            return self.window_tracker.get_location()
+        return get_window_location_from_pid(self.preview_win_id)
+
+    def set_experiment_buttons(self, is_running):
+        self.update_widget(START_EXPERIMENT, disabled=is_running)
+        self.update_widget(STOP_EXPERIMENT, disabled=not is_running)
+        self.update_widget(PAUSE_EXPERIMENT, disabled=not is_running)
+        self.update_widget(RESUME_EXPERIMENT, disabled=True)
+
+
+def update_experiment_buttons(ctx, values):
+    # "Start Experiment" is only enabled if a CSV is loaded and no experiment is running
+    # (the experiment thread clears is_running_experiment when it finishes on its own)
+    if is_running_experiment:
+        return
+    ctx.update_widget(START_EXPERIMENT, disabled=len(values[OPEN_CSV_FILEBROWSE_KEY]) == 0)
+    ctx.update_widget(STOP_EXPERIMENT, disabled=True)
+    ctx.update_widget(PAUSE_EXPERIMENT, disabled=True)
+    ctx.update_widget(RESUME_EXPERIMENT, disabled=True)
+
+
+def get_crosshair_radius(values):
+    try:
+        return int(values.get("--XHAIR_RADIUS--", WL.CIRCLE_RADIUS))
+    except (TypeError, ValueError):
+        return WL.CIRCLE_RADIUS
+
+
+def remove_crosshair_overlay(ctx):
+    if ctx.crosshair_overlay:
+        with CAMERA_LOCK:
+            if hasattr(ctx.camera, 'remove_overlay'):
+                ctx.camera.remove_overlay(ctx.crosshair_overlay)
+            else:
+                ctx.camera.set_overlay(None)
+        ctx.crosshair_overlay = None
+
+
+def show_crosshair_overlay(ctx, radius, x_win_preview, y_win_preview):
+    # Draw the crosshair over the preview window at its current location
+    # (WL caches the image, so moving the window doesn't redraw it)
+    preview_rect = (x_win_preview, y_win_preview + PREVIEW_WINDOW_OFFSET, PREVIEW_WIDTH, PREVIEW_HEIGHT)
+    ctx.crosshair_overlay = WL.create_crosshair_overlay(
+        ctx.camera,
+        radius=radius,
+        thickness=WL.CIRCLE_THICKNESS,
+        color_bgr=WL.CIRCLE_COLOR,
+        alpha=PREVIEW_ALPHA,
+        preview_window=preview_rect,
+        camera_lock=CAMERA_LOCK,
+        existing_overlay=ctx.crosshair_overlay
+    )
+
+
+def handle_preview_moved(ctx, event, values):
+    # The preview window was dragged (sent by the WindowTracker), move the crosshair overlay with it
+    global PREVIOUS_CAMERA_PREVIEW_X, PREVIOUS_CAMERA_PREVIEW_Y
+    x_win_preview, y_win_preview, width, height = values[PREVIEW_MOVED_EVENT]
+    if (PREVIOUS_CAMERA_PREVIEW_X == x_win_preview) and (PREVIOUS_CAMERA_PREVIEW_Y == y_win_preview):
+        return
+    PREVIOUS_CAMERA_PREVIEW_X = x_win_preview
+    PREVIOUS_CAMERA_PREVIEW_Y = y_win_preview
+    
+    # Note: picamera2 preview window positioning requires DRM/Qt implementation
+    # Camera is already started, preview handling differs in picamera2
+    # Window coordinates are not directly supported like in picamera1
+    if values.get("--XHAIR_ON--", True):
+        show_crosshair_overlay(ctx, get_crosshair_radius(values), x_win_preview, y_win_preview)
+
+
+# Hardware an experiment uses for its whole run
+EXPERIMENT_RESOURCES = (CE.RESOURCE_PRINTER, CE.RESOURCE_CAMERA)
+
+
+def run_with_resources(executor, func, *args):
+    # Experiment thread target: runs func, then gives back the printer/camera claimed by the handler
+    global is_running_experiment
+    try:
+        func(*args)
+    finally:
+        executor.release(EXPERIMENT_RESOURCES)
+        is_running_experiment = False
+
+
+# Tab 1 (Experiment):
+def handle_start_experiment(ctx, event, values):
+    global is_running_experiment
+    print("You pressed Start Experiment")
+    if is_running_experiment:
+        print("An experiment is already running, stop it first")
+        return
+    # Z stack, Get Location, Home, ... still using the printer or camera: don't start
+    if not ctx.executor.claim("Start Experiment", EXPERIMENT_RESOURCES):
+        return
+    
+    # Set is_running_experiment to True, we are now running an experiment
+    is_running_experiment = True
+    ctx.thread_event.clear()
+    ctx.pause_event.clear()
+    
+    # Uncomment to see your CSV File (is it the correct path?)
+    # print("CSV File:", values[OPEN_CSV_FILEBROWSE_KEY])
+    
+    # Disable "Start Experiment" Button, Enable "Stop Experiment" Button
+    ctx.set_experiment_buttons(True)
+    
+    # Create actual experiment_thread
+    ctx.experiment_thread = threading.Thread(
+        target=run_with_resources,
+        args=(ctx.executor, run_experiment2, event, values, ctx.thread_event, ctx.pause_event, ctx.camera,
+              ctx.preview_win_id),
+        daemon=True
+    )
+    ctx.experiment_thread.start()
+
+
+def handle_start_plate_jobs(ctx, event, values):
+    global is_running_experiment
+    print("You pressed Start Plate Jobs")
+    jobs_filename = values[PLATE_JOBS_KEY]
+    if is_running_experiment:
+        print("An experiment is already running, stop it first")
+        return
+    if not os.path.isfile(jobs_filename):
+        print(f"Plate jobs file not found: {jobs_filename}")
+        return
+    if not ctx.executor.claim("Start Plate Jobs", EXPERIMENT_RESOURCES):
+        return
+    is_running_experiment = True
+    ctx.thread_event.clear()
+    ctx.pause_event.clear()
+    ctx.set_experiment_buttons(True)
+    
+    ctx.experiment_thread = threading.Thread(
+        target=run_with_resources,
+        args=(ctx.executor, run_plate_jobs, jobs_filename, values, ctx.thread_event, ctx.pause_event, ctx.camera),
+        daemon=True
+    )
+    ctx.experiment_thread.start()
+
+
+def handle_estimate_experiment(ctx, event, values):
+    print("You pressed Estimate")
+    show_experiment_estimate(values)
+
+
+def handle_stop_experiment(ctx, event, values):
+    global is_running_experiment
+    print("You pressed Stop Experiment")
+    print("Ending experiment after current run")
+    is_running_experiment = False
+    ctx.set_experiment_buttons(False)
+    
+    # Stop thread, set prepares stopping
+    ctx.thread_event.set()
+    ctx.pause_event.clear()
+    
+    # Stop experiemnt_thread
+    ctx.experiment_thread.join(timeout=1)
+
+
+def handle_pause_experiment(ctx, event, values):
+    print("You pressed Pause Experiment")
+    ctx.pause_event.set()
+    ctx.update_widget(PAUSE_EXPERIMENT, disabled=True)
+    ctx.update_widget(RESUME_EXPERIMENT, disabled=False)
+
+
+def handle_resume_experiment(ctx, event, values):
+    print("You pressed Resume Experiment")
+    ctx.pause_event.clear()
+    ctx.update_widget(PAUSE_EXPERIMENT, disabled=False)
+    ctx.update_widget(RESUME_EXPERIMENT, disabled=True)
+
+
+def handle_pic_save_folder(ctx, event, values):
+    global PIC_SAVE_FOLDER
+    PIC_SAVE_FOLDER = values[PIC_SAVE_FOLDER_KEY]
+    print(f"Save folder: {PIC_SAVE_FOLDER}")
+
+
+# Worker thread results, and buttons under the tabs
+def handle_command_result(ctx, event, values):
+    # Progress/result from a command running on the worker thread
+    handle_command_event(values[CE.COMMAND_EVENT], ctx.window, ctx.corners)
+
+
+def handle_pic(ctx, event, values):
+    print("You Pushed Pic Button")
+    submit_command(ctx.executor, "Pic", get_picture, ctx.camera, resources=[CE.RESOURCE_CAMERA])
+
+
+def handle_pic_x_10(ctx, event, values):
+    print("Pic x 10")
+    x = 10
+    delay_seconds = 5
+    submit_command(ctx.executor, "Pic x 10", get_x_pictures, x, delay_seconds, ctx.camera,
+                   resources=[CE.RESOURCE_CAMERA], with_progress=True)
+
+
+def handle_vid(ctx, event, values):
+    print("You Pushed Vid Button")
+    # Take a Video
+    submit_command(ctx.executor, "Vid", get_video, ctx.camera, resources=[CE.RESOURCE_CAMERA])
+
+
+# Tab 2 (Movement)
+def handle_get_current_location(ctx, event, values):
+    print("===================================")
+    print("You pressed Get Current Location!")
+    submit_command(ctx.executor, "Get Current Location", get_current_location2, resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_relative_move(ctx, event, values):
+    # If any of the direction buttons are pressed, move extruder
+    #  in that direction using the increment radio amounts (on the command worker, not the GUI thread)
+    submit_command(ctx.executor, event, run_relative, event, dict(values), resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_run_gcode(ctx, event, values):
+    # Run GCODE found in the GCode  InputText box (G28 etc. would freeze the window on the GUI thread)
+    gcode = values["-GCODE_INPUT-"]
+    submit_command(ctx.executor, f"G-code {gcode}", printer.run_gcode, gcode, resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_clear_gcode(ctx, event, values):
+    # Clear GCode InputText box
+    ctx.window["-GCODE_INPUT-"].update("")
+
+
+def handle_save_location(ctx, event, values):
+    print(f"You pressed: {SAVE_LOC_BUTTON}")
+    submit_command(ctx.executor, SAVE_LOC_BUTTON, save_current_location, resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_home(ctx, event, values):
+    # Always home (the axes may have been moved by hand), updates the saved homed state
+    submit_command(ctx.executor, HOME_TEXT, printer.home_if_needed, force_home=True, resources=[CE.RESOURCE_PRINTER])
+
+
+# Define function to move the plate forward in Y to clear space for swapping
+def move_plate_out(target_y=230):
+    try:
+        printer.run_gcode_list(["G90", f"G0Y{target_y}"])
+        print(f"Moved plate to Y={target_y} for plate change.")
+    except Exception as e:
+        print(f"Failed to move for plate change: {e}")
+
+
+def handle_change_plate(ctx, event, values):
+    submit_command(ctx.executor, event, move_plate_out, resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_set_corner(ctx, event, values):
+    # Location is filled in by handle_command_event when the worker is done
+    submit_command(ctx.executor, event, get_current_location2, resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_generate_snake(ctx, event, values):
+    try:
+        rows = int(values.get("--NUM_ROWS--", "0"))
+        cols = int(values.get("--NUM_COLS--", "0"))
+    except ValueError:
+        print("Rows/Cols must be integers")
+        return
+    missing = [k for k, v in ctx.corners.items() if v is None]
+    if missing:
+        print(f"Missing corners: {missing}")
+        return
+    z_override = None
+    z_str = values.get("--Z_OVERRIDE--", "").strip()
+    if len(z_str):
+        try:
+            z_override = float(z_str)
+        except ValueError:
+            print("Z Override must be a number")
+            return
+    default_dir = os.path.join(os.getcwd(), "testing", "Well_Location")
+    outfile = os.path.join(default_dir, "snake_path.csv")
+    generate_snake_csv(ctx.corners, rows, cols, outfile, z_override=z_override)
+    ctx.last_snake_csv = outfile
+    print(f"Snake path saved to {outfile}")
+
+
+def handle_apply_z(ctx, event, values):
+    z_str = values.get("--Z_OVERRIDE--", "").strip()
+    if not len(z_str):
+        print("Enter a Z Override value first")
+        return
+    try:
+        z_override = float(z_str)
+    except ValueError:
+        print("Z Override must be a number")
+        return
+    # Rewrite last_snake_csv with new Z
+    if not os.path.isfile(ctx.last_snake_csv):
+        print("No snake_path.csv found yet; generate first.")
+        return
+    with open(ctx.last_snake_csv, newline="") as f:
+        reader = csv.reader(f)
+        rows_list = list(reader)
+    if len(rows_list) < 2:
+        print("Existing snake file is empty.")
+        return
+    # Simply rewrite the file with same XY, new Z
+    with open(ctx.last_snake_csv, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["image#", "Xcoord", "Ycoord", "Zcoord"])
+        for row in rows_list[1:]:
+            if len(row) < 4:
+                continue
+            writer.writerow([row[0], row[1], row[2], f"{z_override:.2f}"])
+    print(f"Updated Z to {z_override:.2f} in {ctx.last_snake_csv}")
+
+
+def handle_crosshair_radius(ctx, event, values):
+    # Crosshair controls (Movement tab)
+    current_rad = get_crosshair_radius(values)
+    if event == "--XHAIR_INC--":
+        current_rad += 1
+    elif event == "--XHAIR_DEC--":
+        current_rad = max(1, current_rad - 1)
+    WL.CIRCLE_RADIUS = current_rad
+    ctx.window["--XHAIR_RADIUS--"].update(str(current_rad))
+    values["--XHAIR_RADIUS--"] = str(current_rad)
+    if values.get("--XHAIR_ON--", True):
+        # Update overlay on preview
+        x_win_preview, y_win_preview = ctx.get_preview_location()
+        show_crosshair_overlay(ctx, current_rad, x_win_preview, y_win_preview)
+    else:
+        remove_crosshair_overlay(ctx)
+
+
+def handle_crosshair_on(ctx, event, values):
+    if values.get("--XHAIR_ON--", True):
+        x_win_preview, y_win_preview = ctx.get_preview_location()
+        show_crosshair_overlay(ctx, get_crosshair_radius(values), x_win_preview, y_win_preview)
+    else:
+        remove_crosshair_overlay(ctx)
+
+
+# TAB 3 (Camera)
+def handle_update_camera(ctx, event, values):
+    global PIC_WIDTH, PIC_HEIGHT
+    print("Updating Camera Settings...")
+    
+    # Update Camera Rotation Angle
+    camera_rotation_value = values[CAMERA_ROTATION_KEY]
+    camera_rotation_angle = int(camera_rotation_value)
+    
+    #print(f"Cam Rotation: {camera_rotation_angle}")
+    ctx.camera.rotation = camera_rotation_angle
+    
+    # Update Still Image Capture Resolution:
+    new_pic_width = int(values[PIC_WIDTH_KEY])
+    new_pic_height = int(values[PIC_HEIGHT_KEY])
+    print(f"New Still Image Resolution: {new_pic_width, new_pic_height}")
+    PIC_WIDTH = new_pic_width
+    PIC_HEIGHT = new_pic_height
+
+
+def handle_start_preview(ctx, event, values):
+    global PREVIEW_LOC_X, PREVIEW_LOC_Y, PREVIEW_WIDTH, PREVIEW_HEIGHT, PREVIEW_ALPHA
+    print("Starting Preview With Settings")
+    try:
+        ctx.camera.stop_preview()
+    except Exception:
+        pass
+    try:
+        prev_width = int(values[PREVIEW_WIDTH_KEY])
+        prev_height = int(values[PREVIEW_HEIGHT_KEY])
+        prev_loc_x = int(values[PREVIEW_LOC_X_KEY])
+        prev_loc_y = int(values[PREVIEW_LOC_Y_KEY])
+        alpha_val = int(values[ALPHA_KEY])
+    except (TypeError, ValueError):
+        print("Invalid preview settings")
+        return
+    PREVIEW_LOC_X = prev_loc_x
+    PREVIEW_LOC_Y = prev_loc_y
+    PREVIEW_WIDTH = prev_width
+    PREVIEW_HEIGHT = prev_height
+    PREVIEW_ALPHA = alpha_val
+    move_window_pid(ctx.preview_win_id, prev_loc_x, prev_loc_y - PREVIEW_WINDOW_OFFSET)
+    # Picamera2: use True to autodetect preview; kwargs are x, y, width, height (no alpha/fullscreen/window)
+    ctx.camera.start_preview(True, x=prev_loc_x, y=prev_loc_y, width=prev_width, height=prev_height)
+    x_win, y_win = ctx.get_preview_location()
+    print(f"x_win:{x_win}, y_win:{y_win}")
+
+
+def handle_stop_preview(ctx, event, values):
+    print("Stopping Preview")
+    try:
+        ctx.camera.stop_preview()
+    except Exception:
+        pass
+
+
+def handle_set_exposure_mode(ctx, event, values):
+    set_exposure_mode(event, values, ctx.window, ctx.camera)
+
+
+# TAB 4 (Z Stack)
+def handle_start_z_stack(ctx, event, values):
+    print(f"You pressed button: {START_Z_STACK_CREATION_TEXT}")
+    z_start = float(values[Z_START_KEY])
+    z_end = float(values[Z_END_KEY])
+    z_inc = float(values[Z_INC_KEY])
+    
+    # If nothing chosen, use default folder location:
+    if len(values[SAVE_FOLDER_KEY]) == 0:
+        save_folder_location = PIC_SAVE_FOLDER
+    else:
+        save_folder_location = values[SAVE_FOLDER_KEY]
+    print(f"save_folder_location: {save_folder_location}")
+    submit_command(ctx.executor, START_Z_STACK_CREATION_TEXT, create_z_stack, z_start, z_end, z_inc, save_folder_location, ctx.camera,
+                   resources=[CE.RESOURCE_PRINTER, CE.RESOURCE_CAMERA], with_progress=True)
+
+
+def handle_numeric_input(ctx, event, values):
+    # Check Input Text for integers only
+    check_for_digits_in_key(event, ctx.window, event, values)
+
+
+def handle_use_profile(ctx, event, values):
+    # Switch printer profile without restarting the GUI
+    name = values[PRINTER_PROFILE_KEY]
+    # The same profile again reconnects if its connection settings were edited
+    if name == C.PROFILE.key and not C.has_connection_changed():
+        return
+    submit_command(ctx.executor, USE_PROFILE_TEXT, switch_printer_profile, name, resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_idle(ctx, event, values):
+    # Pick up edits to connection_settings.yaml (only an os.stat() unless the file changed)
+    if C.reload_if_changed():
+        ctx.window[PRINTER_PROFILE_KEY].update(values=C.get_profile_names(), value=C.PROFILE.key)
+        if C.has_connection_changed():
+            # New port/baudrate: reconnect the same way as switching profiles, never during an experiment
+            if is_running_experiment:
+                print("Not reconnecting during the experiment, select the printer profile again afterwards")
+            else:
+                submit_command(ctx.executor, USE_PROFILE_TEXT, switch_printer_profile, C.PROFILE.key,
+                               resources=[CE.RESOURCE_PRINTER])
+
+
+def handle_well_location_calculator(ctx, event, values):
+    # Well location calculator tab events
+    WLC.event_manager(event, values, ctx.window)
+
+
+# Event key -> handler
+EVENT_HANDLERS = {
+    START_EXPERIMENT: handle_start_experiment,
+    START_PLATE_JOBS: handle_start_plate_jobs,
+    ESTIMATE_EXPERIMENT: handle_estimate_experiment,
+    STOP_EXPERIMENT: handle_stop_experiment,
+    PAUSE_EXPERIMENT: handle_pause_experiment,
+    RESUME_EXPERIMENT: handle_resume_experiment,
+    PIC_SAVE_FOLDER_KEY: handle_pic_save_folder,
+    CE.COMMAND_EVENT: handle_command_result,
+    PREVIEW_MOVED_EVENT: handle_preview_moved,
+    "Pic": handle_pic,
+    "Pic x 10": handle_pic_x_10,
+    "Vid": handle_vid,
+    "Get Current Location": handle_get_current_location,
+    "Run": handle_run_gcode,
+    "Clear": handle_clear_gcode,
+    SAVE_LOC_BUTTON: handle_save_location,
+    "--CHANGE_PLATE--": handle_change_plate,
+    HOME_TEXT: handle_home,
+    "--GEN_SNAKE--": handle_generate_snake,
+    "--APPLY_Z--": handle_apply_z,
+    "--XHAIR_ON--": handle_crosshair_on,
+    UPDATE_CAMERA_TEXT: handle_update_camera,
+    START_PREVIEW: handle_start_preview,
+    STOP_PREVIEW: handle_stop_preview,
+    SET_EXPOSURE_MODE: handle_set_exposure_mode,
+    START_Z_STACK_CREATION_TEXT: handle_start_z_stack,
+    USE_PROFILE_TEXT: handle_use_profile,
+    sg.TIMEOUT_EVENT: handle_idle,
+}
+EVENT_HANDLERS.update({key: handle_relative_move for key in [X_PLUS, X_MINUS, Y_PLUS, Y_MINUS, Z_PLUS, Z_MINUS]})
+EVENT_HANDLERS.update({key: handle_set_corner for key in CORNER_BUTTON_KEYS})
+EVENT_HANDLERS.update({key: handle_crosshair_radius for key in ["--XHAIR_INC--", "--XHAIR_DEC--", "--XHAIR_RADIUS--"]})
+EVENT_HANDLERS.update({key: handle_well_location_calculator for key in WLC.WELL_LOCATION_EVENTS + [WLC.ROW_KEY, WLC.COL_KEY, WLC.SAVE_FOLDER_KEY]})
+# Numeric-only inputs (the radius input keeps its crosshair handler, it is not in NUMERIC_KEYS)
+EVENT_HANDLERS.update({key: handle_numeric_input for key in NUMERIC_KEYS if key not in EVENT_HANDLERS})
+# === End Main Window Event Handlers ===
+
+
 # define main function
 def main():
     
@@ -1495,8 +2711,10 @@ def main():
 
     # Setup Camera
     # initialize picamera2 (Raspberry Pi 4)
+    from picamera2 import Picamera2
     camera = Picamera2()
-    preview_config = camera.create_preview_configuration(main={"size": (VID_WIDTH, VID_HEIGHT)})
+    # lores stream is used by adaptive dwell to check if the image stopped moving
+    preview_config = camera.create_preview_configuration(main={"size": (VID_WIDTH, VID_HEIGHT)}, lores={"size": LORES_RES})
     camera.configure(preview_config)
     camera.start()
     
@@ -1536,10 +2754,11 @@ def main():
     # allow the camera to warmup
     time.sleep(0.1)
     
-    # Setup 3D Printer
+    # Setup 3D Printer (opens the serial port)
+    printer.connect()
     csv_filename = "testing/file2.csv"
     path_list = printer.get_path_list_csv(csv_filename)
-    printer.initial_setup(path_list)
+    printer.initial_setup(path_list, force_home=FORCE_HOME_ARG in sys.argv[1:])
     
     
     # Move Extruder Out Of The Way
@@ -1560,14 +2779,6 @@ def main():
         writer.writerow(["X", "Y", "Z"])
     
     # === Camera Preview Startup ===
-    global PREVIOUS_CAMERA_PREVIEW_X, PREVIOUS_CAMERA_PREVIEW_Y
-    global PREVIEW_LOC_X, PREVIEW_LOC_Y, PREVIEW_WIDTH, PREVIEW_HEIGHT, PREVIEW_ALPHA
-    # Initialize preview_win_id to store it when GUI is up.
-    preview_win_id = 0
-    
-    # Initialize is_initial_startup flag as True
-    is_initial_startup = True
-    
     # Preview Window Creation and Tracking
     # Get random/unique x/y window starting position (top-left)
     # loc_x_list, loc_y_list = get_xy_loc_of_all_windows()
@@ -1598,11 +2809,24 @@ def main():
         [sg.Radio(EXP_RADIO_PIC_TEXT, EXP_RADIO_GROUP, default=True, key=EXP_RADIO_PIC_KEY),
          sg.Radio(EXP_RADIO_VID_TEXT, EXP_RADIO_GROUP, default=False, key=EXP_RADIO_VID_KEY),
          sg.Radio(EXP_RADIO_PREVIEW_TEXT, EXP_RADIO_GROUP, default=False, key=EXP_RADIO_PREVIEW_KEY)],
+        [sg.Text("Video clip (sec):"), sg.InputText(C.VIDEO_CLIP_TIME, size=(4, 1), enable_events=True, key=VIDEO_CLIP_TIME_KEY),
+         sg.Text("Mbps:"), sg.InputText(C.VIDEO_BITRATE // 1000000, size=(3, 1), enable_events=True, key=VIDEO_BITRATE_KEY),
+         sg.Text("Size:"), sg.InputText(C.VIDEO_WIDTH, size=(5, 1), enable_events=True, key=VIDEO_WIDTH_KEY),
+         sg.InputText(C.VIDEO_HEIGHT, size=(5, 1), enable_events=True, key=VIDEO_HEIGHT_KEY),
+         sg.Combo(VC.CONTAINERS, default_value=C.VIDEO_CONTAINER, readonly=True, key=VIDEO_CONTAINER_KEY)],
+        [sg.Text("Sampling:"), sg.Combo(SS.SAMPLING_MODES, default_value=SS.SAMPLING_ALL, readonly=True, key=SAMPLING_MODE_KEY),
+         sg.Text("Groups:"), sg.InputText("2", size=(3, 1), enable_events=True, key=SAMPLING_GROUPS_KEY)],
+        [sg.Checkbox(ADAPTIVE_DWELL_TEXT, default=False, key=ADAPTIVE_DWELL_KEY)],
         [sg.Text("Save Images to Folder:"),
          sg.In(default_text="/media/pi/Seagate Portable Drive", size=(25, 1), enable_events=True, key=PIC_SAVE_FOLDER_KEY),
          sg.FolderBrowse(initial_folder="/media/pi/Seagate Portable Drive")],
-        [sg.Button(START_EXPERIMENT, disabled=True), sg.Button(PAUSE_EXPERIMENT, disabled=True),
-         sg.Button(RESUME_EXPERIMENT, disabled=True), sg.Button(STOP_EXPERIMENT, disabled=True)]
+        [sg.Button(START_EXPERIMENT, disabled=True), sg.Button(ESTIMATE_EXPERIMENT), sg.Button(PAUSE_EXPERIMENT, disabled=True),
+         sg.Button(RESUME_EXPERIMENT, disabled=True), sg.Button(STOP_EXPERIMENT, disabled=True)],
+        [sg.HorizontalSeparator()],
+        [sg.Text(PLATE_JOBS_PROMPT), sg.Input(key=PLATE_JOBS_KEY, size=(35, 1)),
+         sg.FileBrowse(initial_folder=os.path.join(os.getcwd(), "testing"), file_types=(("YAML", "*.yaml"),),
+                       target=PLATE_JOBS_KEY),
+         sg.Button(START_PLATE_JOBS)]
     ]
     
     # Tab 2: Movement Tab + Crosshair overlay + Corner capture
@@ -1624,7 +2848,7 @@ def main():
         [sg.Button("Generate Snake CSV", key="--GEN_SNAKE--")]
     ]
 
-    tab_2_layout = [ [sg.Text("", size=(3, 1)), sg.Button("Get Current Location", size=(20, 1)), sg.Button("Change Plate", key="--CHANGE_PLATE--", size=(12,1)), sg.Button(SAVE_LOC_BUTTON)],
+    tab_2_layout = [ [sg.Text("", size=(3, 1)), sg.Button("Get Current Location", size=(20, 1)), sg.Button("Change Plate", key="--CHANGE_PLATE--", size=(12,1)), sg.Button(SAVE_LOC_BUTTON), sg.Button(HOME_TEXT)],
                      [sg.Radio(RELATIVE_TENTH_TEXT, RADIO_GROUP, default=False, key=RELATIVE_TENTH_KEY),
                         sg.Radio(RELATIVE_ONE_TEXT, RADIO_GROUP, default=True, key=RELATIVE_ONE_KEY),
                         sg.Radio(RELATIVE_TEN_TEXT, RADIO_GROUP, default=False, key=RELATIVE_TEN_KEY)
@@ -1641,6 +2865,9 @@ def main():
     
     # Setup Tab/GUI Layout
     tab_3_layout = [
+        [sg.Text("Printer Profile:"),
+         sg.Combo(C.get_profile_names(), default_value=C.PROFILE.key, readonly=True, key=PRINTER_PROFILE_KEY),
+         sg.Button(USE_PROFILE_TEXT)],
         [sg.Text("Camera Rotation (in Degrees):"), sg.InputText("180", size=(10, 1), enable_events=True, key=CAMERA_ROTATION_KEY)],
         [sg.Text("Set Image Capture Resolution:")],
         [sg.Text("Pic Width (in pixels):"), sg.InputText(PIC_WIDTH, size=(10, 1), enable_events=True, key=PIC_WIDTH_KEY)],
@@ -1701,468 +2928,62 @@ def main():
     # To the right, xy, and z
     # Below camera Feed: Show Current Location, Get Current Location Button
     
-    # Threading Setup
-    # Initialize empty experiment_thread object, will be used with "Start Experiment" is pushed
-    experiment_thread = threading.Thread()
-    
-    # Initialize threading event (Allows you to stop the thread)
-    thread_event = threading.Event()
-    pause_event = threading.Event()
-
-    crosshair_overlay = None
-    corners = {"TL": None, "TR": None, "BL": None, "BR": None}
-    last_snake_csv = os.path.join(os.getcwd(), "testing", "Well_Location", "snake_path.csv")
-
     # Create window and show it without plot
     window = sg.Window("3D Printer GUI Test", layout, location=(640, 36))
+    # Window has to be finalized before other threads can send it events
+    window.finalize()
+    
+    # Runs Z stack, pictures and location commands on a worker thread, so the GUI never freezes
+    executor = CE.CommandExecutor(window)
     
+    # State shared by the event handlers (threads, overlay, corners, ...)
+    ctx = GuiContext(window, camera, executor)
     
-    # Create experiment_run_counter
-    experiment_run_counter = 0
     # Create Boolean is_running_experiment, default False
     is_running_experiment = False
-    # Initialize well_counter to 0 (used for running experiment, going through GCode location list)
     
-    # Initialize current_location_dictionary to X=0, Y=0, Z=0
+    # Initial values of the main window. read_all_windows only returns values for the window
+    # that had the event, so keep the last values of the main window around.
+    event, values = window.read(timeout=0)
+    window_p.read(timeout=0)
+    
+    # Camera Preview Initial Startup
+    # Get PID of Preview Window
+    ctx.preview_win_id = get_window_pid(x_start, y_start)
+    
+    # Change Camera Preview Window Name
+    new_window_name = "Camera Preview Window"
+    change_window_name(ctx.preview_win_id, new_window_name)
+    # Move This Window to where I want it (0,0)?
+    x_new = 0
+    y_new = 36
+    move_window_pid(ctx.preview_win_id, x_new, y_new)
+    ctx.start_window_tracker()
     
-    # Initialize folder_path_sample to "" ("Start Experiment" will create unique folder name)
-    # Throttle preview window polling to reduce CPU use
-    preview_check_interval = 0.2
-    last_preview_check = time.monotonic()
     # **** Note: This for loop may cause problems if the camera feed dies, it will close everything? ****
     while True:
-        event, values = window.read(timeout=20)
-        event_p, values_p = window_p.read(timeout=20)
+        # One read for both windows. Sleeps until an event (or a thread's write_event_value,
+        # like the preview window moving), or until the idle timeout.
+        event_window, event, event_values = sg.read_all_windows(timeout=IDLE_TIMEOUT_MS)
         # Exit as soon as either window is closed so we never read from a closed window
-        if event == sg.WIN_CLOSED or event_p == sg.WIN_CLOSED:
+        if event == sg.WIN_CLOSED:
             break
-        # Camera Preview Initial Startup
-        # Setup if/else initial_startup condition
-        # If initial startup,
-        if is_initial_startup == True:
-            # print(f"is_initial_startup: {is_initial_startup}")
-            # Get PID of Preview Window
-            preview_win_id = get_window_pid(x_start, y_start)
-            
-            # Change Camera Preview Window Name
-            new_window_name = "Camera Preview Window"
-            change_window_name(preview_win_id, new_window_name)
-            # Move This Window to where I want it (0,0)?
-            x_new = 0
-            y_new = 36
-            move_window_pid(preview_win_id, x_new, y_new)
-            
-            # Start Camera Too PREVIEW_LOC_X, PREVIEW_LOC_Y, PREVIEW_WIDTH, PREVIEW_HEIGHT, PREVIEW_ALPHA
-            # Note: picamera2 preview window positioning requires DRM/Qt implementation
-            # Window coordinates are not directly supported like in picamera1
-            # Camera is already started, preview handling differs in picamera2
-            
-            # Change is_initial_startup to False
-            is_initial_startup = False
-        else:
-            now = time.monotonic()
-            if now - last_preview_check >= preview_check_interval:
-                last_preview_check = now
-                x_win_preview, y_win_preview = get_window_location_from_pid(preview_win_id)
-                if (PREVIOUS_CAMERA_PREVIEW_X != x_win_preview) or (PREVIOUS_CAMERA_PREVIEW_Y != y_win_preview):
-                    PREVIOUS_CAMERA_PREVIEW_X = x_win_preview
-                    PREVIOUS_CAMERA_PREVIEW_Y = y_win_preview
-                
-                    # Note: picamera2 preview window positioning requires DRM/Qt implementation
-                    # Camera is already started, preview handling differs in picamera2
-                    # Window coordinates are not directly supported like in picamera1
-                    # If crosshair overlay is on, move it with the preview window
-                    if values.get("--XHAIR_ON--", True):
-                        try:
-                            current_rad = int(values.get("--XHAIR_RADIUS--", WL.CIRCLE_RADIUS))
-                        except (TypeError, ValueError):
-                            current_rad = WL.CIRCLE_RADIUS
-                        if crosshair_overlay:
-                            with CAMERA_LOCK:
-                                if hasattr(camera, 'remove_overlay'):
-                                    camera.remove_overlay(crosshair_overlay)
-                                else:
-                                    camera.set_overlay(None)
-                        preview_rect = (x_win_preview, y_win_preview + PREVIEW_WINDOW_OFFSET, PREVIEW_WIDTH, PREVIEW_HEIGHT)
-                        crosshair_overlay = WL.create_crosshair_overlay(
-                            camera,
-                            radius=current_rad,
-                            thickness=WL.CIRCLE_THICKNESS,
-                            color_bgr=WL.CIRCLE_COLOR,
-                            alpha=PREVIEW_ALPHA,
-                            preview_window=preview_rect,
-                            camera_lock=CAMERA_LOCK,
-                            existing_overlay=None
-                        )
-        
-        # Check Input Text for integers only
-        
-        for numeric_key in NUMERIC_KEYS:
-            check_for_digits_in_key(numeric_key, window, event, values)
-        
-        # Call Get Current Location Manager Function
-        # Print Current Location
-        
-        # TODO: Create new thread for Current Location display?
-        
-        # Convert captured frame to array format, then overwrite frame variable (temporary solution)
-        # frame = frame.array
-        
-        # If in experiment mode, resize image if it is larger than when rawCapture was created
-        # if is_running_experiment == True:
-            # Resize frame to size of window, maybe
-            # rawCapture = PiRGBArray(camera, size=(VID_WIDTH, VID_HEIGHT))
-            # frame = cv2.resize(frame, (VID_WIDTH, VID_HEIGHT))
-        
-        # TODO: Add in image resizer if in experiment mode. Temp fix to allow for max image resolution while running experiment.
-        
-        # If event is not closing, check for CSV file. This is to prevent the closing GUI crash.
-        if event != sg.WIN_CLOSED:
-            # ---- CSV File Checker and "Start Experiment" Enable/Disable If/Else logic
-            # Check if CSV file Exists (length is 0 if CSV not loaded)
-            #  Enable "Start Experiment" if true, else disable "Start Experiment"
-            if len(values[OPEN_CSV_FILEBROWSE_KEY]) != 0 and is_running_experiment == False:
-                # print("CSV File Exists")
-                # Enable "Start Experiment" button
-                window[START_EXPERIMENT].update(disabled=False)
-                # print("values[OPEN_CSV_FILEBROWSE_KEY]:", values[OPEN_CSV_FILEBROWSE_KEY])
-                # print(len(values[OPEN_CSV_FILEBROWSE_KEY]))
-                # Disable "Stop Experiment" button
-                window[STOP_EXPERIMENT].update(disabled=True)
-            else:
-                # print("CSV File Does Not Exist")
-                # Disable "Start Experiment" button
-                window[START_EXPERIMENT].update(disabled=True)
-        
-        # ---- Main GUI Window If/elif chain ----
-        # Tab 1 (Experiment):
-        if event == START_EXPERIMENT:
-            print("You pressed Start Experiment")
-            
-            # Set is_running_experiment to True, we are now running an experiment
-            is_running_experiment = True
-            thread_event.clear()
-            pause_event.clear()
-            
-            # Uncomment to see your CSV File (is it the correct path?)
-            # print("CSV File:", values[OPEN_CSV_FILEBROWSE_KEY])
-            
-            # Disable "Start Experiment" Button
-            window[START_EXPERIMENT].update(disabled=True)
-            # Enable "Stop Experiment" Button
-            window[STOP_EXPERIMENT].update(disabled=False)
-            window[PAUSE_EXPERIMENT].update(disabled=False)
-            window[RESUME_EXPERIMENT].update(disabled=True)
-            
-            # Create actual experiment_thread
-            experiment_thread = threading.Thread(
-                target=run_experiment2,
-                args=(event, values, thread_event, pause_event, camera, preview_win_id),
-                daemon=True
-            )
-            experiment_thread.start()
-            
-            # Create Unique Folder, Get that Unique Folder's Name
-            
-            # Non-Thread Version of Running Experiment
-            # run_experiment_gui(values, camera)
-            
-        elif event == STOP_EXPERIMENT:
-            print("You pressed Stop Experiment")
-            print("Ending experiment after current run")
-            experiment_run_counter = 0
-            is_running_experiment = False
-            # Enable "Start Experiment" Button
-            window[START_EXPERIMENT].update(disabled=False)
-            # Disable "Stop Experiment" Button
-            window[STOP_EXPERIMENT].update(disabled=True)
-            window[PAUSE_EXPERIMENT].update(disabled=True)
-            window[RESUME_EXPERIMENT].update(disabled=True)
-            
-            # Stop thread, set prepares stopping
-            thread_event.set()
-            pause_event.clear()
-            
-            # Stop experiemnt_thread
-            experiment_thread.join(timeout=1)
-        
-        elif event == PAUSE_EXPERIMENT:
-            print("You pressed Pause Experiment")
-            pause_event.set()
-            window[PAUSE_EXPERIMENT].update(disabled=True)
-            window[RESUME_EXPERIMENT].update(disabled=False)
-        
-        elif event == RESUME_EXPERIMENT:
-            print("You pressed Resume Experiment")
-            pause_event.clear()
-            window[PAUSE_EXPERIMENT].update(disabled=False)
-            window[RESUME_EXPERIMENT].update(disabled=True)
-            
-        elif event == "Pic":
-            print("You Pushed Pic Button")
-            get_picture(camera)
-        elif event == "Pic x 10":
-            print("Pic x 10")
-            x = 10
-            delay_seconds = 5
-            get_x_pictures(x, delay_seconds, camera)
-            
-        elif event == "Vid":
-            print("You Pushed Vid Button")
-            # Take a Video
-            get_video(camera)
-            
-        # Tab 2 (Movement)
-        elif event == "Get Current Location":
-            print("===================================")
-            print("You pressed Get Current Location!")
-            get_current_location2()
-        elif event in [X_PLUS, X_MINUS, Y_PLUS, Y_MINUS, Z_PLUS, Z_MINUS]:
-            # If any of the direction buttons are pressed, move extruder
-            #  in that direction using the increment radio amounts
-            run_relative(event, values)
-        elif event == "Run":
-            # Run GCODE found in the GCode  InputText box
-            printer.run_gcode(values["-GCODE_INPUT-"])
-        elif event == "Clear":
-            # Clear GCode InputText box
-            window.FindElement("-GCODE_INPUT-").Update("")
-        elif event == UPDATE_CAMERA_TEXT:
-            # TAB 3 elif statements
-            print("Updating Camera Settings...")
-            
-            # Update Camera Rotation Angle
-            camera_rotation_value = values[CAMERA_ROTATION_KEY]
-            camera_rotation_angle = int(camera_rotation_value)
-            
-            #print(f"Cam Rotation: {camera_rotation_angle}")
-            camera.rotation = camera_rotation_angle
-            
-            # Update Still Image Capture Resolution:
-            # global PIC_WIDTH, PIC_HEIGHT
-            
-            new_pic_width = int(values[PIC_WIDTH_KEY])
-            new_pic_height = int(values[PIC_HEIGHT_KEY])
-            print(f"New Still Image Resolution: {new_pic_width, new_pic_height}")
-            PIC_WIDTH = new_pic_width
-            PIC_HEIGHT = new_pic_height
-            #print(f"Global: {PIC_WIDTH, PIC_HEIGHT}")
-        elif event == START_Z_STACK_CREATION_TEXT:
-            print(f"You pressed button: {START_Z_STACK_CREATION_TEXT}")
-            z_start = float(values[Z_START_KEY])
-            z_end = float(values[Z_END_KEY])
-            z_inc = float(values[Z_INC_KEY])
-            
-            # If nothing chosen, use default folder location:
-            if len(values[SAVE_FOLDER_KEY]) == 0:
-                save_folder_location = PIC_SAVE_FOLDER
-            else:
-                save_folder_location = values[SAVE_FOLDER_KEY]
-            print(f"save_folder_location: {save_folder_location}")
-            create_z_stack(z_start, z_end, z_inc, save_folder_location, camera)
-        elif event == SAVE_LOC_BUTTON:
-            print(f"You pressed: {SAVE_LOC_BUTTON}")
-            save_current_location()
-        elif event == "--CHANGE_PLATE--":
-            # Move plate forward in Y to clear space for swapping
-            try:
-                target_y = 230
-                printer.run_gcode(f"G90")
-                printer.run_gcode(f"G0Y{target_y}")
-                print(f"Moved plate to Y={target_y} for plate change.")
-            except Exception as e:
-                print(f"Failed to move for plate change: {e}")
-        # Corner capture buttons
-        elif event in ["--SET_TL--", "--SET_TR--", "--SET_BL--", "--SET_BR--"]:
-            loc = get_current_location2()
-            coord_str = f"{loc['X']:.2f},{loc['Y']:.2f},{loc['Z']:.2f}"
-            if event == "--SET_TL--":
-                corners["TL"] = loc
-                window["--TL_COORD--"].update(coord_str)
-            elif event == "--SET_TR--":
-                corners["TR"] = loc
-                window["--TR_COORD--"].update(coord_str)
-            elif event == "--SET_BL--":
-                corners["BL"] = loc
-                window["--BL_COORD--"].update(coord_str)
-            elif event == "--SET_BR--":
-                corners["BR"] = loc
-                window["--BR_COORD--"].update(coord_str)
-        elif event == "--GEN_SNAKE--":
-            try:
-                rows = int(values.get("--NUM_ROWS--", "0"))
-                cols = int(values.get("--NUM_COLS--", "0"))
-            except ValueError:
-                print("Rows/Cols must be integers")
-                continue
-            missing = [k for k,v in corners.items() if v is None]
-            if missing:
-                print(f"Missing corners: {missing}")
-                continue
-            z_override = None
-            z_str = values.get("--Z_OVERRIDE--", "").strip()
-            if len(z_str):
-                try:
-                    z_override = float(z_str)
-                except ValueError:
-                    print("Z Override must be a number")
-                    continue
-            default_dir = os.path.join(os.getcwd(), "testing", "Well_Location")
-            outfile = os.path.join(default_dir, "snake_path.csv")
-            generate_snake_csv(corners, rows, cols, outfile, z_override=z_override)
-            last_snake_csv = outfile
-            print(f"Snake path saved to {outfile}")
-        elif event == "--APPLY_Z--":
-            z_str = values.get("--Z_OVERRIDE--", "").strip()
-            if not len(z_str):
-                print("Enter a Z Override value first")
-                continue
-            try:
-                z_override = float(z_str)
-            except ValueError:
-                print("Z Override must be a number")
-                continue
-            # Rewrite last_snake_csv with new Z
-            if not os.path.isfile(last_snake_csv):
-                print("No snake_path.csv found yet; generate first.")
-                continue
-            # Reload corners/rows/cols from existing file length
-            with open(last_snake_csv, newline="") as f:
-                reader = csv.reader(f)
-                rows_list = list(reader)
-            if len(rows_list) < 2:
-                print("Existing snake file is empty.")
-                continue
-            total_points = len(rows_list) - 1
-            # Determine rows/cols from inputs or infer nothing; just rewrite Z
-            # Simply rewrite the file with same XY, new Z
-            with open(last_snake_csv, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["image#", "Xcoord", "Ycoord", "Zcoord"])
-                for row in rows_list[1:]:
-                    if len(row) < 4:
-                        continue
-                    writer.writerow([row[0], row[1], row[2], f"{z_override:.2f}"])
-            print(f"Updated Z to {z_override:.2f} in {last_snake_csv}")
-        elif event == START_PREVIEW:
-            print("Starting Preview With Settings")
-            try:
-                camera.stop_preview()
-            except Exception:
-                pass
-            try:
-                prev_width = int(values[PREVIEW_WIDTH_KEY])
-                prev_height = int(values[PREVIEW_HEIGHT_KEY])
-                prev_loc_x = int(values[PREVIEW_LOC_X_KEY])
-                prev_loc_y = int(values[PREVIEW_LOC_Y_KEY])
-                alpha_val = int(values[ALPHA_KEY])
-            except (TypeError, ValueError):
-                print("Invalid preview settings")
-            else:
-                PREVIEW_LOC_X = prev_loc_x
-                PREVIEW_LOC_Y = prev_loc_y
-                PREVIEW_WIDTH = prev_width
-                PREVIEW_HEIGHT = prev_height
-                PREVIEW_ALPHA = alpha_val
-                move_window_pid(preview_win_id, prev_loc_x, prev_loc_y - PREVIEW_WINDOW_OFFSET)
-                # Picamera2: use True to autodetect preview; kwargs are x, y, width, height (no alpha/fullscreen/window)
-                camera.start_preview(True, x=prev_loc_x, y=prev_loc_y, width=prev_width, height=prev_height)
-                x_win, y_win = get_window_location_from_pid(preview_win_id)
-                print(f"x_win:{x_win}, y_win:{y_win}")
-        elif event == STOP_PREVIEW:
-            print("Stopping Preview")
-            try:
-                camera.stop_preview()
-            except Exception:
-                pass
-        elif event == SET_EXPOSURE_MODE:
-            set_exposure_mode(event, values, window, camera)
-            # setup_picture_camera_settings(camera)
-        if event == PIC_SAVE_FOLDER_KEY:
-            save_folder = values[PIC_SAVE_FOLDER_KEY]
-            print(f"Save folder: {save_folder}")
-            
-            PIC_SAVE_FOLDER = save_folder
-
-        
-        # Crosshair controls (Movement tab)
-        if event in ["--XHAIR_INC--", "--XHAIR_DEC--", "--XHAIR_RADIUS--"]:
-            try:
-                current_rad = int(values.get("--XHAIR_RADIUS--", WL.CIRCLE_RADIUS))
-            except (TypeError, ValueError):
-                current_rad = WL.CIRCLE_RADIUS
-            if event == "--XHAIR_INC--":
-                current_rad += 1
-            elif event == "--XHAIR_DEC--":
-                current_rad = max(1, current_rad - 1)
-            WL.CIRCLE_RADIUS = current_rad
-            window["--XHAIR_RADIUS--"].update(str(current_rad))
-            values["--XHAIR_RADIUS--"] = str(current_rad)
-            if values.get("--XHAIR_ON--", True):
-                # Update overlay on preview
-                x_win_preview, y_win_preview = get_window_location_from_pid(preview_win_id)
-                preview_rect = (x_win_preview, y_win_preview + PREVIEW_WINDOW_OFFSET, PREVIEW_WIDTH, PREVIEW_HEIGHT)
-                crosshair_overlay = WL.create_crosshair_overlay(
-                    camera,
-                    radius=current_rad,
-                    thickness=WL.CIRCLE_THICKNESS,
-                    color_bgr=WL.CIRCLE_COLOR,
-                    alpha=PREVIEW_ALPHA,
-                    preview_window=preview_rect,
-                    camera_lock=CAMERA_LOCK,
-                    existing_overlay=crosshair_overlay
-                )
-            else:
-                if crosshair_overlay:
-                    with CAMERA_LOCK:
-                        if hasattr(camera, 'remove_overlay'):
-                            camera.remove_overlay(crosshair_overlay)
-                        else:
-                            camera.set_overlay(None)
-                    crosshair_overlay = None
-        # Well location calculator tab events
-        if event in WLC.WELL_LOCATION_EVENTS or event in [WLC.ROW_KEY, WLC.COL_KEY, WLC.SAVE_FOLDER_KEY]:
-            WLC.event_manager(event, values, window)
-        elif event == "--XHAIR_ON--":
-            if values.get("--XHAIR_ON--", True):
-                try:
-                    current_rad = int(values.get("--XHAIR_RADIUS--", WL.CIRCLE_RADIUS))
-                except (TypeError, ValueError):
-                    current_rad = WL.CIRCLE_RADIUS
-                x_win_preview, y_win_preview = get_window_location_from_pid(preview_win_id)
-                preview_rect = (x_win_preview, y_win_preview + PREVIEW_WINDOW_OFFSET, PREVIEW_WIDTH, PREVIEW_HEIGHT)
-                crosshair_overlay = WL.create_crosshair_overlay(
-                    camera,
-                    radius=current_rad,
-                    thickness=WL.CIRCLE_THICKNESS,
-                    color_bgr=WL.CIRCLE_COLOR,
-                    alpha=PREVIEW_ALPHA,
-                    preview_window=preview_rect,
-                    camera_lock=CAMERA_LOCK,
-                    existing_overlay=crosshair_overlay
-                )
-            else:
-                if crosshair_overlay:
-                    with CAMERA_LOCK:
-                        if hasattr(camera, 'remove_overlay'):
-                            camera.remove_overlay(crosshair_overlay)
-                        else:
-                            camera.set_overlay(None)
-                    crosshair_overlay = None
-        
-        # print("You entered ", values[0])
-        
-        # Original
-        # imgbytes = cv2.imencode('.png', frame)[1].tobytes()
+        if event_window is window and event_values is not None:
+            values = event_values
         
-        # Update GUI Window with new image
-        # window['-IMAGE-'].update(data=imgbytes)
+        handler = EVENT_HANDLERS.get(event)
+        if handler is not None:
+            handler(ctx, event, values)
         
-        # clear the stream in preparation for the next frame
-        # Must do this, else it won't work
-        # rawCapture.truncate(0)
+        # ---- CSV File Checker and "Start Experiment" Enable/Disable logic
+        # Only touches the buttons when their state changes
+        update_experiment_buttons(ctx, values)
 
     # Out of While Loop
+    # Stop the command worker before closing the camera and printer it uses
+    executor.close()
+    if ctx.window_tracker:
+        ctx.window_tracker.stop()
     # Cleanup camera
     camera.stop()
     camera.close()
@@ -2178,10 +2999,11 @@ def main():
         pass
     
     # Closing 3D Printer Serial Connection
-    printer.printer.close()
+    printer.disconnect()
     
     # For loop to show camera feed
     pass
 
-main()
 # call main function
+if __name__ == "__main__":
+    main()
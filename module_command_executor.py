@@ -0,0 +1,147 @@
+"""
+Module for running hardware commands off the GUI event loop
+
+Description: One worker thread takes jobs (Z stack, pictures, get/save location, ...)
+from a queue and runs them one at a time, so the FreeSimpleGUI window never freezes.
+Progress and results are sent back to the GUI with window.write_event_value, and show
+up in window.read() as COMMAND_EVENT with a dictionary value:
+    {"name": job name, "status": STARTED/PROGRESS/DONE/FAILED, "result": ..., "message": ...}
+
+Each job lists the hardware it uses (printer, camera). A new job is rejected if a queued
+or running job already uses the same hardware, so a second click on "Get Current Location"
+does not pile up behind the first one and two jobs never fight over the serial port.
+
+Work that runs on its own thread (an experiment) claims the hardware with claim() for as
+long as it runs and gives it back with release(), so jobs are rejected meanwhile.
+
+Jobs that report progress or can be cancelled take progress and stop_event keywords:
+    def get_x_pictures(x, delay_seconds, camera, progress=None, stop_event=None)
+
+Changelog:
+18 Oct 2026: Added claim()/release() for experiments running on their own thread.
+18 Oct 2026: Created CommandExecutor.
+"""
+import queue
+import threading
+import traceback
+
+# Event key the GUI sees in window.read()
+COMMAND_EVENT = "-COMMAND_EVENT-"
+
+# Hardware a job can use
+RESOURCE_PRINTER = "printer"
+RESOURCE_CAMERA = "camera"
+
+# Job Status
+STATUS_STARTED = "started"
+STATUS_PROGRESS = "progress"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class CommandJob:
+    """One queued command: the function to run and the hardware it needs."""
+
+    def __init__(self, name, func, args, kwargs, resources, with_progress):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.resources = frozenset(resources)
+        self.with_progress = with_progress
+
+
+class CommandExecutor:
+    """Worker thread with a job queue, posts progress/results back to the window."""
+
+    def __init__(self, window, event_key=COMMAND_EVENT):
+        self.window = window
+        self.event_key = event_key
+        self.jobs = queue.Queue()
+        # Set to cancel the running job (jobs that take stop_event check it)
+        self.stop_event = threading.Event()
+        # Hardware used by queued and running jobs
+        self.busy_resources = set()
+        self.busy_lock = threading.Lock()
+        self.worker = threading.Thread(target=self._run_worker, name="command_executor", daemon=True)
+        self.worker.start()
+
+    def submit(self, name, func, *args, resources=(RESOURCE_PRINTER,), with_progress=False, **kwargs):
+        """
+        Queues func(*args, **kwargs). Returns False (and does not queue it) if another
+        job is already using any of the same resources.
+        If with_progress is True, func is also given progress and stop_event keywords.
+        """
+        job = CommandJob(name, func, args, kwargs, resources, with_progress)
+        with self.busy_lock:
+            conflicts = self.busy_resources & job.resources
+            if conflicts:
+                print(f"Can't start '{name}', busy: {', '.join(sorted(conflicts))}")
+                return False
+            self.busy_resources |= job.resources
+        self.jobs.put(job)
+        return True
+
+    def claim(self, name, resources):
+        """
+        Marks resources as used by work outside the queue (e.g. the experiment thread).
+        Returns False (and claims nothing) if a job or another claim is using any of them.
+        """
+        with self.busy_lock:
+            conflicts = self.busy_resources & set(resources)
+            if conflicts:
+                print(f"Can't start '{name}', busy: {', '.join(sorted(conflicts))}")
+                return False
+            self.busy_resources |= set(resources)
+        return True
+
+    def release(self, resources):
+        # Gives back resources taken with claim()
+        with self.busy_lock:
+            self.busy_resources -= set(resources)
+
+    def is_busy(self, resource=None):
+        with self.busy_lock:
+            if resource is None:
+                return bool(self.busy_resources)
+            return resource in self.busy_resources
+
+    def cancel(self):
+        # Ask the running job to stop early (only jobs that take stop_event can)
+        self.stop_event.set()
+
+    def close(self):
+        self.cancel()
+        self.jobs.put(None)
+        self.worker.join(timeout=2)
+
+    def post(self, name, status, result=None, message=""):
+        # Send an event to the GUI thread (safe to call from any thread)
+        value = {"name": name, "status": status, "result": result, "message": message}
+        try:
+            self.window.write_event_value(self.event_key, value)
+        except Exception:
+            # Window already closed
+            pass
+
+    def _run_worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            self.stop_event.clear()
+            self.post(job.name, STATUS_STARTED)
+            kwargs = dict(job.kwargs)
+            if job.with_progress:
+                kwargs["progress"] = lambda message, name=job.name: self.post(name, STATUS_PROGRESS, message=message)
+                kwargs["stop_event"] = self.stop_event
+            try:
+                result = job.func(*job.args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                self.post(job.name, STATUS_FAILED, message=str(e))
+            else:
+                self.post(job.name, STATUS_DONE, result=result)
+            finally:
+                with self.busy_lock:
+                    self.busy_resources -= job.resources
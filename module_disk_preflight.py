@@ -0,0 +1,183 @@
+"""
+Module for checking the save folder before an experiment (disk space and write speed)
+
+Description: Takes the byte counts from module_experiment_estimator (bytes per sample,
+total bytes, sustained write rate needed) and checks them against the disk the
+experiment will be saved to:
+-Space: free space must hold the whole experiment plus a margin. If it doesn't, the
+ report says after which round (and how far into the experiment) the disk fills up.
+-Speed: writes a few sample-sized files (each flushed to disk with fsync) into the
+ folder and measures the write rate, which must beat the needed rate with a margin.
+The result is GO or NO GO with the limiting factor.
+
+Usage (command line):
+    python3 module_disk_preflight.py testing/Well_Location/location_file_snake.csv "/media/pi/Seagate Portable Drive" --rounds 1000 --wait-min 5
+
+Changelog:
+18 Oct 2026: Rounds that fit use the average round, for sampling schedules that skip wells.
+18 Oct 2026: Created disk space check, write benchmark and report.
+"""
+import argparse
+import os
+import shutil
+import time
+
+import module_experiment_estimator as EST
+import settings as C
+
+# Free space needed: the experiment times SPACE_MARGIN, plus MIN_FREE_BYTES left over
+SPACE_MARGIN = 1.1
+MIN_FREE_BYTES = 500 * 1000 * 1000
+
+# The measured write rate must be this many times the rate the experiment needs
+RATE_MARGIN = 1.5
+
+# Benchmark: total bytes written, largest single file (bigger samples are written in pieces of this size)
+BENCHMARK_BYTES = 64 * 1000 * 1000
+BENCHMARK_MAX_FILE_BYTES = 8 * 1000 * 1000
+BENCHMARK_MIN_FILES = 3
+
+BENCHMARK_FOLDER = ".preflight_benchmark"
+
+
+# Define function to find the folder that exists for a (maybe not created yet) path
+def get_existing_parent(path):
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+# Define function to get free bytes on the disk holding path
+def get_free_bytes(path):
+    return shutil.disk_usage(get_existing_parent(path)).free
+
+
+def benchmark_write(path, file_bytes, total_bytes=BENCHMARK_BYTES):
+    """
+    Writes sample-sized files into path (fsync'd, so the disk is measured and not the page cache),
+    then deletes them. Returns (write rate in MB/s, slowest single file in seconds).
+    """
+    file_bytes = max(1, min(file_bytes, BENCHMARK_MAX_FILE_BYTES))
+    num_files = max(BENCHMARK_MIN_FILES, total_bytes // file_bytes)
+    # Random data, so compressing filesystems can't cheat
+    data = os.urandom(file_bytes)
+    folder = os.path.join(get_existing_parent(path), BENCHMARK_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    slowest = 0.0
+    start = time.monotonic()
+    try:
+        for i in range(num_files):
+            file_start = time.monotonic()
+            with open(os.path.join(folder, f"bench_{i:03d}.bin"), "wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            slowest = max(slowest, time.monotonic() - file_start)
+        elapsed = time.monotonic() - start
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return num_files * file_bytes / 1e6 / elapsed, slowest
+
+
+def run_preflight(estimate, dest_folder, benchmark=True):
+    """
+    Checks dest_folder against an estimate from EST.estimate_experiment().
+    benchmark=False skips the write test (only checks space).
+    Returns a dictionary with "go", "limiting" (text, or None) and the measured numbers.
+    """
+    total_bytes = estimate["total_bytes"]
+    # Average round (a sampling schedule may skip wells in some rounds)
+    bytes_per_round = estimate["num_samples"] * estimate["bytes_per_sample"] / max(estimate["num_rounds"], 1)
+    free_bytes = get_free_bytes(dest_folder)
+    needed_bytes = int(total_bytes * SPACE_MARGIN) + MIN_FREE_BYTES
+    problems = []
+    notes = []
+
+    rounds_that_fit = None
+    if bytes_per_round and free_bytes < needed_bytes:
+        rounds_that_fit = max(0, int((free_bytes - MIN_FREE_BYTES) / SPACE_MARGIN // bytes_per_round))
+        full_after = rounds_that_fit * estimate["period_seconds"]
+        problems.append(f"Disk space: {EST.format_bytes(free_bytes)} free, needs {EST.format_bytes(needed_bytes)}. "
+                        f"Disk fills up after round {rounds_that_fit} of {estimate['num_rounds']} "
+                        f"(about {EST.format_duration(full_after)} in)")
+
+    write_rate = None
+    slowest_write = None
+    required_rate = estimate["required_write_rate_mb"]
+    if benchmark and estimate["bytes_per_sample"]:
+        try:
+            write_rate, slowest_write = benchmark_write(dest_folder, estimate["bytes_per_sample"])
+        except OSError as e:
+            problems.append(f"Write test: could not write to {dest_folder}: {e}")
+        else:
+            if write_rate < required_rate * RATE_MARGIN:
+                problems.append(f"Write speed: {write_rate:.1f} MB/s measured, needs "
+                                f"{required_rate * RATE_MARGIN:.1f} MB/s ({required_rate:.2f} MB/s x {RATE_MARGIN})")
+
+    # Staged pictures sit in RAM until moved, make sure the staging quota fits there
+    if C.USE_STAGING and estimate["mode"] == EST.MODE_PICTURE:
+        staging_free = get_free_bytes(C.STAGING_FOLDER)
+        if staging_free < C.STAGING_QUOTA_MB * 1024 * 1024:
+            notes.append(f"Staging folder has only {EST.format_bytes(staging_free)} free, "
+                         f"less than STAGING_QUOTA_MB ({C.STAGING_QUOTA_MB} MB)")
+
+    return {
+        "go": not problems,
+        "limiting": problems[0] if problems else None,
+        "problems": problems,
+        "notes": notes,
+        "dest_folder": dest_folder,
+        "free_bytes": free_bytes,
+        "needed_bytes": needed_bytes,
+        "rounds_that_fit": rounds_that_fit,
+        "write_rate_mb": write_rate,
+        "slowest_write_seconds": slowest_write,
+        "required_write_rate_mb": required_rate,
+    }
+
+
+def format_preflight(result):
+    # Text report for printing or adding to the estimate popup
+    lines = [f"Disk check for: {result['dest_folder']}",
+             f"Free space: {EST.format_bytes(result['free_bytes'])} (needs {EST.format_bytes(result['needed_bytes'])})"]
+    if result["write_rate_mb"] is not None:
+        lines.append(f"Write speed: {result['write_rate_mb']:.1f} MB/s (needs {result['required_write_rate_mb']:.2f} MB/s), "
+                     f"slowest file {result['slowest_write_seconds']:.2f} sec")
+    for note in result["notes"]:
+        lines.append(f"Note: {note}")
+    if result["go"]:
+        lines.append("GO")
+    else:
+        lines.append(f"NO GO: {result['limiting']}")
+        for problem in result["problems"][1:]:
+            lines.append(f"Also: {problem}")
+    return "\n".join(lines)
+
+
+# ==== COMMAND LINE ====
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a save folder can hold an experiment and keep up with it.")
+    parser.add_argument("csv_filename", help="Location CSV file")
+    parser.add_argument("dest_folder", help="Folder the experiment will be saved to")
+    parser.add_argument("--rounds", type=int, default=3, help="Number of rounds")
+    parser.add_argument("--wait-min", type=float, default=1, help="Minutes to wait between rounds")
+    parser.add_argument("--mode", default=EST.MODE_PICTURE, choices=[EST.MODE_PICTURE, EST.MODE_VIDEO])
+    parser.add_argument("--width", type=int, default=EST.PIC_RES[0], help="Picture width in pixels")
+    parser.add_argument("--height", type=int, default=EST.PIC_RES[1], help="Picture height in pixels")
+    parser.add_argument("--bytes-per-pixel", type=float, default=EST.BYTES_PER_PIXEL, help="Average compressed bytes per pixel")
+    parser.add_argument("--no-benchmark", action="store_true", help="Only check free space")
+    args = parser.parse_args()
+
+    estimate = EST.estimate_experiment_csv(args.csv_filename, args.rounds, args.wait_min * 60, mode=args.mode,
+                                           pic_res=(args.width, args.height), bytes_per_pixel=args.bytes_per_pixel)
+    print(EST.format_report(estimate))
+    print(format_preflight(run_preflight(estimate, args.dest_folder, benchmark=not args.no_benchmark)))
+
+
+if __name__ == "__main__":
+    main()
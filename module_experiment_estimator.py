@@ -0,0 +1,333 @@
+"""
+Module for estimating how long an experiment will take (dry run)
+
+Description: Uses the location CSV, the printer profile (travel speed and acceleration),
+the dwell times and the capture settings to predict how long one round takes, how long
+the whole experiment runs, how much disk space it needs, and the shortest period between
+rounds the rig can keep up with. Never talks to the printer or the camera, so it is safe
+to run from the GUI or the command line at any time.
+
+Usage (command line):
+    python3 module_experiment_estimator.py testing/Well_Location/location_file_snake.csv --rounds 10 --wait-min 5
+
+Notes:
+-Move times use a trapezoidal speed profile (accelerate, cruise, decelerate) along the
+ straight line between wells, so they are a lower bound on the real move.
+-Encode/write rates default to rough Pi 4 numbers. Measure yours and pass them in.
+
+Changelog:
+18 Oct 2026: Created estimator, report text and command line interface.
+18 Oct 2026: Video mode uses clip length and bitrate.
+18 Oct 2026: Added get_bytes_per_pixel() for the picture formats.
+18 Oct 2026: Added combine_estimates() for plate jobs.
+18 Oct 2026: estimate_experiment() takes num_samples, so sparse sampling schedules aren't counted as every well.
+"""
+import argparse
+import math
+
+import prepare_experiment as P
+import settings as C
+
+# ==== DEFAULTS ====
+# Time to switch the camera to still mode and back to preview around every capture (in seconds)
+CAPTURE_OVERHEAD_TIME = 1.5
+
+# JPEG encode rate in megapixels per second
+ENCODE_RATE = 20.0
+
+# Disk write rate in megabytes per second
+WRITE_RATE = 20.0
+
+# Average compressed size of a picture, in bytes per pixel
+BYTES_PER_PIXEL = 0.4
+
+# Rough bytes per pixel of the other picture formats (measure yours with module_image_format.py)
+FORMAT_BYTES_PER_PIXEL = {"jpeg": BYTES_PER_PIXEL, "png": 2.0, "webp": 1.6, "npy": 3.0}
+
+# Default picture resolution (matches the GUI)
+PIC_RES = (1920, 1080)
+
+# Experiment modes (match the radio buttons in the GUI)
+MODE_PICTURE = "Picture"
+MODE_VIDEO = "Video"
+MODE_PREVIEW = "Preview"
+
+X = 0
+Y = 1
+Z = 2
+
+
+# ==== USER DEFINED FUNCTIONS ====
+
+def get_move_time(distance, max_speed, acceleration):
+    """
+    Time (in seconds) to travel distance (mm) from a standstill to a standstill,
+    limited by max_speed (mm/sec) and acceleration (mm/sec^2).
+    """
+    if distance <= 0:
+        return 0.0
+
+    # Distance needed to get up to full speed and back down again
+    ramp_distance = max_speed * max_speed / acceleration
+
+    if distance < ramp_distance:
+        # Never reaches full speed (triangle profile)
+        return 2 * math.sqrt(distance / acceleration)
+
+    # Accelerate, cruise, decelerate (trapezoid profile)
+    return 2 * max_speed / acceleration + (distance - ramp_distance) / max_speed
+
+
+def get_distance(location_a, location_b):
+    # Straight line distance between two [x, y, z] locations
+    return math.sqrt((location_b[X] - location_a[X]) ** 2 +
+                     (location_b[Y] - location_a[Y]) ** 2 +
+                     (location_b[Z] - location_a[Z]) ** 2)
+
+
+def get_path_distances(path_list):
+    """
+    Distance travelled to reach each well in a round.
+    The first well is reached from the last well of the previous round.
+    """
+    distances = []
+    if not path_list:
+        return distances
+    previous_location = path_list[-1]
+    for location in path_list:
+        distances.append(get_distance(previous_location, location))
+        previous_location = location
+    return distances
+
+
+def get_bytes_per_pixel(picture_format):
+    # Default bytes per pixel of a picture format (settings.PICTURE_FORMAT)
+    return FORMAT_BYTES_PER_PIXEL.get(picture_format, BYTES_PER_PIXEL)
+
+
+def get_bytes_per_picture(pic_res, bytes_per_pixel=BYTES_PER_PIXEL):
+    pic_width, pic_height = pic_res
+    return int(pic_width * pic_height * bytes_per_pixel)
+
+
+def get_capture_time(pic_res, bytes_per_picture, capture_overhead=CAPTURE_OVERHEAD_TIME,
+                     encode_rate=ENCODE_RATE, write_rate=WRITE_RATE):
+    # Time for one still: camera reconfiguration, JPEG encode, then write to disk
+    pic_width, pic_height = pic_res
+    megapixels = pic_width * pic_height / 1e6
+    encode_time = megapixels / encode_rate
+    write_time = bytes_per_picture / 1e6 / write_rate
+    return capture_overhead + encode_time + write_time
+
+
+def estimate_experiment(path_list, num_rounds, wait_seconds, mode=MODE_PICTURE, pic_res=PIC_RES,
+                        max_speed=None, acceleration=None,
+                        first_well_dwell=None, well_dwell=None,
+                        capture_overhead=CAPTURE_OVERHEAD_TIME, encode_rate=ENCODE_RATE,
+                        write_rate=WRITE_RATE, bytes_per_pixel=BYTES_PER_PIXEL,
+                        clip_seconds=None, bitrate=None, num_samples=None):
+    """
+    Predicts round duration, total runtime and disk usage for an experiment.
+    num_samples is the number of samples over the whole experiment, for sampling schedules
+    that skip wells (default: every well every round). Round times still count every well.
+
+    Follows the same timing as run_experiment2 in the GUI: send the move, wait the dwell
+    time (the move happens during the dwell), take the sample, go to the next well.
+    After a round, wait wait_seconds before starting the next one.
+
+    Returns a dictionary with the estimate and a list of warnings.
+    """
+    # Fill in defaults from the printer profile and settings
+    if max_speed is None:
+        max_speed = C.MAX_SPEED
+    if acceleration is None:
+        acceleration = C.ACCELERATION
+    if first_well_dwell is None:
+        first_well_dwell = C.FIRST_WELL_DWELL_TIME
+    if well_dwell is None:
+        well_dwell = C.WELL_DWELL_TIME
+    if clip_seconds is None:
+        clip_seconds = C.VIDEO_CLIP_TIME
+    if bitrate is None:
+        bitrate = C.VIDEO_BITRATE
+
+    num_wells = len(path_list)
+    if num_samples is None:
+        num_samples = num_rounds * num_wells
+    warnings = []
+
+    distances = get_path_distances(path_list)
+    move_times = [get_move_time(d, max_speed, acceleration) for d in distances]
+
+    if mode == MODE_PICTURE:
+        bytes_per_sample = get_bytes_per_picture(pic_res, bytes_per_pixel)
+        sample_time = get_capture_time(pic_res, bytes_per_sample, capture_overhead, encode_rate, write_rate)
+    elif mode == MODE_VIDEO:
+        # Hardware encoder streams to disk while recording, so a clip takes its own length
+        bytes_per_sample = int(bitrate * clip_seconds / 8)
+        sample_time = clip_seconds
+    else:
+        bytes_per_sample = 0
+        sample_time = 0.0
+
+    round_seconds = 0.0
+    for well_index, move_time in enumerate(move_times):
+        dwell = first_well_dwell if well_index == 0 else well_dwell
+        if move_time > dwell:
+            warnings.append(f"Well {well_index + 1}: move takes {move_time:.1f} sec but dwell is only {dwell} sec, "
+                            f"sample would be taken while moving")
+        round_seconds += dwell + sample_time
+
+    total_seconds = num_rounds * round_seconds + max(num_rounds - 1, 0) * wait_seconds
+    total_bytes = num_samples * bytes_per_sample
+
+    # Next round only starts after the current one is done, so round starts are
+    # (round + wait) apart. The shortest possible period is one round with no wait.
+    period_seconds = round_seconds + wait_seconds
+    if num_rounds > 1 and round_seconds > wait_seconds:
+        warnings.append(f"One round takes {format_duration(round_seconds)}, longer than the "
+                        f"{format_duration(wait_seconds)} wait between rounds. Each well will be sampled "
+                        f"every {format_duration(period_seconds)}.")
+
+    # Disk has to keep up with one sample every (dwell + sample) seconds
+    if bytes_per_sample:
+        required_rate = bytes_per_sample / 1e6 / (well_dwell + sample_time)
+    else:
+        required_rate = 0.0
+
+    return {
+        "num_wells": num_wells,
+        "num_rounds": num_rounds,
+        "num_samples": num_samples,
+        "wait_seconds": wait_seconds,
+        "mode": mode,
+        "pic_res": tuple(pic_res),
+        "path_length_mm": sum(distances),
+        "longest_move_seconds": max(move_times) if move_times else 0.0,
+        "sample_seconds": sample_time,
+        "round_seconds": round_seconds,
+        "min_period_seconds": round_seconds,
+        "period_seconds": period_seconds,
+        "total_seconds": total_seconds,
+        "bytes_per_sample": bytes_per_sample,
+        "total_bytes": total_bytes,
+        "required_write_rate_mb": required_rate,
+        "warnings": warnings,
+    }
+
+
+def combine_estimates(estimates):
+    """
+    Combines the estimates of plates run together on one rig (plate jobs) into one estimate.
+    A combined round is one round of every plate. Space adds up, and since the plates share
+    one camera (one sample at a time) the disk has to keep up with the fastest plate only.
+    """
+    num_wells = sum(estimate["num_wells"] for estimate in estimates)
+    bytes_per_round = sum(estimate["num_wells"] * estimate["bytes_per_sample"] for estimate in estimates)
+    modes = [estimate["mode"] for estimate in estimates]
+    round_seconds = sum(estimate["round_seconds"] for estimate in estimates)
+    return {
+        "num_wells": num_wells,
+        "num_rounds": max(estimate["num_rounds"] for estimate in estimates),
+        "num_samples": sum(estimate["num_samples"] for estimate in estimates),
+        "wait_seconds": 0,
+        "mode": MODE_PICTURE if MODE_PICTURE in modes else modes[0],
+        "pic_res": estimates[0]["pic_res"],
+        "path_length_mm": sum(estimate["path_length_mm"] for estimate in estimates),
+        "longest_move_seconds": max(estimate["longest_move_seconds"] for estimate in estimates),
+        "sample_seconds": max(estimate["sample_seconds"] for estimate in estimates),
+        "round_seconds": round_seconds,
+        "min_period_seconds": round_seconds,
+        "period_seconds": max(max(estimate["period_seconds"] for estimate in estimates), round_seconds),
+        "total_seconds": max(estimate["total_seconds"] for estimate in estimates),
+        "bytes_per_sample": bytes_per_round // num_wells if num_wells else 0,
+        "total_bytes": sum(estimate["total_bytes"] for estimate in estimates),
+        "required_write_rate_mb": max(estimate["required_write_rate_mb"] for estimate in estimates),
+        "warnings": [warning for estimate in estimates for warning in estimate["warnings"]],
+    }
+
+
+def estimate_experiment_csv(csv_filename, num_rounds, wait_seconds, **kwargs):
+    # Same as estimate_experiment, but loads the locations from a CSV file first
+    path_list = P.get_path_list_csv(csv_filename)
+    return estimate_experiment(path_list, num_rounds, wait_seconds, **kwargs)
+
+
+def format_duration(seconds):
+    # Converts seconds into a short "1h 02m 03s" style string
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m {seconds:02d}s"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+def format_bytes(num_bytes):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if num_bytes < 1000:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1000
+    return f"{num_bytes:.1f} TB"
+
+
+def format_report(estimate):
+    # Text report for printing or showing in a popup
+    lines = [
+        f"Mode: {estimate['mode']}, {estimate['num_wells']} wells x {estimate['num_rounds']} round(s)",
+        f"Path length per round: {estimate['path_length_mm']:.0f} mm (longest move {estimate['longest_move_seconds']:.1f} sec)",
+        f"Per round: {format_duration(estimate['round_seconds'])}",
+        f"Time between round starts: {format_duration(estimate['period_seconds'])} "
+        f"(shortest possible: {format_duration(estimate['min_period_seconds'])})",
+        f"Total runtime: {format_duration(estimate['total_seconds'])}",
+    ]
+    if estimate["num_samples"] < estimate["num_wells"] * estimate["num_rounds"]:
+        lines.append(f"Sampling schedule: {estimate['num_samples']} samples "
+                     f"(of {estimate['num_wells'] * estimate['num_rounds']} if every well was sampled every round)")
+    if estimate["bytes_per_sample"] and estimate["mode"] == MODE_VIDEO:
+        lines.append(f"Disk usage: {format_bytes(estimate['total_bytes'])} "
+                     f"({format_bytes(estimate['bytes_per_sample'])} per clip)")
+    elif estimate["bytes_per_sample"]:
+        pic_width, pic_height = estimate["pic_res"]
+        lines.append(f"Disk usage: {format_bytes(estimate['total_bytes'])} "
+                     f"({format_bytes(estimate['bytes_per_sample'])} per {pic_width}x{pic_height} picture)")
+        lines.append(f"Sustained write rate needed: {estimate['required_write_rate_mb']:.2f} MB/s")
+    for warning in estimate["warnings"]:
+        lines.append(f"WARNING: {warning}")
+    return "\n".join(lines)
+
+
+# ==== COMMAND LINE ====
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate experiment duration and disk usage (dry run, no hardware).")
+    parser.add_argument("csv_filename", help="Location CSV file")
+    parser.add_argument("--rounds", type=int, default=3, help="Number of rounds")
+    parser.add_argument("--wait-min", type=float, default=1, help="Minutes to wait between rounds")
+    parser.add_argument("--mode", default=MODE_PICTURE, choices=[MODE_PICTURE, MODE_VIDEO, MODE_PREVIEW])
+    parser.add_argument("--width", type=int, default=PIC_RES[0], help="Picture width in pixels")
+    parser.add_argument("--height", type=int, default=PIC_RES[1], help="Picture height in pixels")
+    parser.add_argument("--speed", type=float, default=None, help="Travel speed in mm/sec (default: printer profile)")
+    parser.add_argument("--acceleration", type=float, default=None, help="Acceleration in mm/sec^2 (default: printer profile)")
+    parser.add_argument("--encode-rate", type=float, default=ENCODE_RATE, help="Measured encode rate in megapixels/sec")
+    parser.add_argument("--write-rate", type=float, default=WRITE_RATE, help="Measured disk write rate in MB/sec")
+    parser.add_argument("--bytes-per-pixel", type=float, default=BYTES_PER_PIXEL, help="Average compressed bytes per pixel")
+    parser.add_argument("--clip-sec", type=float, default=None, help="Video clip length in seconds (default: settings)")
+    parser.add_argument("--bitrate", type=int, default=None, help="Video bitrate in bits/sec (default: settings)")
+    args = parser.parse_args()
+
+    estimate = estimate_experiment_csv(
+        args.csv_filename, args.rounds, args.wait_min * 60,
+        mode=args.mode, pic_res=(args.width, args.height),
+        max_speed=args.speed, acceleration=args.acceleration,
+        encode_rate=args.encode_rate, write_rate=args.write_rate,
+        bytes_per_pixel=args.bytes_per_pixel,
+        clip_seconds=args.clip_sec, bitrate=args.bitrate,
+    )
+    print(format_report(estimate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Module for indexing experiment captures in a SQLite database
+
+Description: Every picture/clip taken during an experiment gets one row: round, well,
+plate, planned and actual X/Y/Z, capture time, file path, file size and the camera
+metadata (gains, exposure, ... plus the full metadata as JSON). The database sits in
+the experiment folder (INDEX_FILENAME), so "well 37 across all rounds" is one query
+instead of listing folders and parsing file names.
+
+Rows are buffered and written in one transaction every BATCH_SIZE captures or
+FLUSH_SECONDS, so the experiment thread doesn't wait on the disk for every picture.
+Use the index from one thread only (the experiment thread), like sqlite3 expects.
+
+Usage:
+    index = ExperimentIndex(os.path.join(folder_path, INDEX_FILENAME))
+    index.start_experiment(folder_path, mode="Picture", csv_file="snake_path.csv")
+    index.add_capture(round_index=0, well=37, file_path=path, planned=(10, 20, 5), metadata=metadata)
+    index.close()
+
+    python3 module_experiment_index.py /path/to/experiment_index.sqlite --well 37
+
+Changelog:
+18 Oct 2026: add_capture() takes file_bytes, for files still being moved from staging.
+18 Oct 2026: Created ExperimentIndex.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+# Database file name in the experiment folder
+INDEX_FILENAME = "experiment_index.sqlite"
+
+# Write buffered rows after this many captures, or this many seconds, whichever is first
+BATCH_SIZE = 50
+FLUSH_SECONDS = 10
+
+# picamera2 metadata keys that get their own column, besides the gains (everything is also kept in metadata_json)
+METADATA_COLUMNS = {
+    "exposure_time": "ExposureTime",
+    "lux": "Lux",
+    "colour_temperature": "ColourTemperature",
+    "focus_fom": "FocusFoM",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    id INTEGER PRIMARY KEY,
+    folder TEXT,
+    started REAL,
+    mode TEXT,
+    csv_file TEXT,
+    profile TEXT
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    experiment_id INTEGER REFERENCES experiments(id),
+    round INTEGER,
+    well INTEGER,
+    plate TEXT,
+    planned_x REAL, planned_y REAL, planned_z REAL,
+    actual_x REAL, actual_y REAL, actual_z REAL,
+    capture_time REAL,
+    file_path TEXT,
+    bytes INTEGER,
+    analog_gain REAL,
+    digital_gain REAL,
+    red_gain REAL,
+    blue_gain REAL,
+    exposure_time INTEGER,
+    lux REAL,
+    colour_temperature INTEGER,
+    focus_fom INTEGER,
+    metadata_json TEXT
+);
+CREATE INDEX IF NOT EXISTS captures_well_round ON captures (well, round);
+CREATE INDEX IF NOT EXISTS captures_time ON captures (capture_time);
+"""
+
+CAPTURE_COLUMNS = ["experiment_id", "round", "well", "plate", "planned_x", "planned_y", "planned_z",
+                   "actual_x", "actual_y", "actual_z", "capture_time", "file_path", "bytes",
+                   "analog_gain", "digital_gain", "red_gain", "blue_gain", *METADATA_COLUMNS,
+                   "metadata_json"]
+
+
+# Define function to turn picamera2 metadata into JSON (tuples/arrays become lists, the rest strings)
+def get_metadata_json(metadata):
+    def to_json_value(value):
+        if isinstance(value, (int, float, str, bool)) or value is None:
+            return value
+        if isinstance(value, (list, tuple)):
+            return [to_json_value(item) for item in value]
+        if hasattr(value, "tolist"):
+            return value.tolist()
+        return str(value)
+    return json.dumps({key: to_json_value(value) for key, value in metadata.items()}, sort_keys=True)
+
+
+class ExperimentIndex:
+    """SQLite index of one experiment's captures, written in batches."""
+
+    def __init__(self, db_path, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.connection = sqlite3.connect(db_path)
+        # WAL: readers (e.g. a query from another terminal) don't block the experiment
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.experiment_id = None
+        self.pending_rows = []
+        self.last_flush = time.monotonic()
+
+    def start_experiment(self, folder, mode="", csv_file="", profile=""):
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO experiments (folder, started, mode, csv_file, profile) VALUES (?, ?, ?, ?, ?)",
+                (folder, time.time(), mode, csv_file, profile))
+        self.experiment_id = cursor.lastrowid
+        return self.experiment_id
+
+    def add_capture(self, round_index, well, file_path, planned=None, actual=None, metadata=None,
+                    plate=None, capture_time=None, file_bytes=None):
+        """
+        Buffers one capture. planned/actual are (x, y, z) or None, metadata is the picamera2
+        metadata dictionary (or None for clips). The file size is read now unless file_bytes is given
+        (e.g. a file still being moved from staging).
+        """
+        if capture_time is None:
+            capture_time = time.time()
+        planned = tuple(planned) if planned is not None else (None, None, None)
+        actual = tuple(actual) if actual is not None else (None, None, None)
+        if file_bytes is None:
+            try:
+                file_bytes = os.path.getsize(file_path)
+            except OSError:
+                # Not written yet (e.g. an .mp4 still being remuxed)
+                file_bytes = None
+
+        metadata = metadata or {}
+        colour_gains = metadata.get("ColourGains") or (None, None)
+        row = [self.experiment_id, round_index, well, plate, *planned[:3], *actual[:3], capture_time,
+               file_path, file_bytes, metadata.get("AnalogueGain"), metadata.get("DigitalGain"),
+               colour_gains[0], colour_gains[1],
+               *[metadata.get(key) for key in METADATA_COLUMNS.values()],
+               get_metadata_json(metadata) if metadata else None]
+        self.pending_rows.append(row)
+
+        if len(self.pending_rows) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        # Write all buffered rows in one transaction
+        self.last_flush = time.monotonic()
+        if not self.pending_rows:
+            return
+        placeholders = ", ".join("?" for _ in CAPTURE_COLUMNS)
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO captures ({', '.join(CAPTURE_COLUMNS)}) VALUES ({placeholders})", self.pending_rows)
+        self.pending_rows = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def get_well_captures(self, well, plate=None):
+        # Every capture of one well, in round order
+        self.flush()
+        query = "SELECT round, capture_time, file_path, bytes FROM captures WHERE well = ?"
+        params = [well]
+        if plate is not None:
+            query += " AND plate = ?"
+            params.append(plate)
+        return self.connection.execute(query + " ORDER BY round", params).fetchall()
+
+    def get_round_captures(self, round_index):
+        # Every capture of one round, in the order they were taken
+        self.flush()
+        return self.connection.execute(
+            "SELECT well, plate, capture_time, file_path, bytes FROM captures WHERE round = ? ORDER BY capture_time",
+            (round_index,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up captures in an experiment index.")
+    parser.add_argument("db_path", help=f"Path to {INDEX_FILENAME}")
+    parser.add_argument("--well", type=int, help="Show every capture of this well")
+    parser.add_argument("--round", type=int, help="Show every capture of this round")
+    parser.add_argument("--plate", help="Plate name (plate jobs)")
+    args = parser.parse_args()
+
+    index = ExperimentIndex(args.db_path)
+    if args.well is not None:
+        for row in index.get_well_captures(args.well, args.plate):
+            print(*row, sep="\t")
+    elif args.round is not None:
+        for row in index.get_round_captures(args.round):
+            print(*row, sep="\t")
+    else:
+        count, total_bytes = index.connection.execute("SELECT COUNT(*), SUM(bytes) FROM captures").fetchone()
+        rounds, wells = index.connection.execute(
+            "SELECT COUNT(DISTINCT round), COUNT(DISTINCT well) FROM captures").fetchone()
+        print(f"{count} captures, {rounds} rounds, {wells} wells, {(total_bytes or 0) / 1e9:.2f} GB")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
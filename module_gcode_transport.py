@@ -0,0 +1,310 @@
+"""
+Module for sending G-code to Marlin with line numbers and checksums
+
+Description: Plain run_gcode writes "G0X10Y20\n" and hopes it arrives. A flipped bit on a
+long USB cable turns into a different move, and nobody notices. Here every line is sent
+as "N<line> <command>*<checksum>\n" (the format Marlin checks). If Marlin finds a bad
+checksum or a skipped line number, it answers "Resend: N", and the lines are sent
+again from the copy of the last HISTORY_SIZE lines.
+
+send() waits for the line's "ok" before returning, so the printer paces the host and no
+sleeps are needed between commands. Lines that are not "ok" (M114 position, M105
+temperatures, echo messages) are collected and returned by send().
+
+Streaming (queue()/stream()): if the firmware has ADVANCED_OK, every "ok" says how much
+room is left ("ok N12 P15 B3": last line 12 done, 15 planner blocks and 3 command
+buffer slots free). Several lines are then kept in flight, as many as the free slots
+(and the printer's 128 byte serial buffer) allow, so jogs and multi-segment moves go
+out at firmware speed instead of one round trip per line. Without ADVANCED_OK it falls
+back to one line at a time.
+
+The cost is tracked in get_stats(): extra bytes for "N..*..", resends, and the time
+from sending a line to its "ok".
+
+Usage:
+    transport = GcodeTransport(serial_port)
+    transport.reset_line_number()
+    transport.send("G28")
+    response_lines = transport.send("M114")
+    transport.stream(["G91", "G0X10", "G0Y10", "G90"])
+    print(format_stats(transport.get_stats()))
+
+Changelog:
+18 Oct 2026: Added streaming with ADVANCED_OK (queue, wait_all, stream), sliding window of in-flight lines.
+18 Oct 2026: Created GcodeTransport.
+"""
+import re
+import threading
+import time
+
+from collections import OrderedDict
+
+# Number of sent lines kept for resends
+HISTORY_SIZE = 64
+
+# Seconds to wait for "ok" (Marlin sends "busy: processing" during long commands, which restarts the wait)
+ACK_TIMEOUT = 60
+
+# Give up if the same line has to be resent this many times
+MAX_RESENDS_PER_LINE = 10
+
+# Streaming limits: never more than this many lines/bytes waiting in the printer
+# (Marlin's default serial RX_BUFFER_SIZE is 128 bytes)
+MAX_IN_FLIGHT = 8
+MAX_IN_FLIGHT_BYTES = 127
+
+# "ok N<last line> P<free planner blocks> B<free command buffer slots>", sent by Marlin with ADVANCED_OK
+ADVANCED_OK_PATTERN = re.compile(r"^ok\s+N(-?\d+)\s+P(\d+)\s+B(\d+)")
+
+
+# Define function to compute Marlin's checksum: XOR of every byte before the "*"
+def get_checksum(text):
+    checksum = 0
+    for byte in text.encode("ascii"):
+        checksum ^= byte
+    return checksum
+
+
+# Define function to turn a command into "N<line> <command>*<checksum>"
+def frame_line(line_number, command):
+    body = f"N{line_number} {command}"
+    return f"{body}*{get_checksum(body)}\n"
+
+
+# Define function to remove comments and whitespace (";" comments, "(...)" comments are left alone)
+def clean_command(command):
+    return command.split(";", 1)[0].strip()
+
+
+# Define function to get the line number from "Resend: 12" or "rs N12"
+def get_resend_line_number(line):
+    text = line.split(":", 1)[1] if line.lower().startswith("resend:") else line[2:]
+    digits = "".join(char for char in text if char.isdigit())
+    return int(digits) if digits else None
+
+
+class GcodeTransport:
+    """Numbered, checksummed G-code over a pyserial port, with Resend handling and streaming."""
+
+    def __init__(self, serial_port, history_size=HISTORY_SIZE, ack_timeout=ACK_TIMEOUT,
+                 max_in_flight=MAX_IN_FLIGHT, max_in_flight_bytes=MAX_IN_FLIGHT_BYTES):
+        self.serial_port = serial_port
+        self.ack_timeout = ack_timeout
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_bytes = max_in_flight_bytes
+        # Next line number to send, and the framed text of recent lines (line number -> bytes)
+        self.line_number = 0
+        self.history = OrderedDict()
+        self.history_size = history_size
+        # Sent lines without an "ok" yet (line number -> time sent), oldest first
+        self.in_flight = OrderedDict()
+        # None until the first "ok" shows if the firmware has ADVANCED_OK
+        self.advanced_ok = None
+        # Free command buffer slots from the last ADVANCED_OK reply
+        self.free_slots = None
+        # Line number Marlin asked for in "Resend:", waiting for the "ok" that follows it
+        self.pending_resend = None
+        self.resend_counts = {}
+        # Non-"ok" replies, handed out by send()/wait_all()
+        self.responses = []
+        # Only one thread talks to the printer at a time (GUI and experiment thread both send)
+        self.lock = threading.RLock()
+        self.stats = {"lines": 0, "command_bytes": 0, "sent_bytes": 0, "resends": 0,
+                      "errors": 0, "ack_time": 0.0, "max_ack_time": 0.0, "max_in_flight": 0}
+
+    def reset_line_number(self):
+        # "M110" on line -1 makes Marlin expect line 0 next
+        with self.lock:
+            self.wait_all()
+            self.history.clear()
+            self.line_number = -1
+            self.send("M110")
+
+    def send(self, command, timeout=None):
+        """
+        Sends one command and waits for its "ok" (resending if Marlin asks).
+        Returns the other lines Marlin sent before the "ok" (e.g. the M114 position).
+        Raises TimeoutError if no "ok" comes back, RuntimeError if resends keep failing.
+        """
+        with self.lock:
+            # Replies must belong to this command, so nothing else may be in flight
+            self.wait_all(timeout)
+            self.responses = []
+            self.queue(command, timeout)
+            return self.wait_all(timeout)
+
+    def queue(self, command, timeout=None):
+        """
+        Sends one command without waiting for its "ok", once the printer has room for it.
+        Call wait_all() to wait for the "ok"s (and get the replies).
+        """
+        command = clean_command(command)
+        if not command:
+            return
+        with self.lock:
+            line_number = self.line_number
+            framed = frame_line(line_number, command).encode("ascii")
+            self.read_until(lambda: self.has_room(len(framed)), timeout)
+
+            self.history[line_number] = framed
+            while len(self.history) > self.history_size:
+                self.history.popitem(last=False)
+            self.line_number += 1
+
+            self.write(framed)
+            self.in_flight[line_number] = time.monotonic()
+            self.stats["lines"] += 1
+            self.stats["command_bytes"] += len(command) + 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], len(self.in_flight))
+
+    def stream(self, commands, timeout=None):
+        """Sends several commands back to back (as fast as the printer takes them). Returns the replies."""
+        with self.lock:
+            for command in commands:
+                self.queue(command, timeout)
+            return self.wait_all(timeout)
+
+    def wait_all(self, timeout=None):
+        # Wait until every sent line has its "ok", returns (and forgets) the collected replies
+        with self.lock:
+            self.read_until(lambda: not self.in_flight and self.pending_resend is None, timeout)
+            responses = self.responses
+            self.responses = []
+            return responses
+
+    def has_room(self, line_bytes):
+        # Can another line be sent now without overflowing the printer's buffers?
+        if self.pending_resend is not None:
+            return False
+        if not self.in_flight:
+            return True
+        if not self.advanced_ok or self.free_slots is None:
+            # One line at a time
+            return False
+        if len(self.in_flight) >= min(self.free_slots, self.max_in_flight):
+            return False
+        in_flight_bytes = sum(len(self.history.get(number, b"")) for number in self.in_flight)
+        return in_flight_bytes + line_bytes <= self.max_in_flight_bytes
+
+    def write(self, framed):
+        self.serial_port.write(framed)
+        self.serial_port.flush()
+        self.stats["sent_bytes"] += len(framed)
+
+    def read_until(self, is_done, timeout=None):
+        # Read and handle printer replies until is_done() (no reading at all if it already is)
+        if timeout is None:
+            timeout = self.ack_timeout
+        deadline = time.monotonic() + timeout
+        while not is_done():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No 'ok' from the printer within {timeout} seconds "
+                                   f"(waiting for lines {list(self.in_flight)})")
+            line = self.serial_port.readline().decode("utf-8", errors="replace").strip()
+            if line and self.handle_line(line):
+                # Progress (an "ok" or "busy"), restart the wait
+                deadline = time.monotonic() + timeout
+
+    def handle_line(self, line):
+        # Returns True if the line shows the printer is making progress
+        if line.startswith("ok"):
+            if self.pending_resend is not None:
+                # This "ok" belongs to the rejected line
+                self.resend_from(self.pending_resend)
+                return True
+            self.handle_ok(line)
+            return True
+        if line.lower().startswith(("resend:", "rs ")):
+            if self.pending_resend is None:
+                self.pending_resend = get_resend_line_number(line)
+            return False
+        if line.startswith("Error:"):
+            self.stats["errors"] += 1
+            print(f"Printer: {line}")
+            return False
+        if "busy:" in line:
+            # Long command (G28, M400, G4), still alive
+            return True
+        self.responses.append(line)
+        return False
+
+    def handle_ok(self, line):
+        match = ADVANCED_OK_PATTERN.match(line)
+        if match:
+            if not self.advanced_ok:
+                print("Printer has ADVANCED_OK, streaming G-code")
+            self.advanced_ok = True
+            acked_line = int(match.group(1))
+            self.free_slots = int(match.group(3))
+            acked = [number for number in self.in_flight if number <= acked_line]
+            # An "ok" always finishes at least the oldest line
+            if not acked and self.in_flight:
+                acked = [next(iter(self.in_flight))]
+            extra = line[match.end():].strip()
+        else:
+            if self.advanced_ok is None:
+                self.advanced_ok = False
+            acked = [next(iter(self.in_flight))] if self.in_flight else []
+            extra = line[2:].strip()
+        if extra:
+            # "ok T:20.0 /0.0" (M105) carries its reply
+            self.responses.append(extra)
+
+        now = time.monotonic()
+        for number in acked:
+            ack_time = now - self.in_flight.pop(number)
+            self.stats["ack_time"] += ack_time
+            self.stats["max_ack_time"] = max(self.stats["max_ack_time"], ack_time)
+            self.resend_counts.pop(number, None)
+
+    def resend_from(self, line_number):
+        # Send line_number and every line after it again, in order
+        self.pending_resend = None
+        if line_number not in self.history:
+            raise RuntimeError(f"Printer asked to resend line {line_number}, which is no longer kept "
+                               f"(only the last {self.history_size} lines are)")
+        self.resend_counts[line_number] = self.resend_counts.get(line_number, 0) + 1
+        if self.resend_counts[line_number] > MAX_RESENDS_PER_LINE:
+            raise RuntimeError(f"Line {line_number} was resent {MAX_RESENDS_PER_LINE} times, check the USB cable")
+
+        if len(self.in_flight) > 1:
+            # Lines sent after the bad one are rejected too ("Error"/"Resend"/"ok" each).
+            # Let those replies run out before sending again, so they aren't taken as new "ok"s.
+            self.discard_stale_replies()
+        # Lines before line_number are done (Marlin handles lines in order)
+        for number in [number for number in self.in_flight if number < line_number]:
+            self.in_flight.pop(number)
+        for number, framed in self.history.items():
+            if number >= line_number:
+                self.write(framed)
+                self.in_flight[number] = time.monotonic()
+                self.stats["resends"] += 1
+
+    def discard_stale_replies(self):
+        # Read until the port is quiet (one serial timeout without data)
+        while True:
+            line = self.serial_port.readline().decode("utf-8", errors="replace").strip()
+            if not line:
+                return
+            if line.startswith("Error:"):
+                self.stats["errors"] += 1
+            elif not line.startswith("ok") and not line.lower().startswith(("resend:", "rs ")) and "busy:" not in line:
+                self.responses.append(line)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["overhead_bytes"] = stats["sent_bytes"] - stats["command_bytes"]
+        stats["mean_ack_time"] = stats["ack_time"] / stats["lines"] if stats["lines"] else 0.0
+        stats["advanced_ok"] = bool(self.advanced_ok)
+        return stats
+
+
+# Define function to make a short summary of get_stats()
+def format_stats(stats):
+    overhead_percent = 100 * stats["overhead_bytes"] / stats["command_bytes"] if stats["command_bytes"] else 0.0
+    mode = "streaming (ADVANCED_OK)" if stats["advanced_ok"] else "one line at a time"
+    return (f"G-code lines: {stats['lines']}, resends: {stats['resends']}, errors: {stats['errors']}\n"
+            f"Bytes: {stats['sent_bytes']} sent for {stats['command_bytes']} of commands "
+            f"(+{overhead_percent:.0f}% for line numbers/checksums and resends)\n"
+            f"Time to ok: mean {stats['mean_ack_time'] * 1000:.1f} ms, max {stats['max_ack_time'] * 1000:.1f} ms\n"
+            f"Mode: {mode}, up to {stats['max_in_flight']} lines in flight")
@@ -22,7 +22,6 @@ import random
 import time
 
 from datetime import datetime
-from picamera2 import Picamera2
 
 # Preview Resolution
 VID_WIDTH = 640
@@ -53,11 +52,17 @@ def get_unique_id():
     return unique_id
 
 
-def gen_cam_data(image_file_name, camera):
+def get_cam_metadata(camera):
+    # picamera2 version - get metadata from capture (waits for the next frame)
+    return camera.capture_metadata()
+
+
+def gen_cam_data(image_file_name, camera, metadata=None):
     
     # picamera2 version - get metadata from capture
-    # Capture metadata to get current camera settings
-    metadata = camera.capture_metadata()
+    # Capture metadata to get current camera settings (unless the caller already has it)
+    if metadata is None:
+        metadata = get_cam_metadata(camera)
     
     # ISO value (sensitivity)
     iso_value = metadata.get("AnalogueGain", 0) * 100  # Approximate ISO from analogue gain
@@ -111,6 +116,8 @@ def append_to_csv_file(data_row):
 
 
 def setup_camera():
+    # Imported here so saving camera data to CSV doesn't need the camera stack
+    from picamera2 import Picamera2
     camera = Picamera2()
     # Configure preview with video resolution
     preview_config = camera.create_preview_configuration(main={"size": (VID_WIDTH, VID_HEIGHT)})
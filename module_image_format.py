@@ -0,0 +1,177 @@
+"""
+Module for picture formats (JPEG, PNG, lossless WebP, raw numpy) and an encoder benchmark
+
+Description: Stills used to be JPEG only, at picamera2's default quality. Colour
+measurement wants lossless (or high quality) pictures, but those cost encode time and
+disk space. The format comes from the file extension, so every path that saves a picture
+follows settings.PICTURE_FORMAT through FILENAME_PICTURE_EXTENSION:
+-".jpg":  JPEG at JPEG_QUALITY (picamera2 capture_file, as before)
+-".png":  PNG at PNG_COMPRESS_LEVEL (0 = none/fastest, 9 = smallest/slowest)
+-".webp": lossless WebP
+-".npy":  the raw RGB array (numpy.save), no encoding at all
+
+The benchmark encodes real well pictures with every option and reports encode time,
+file size and colour error (mean absolute error, and how far the mean colour moves, which
+is what colour measurement sees), so the format can be chosen on numbers.
+
+Usage (command line):
+    python3 module_image_format.py "/media/pi/Seagate Portable Drive/Code_Pictures_.../round_0001/well_001.jpg" ...
+    python3 module_image_format.py well_*.png --jpeg-quality 85 95 100 --png-level 0 1 6
+
+Changelog:
+18 Oct 2026: Created save_image(), decode helpers and the encoder benchmark.
+"""
+import argparse
+import io
+import os
+import time
+
+import settings as C
+
+# Picture Formats
+FORMAT_JPEG = "jpeg"
+FORMAT_PNG = "png"
+FORMAT_WEBP = "webp"
+FORMAT_NPY = "npy"
+FORMATS = list(C.PICTURE_EXTENSIONS)
+
+# Benchmark options
+BENCHMARK_JPEG_QUALITIES = [85, 95]
+BENCHMARK_PNG_LEVELS = [0, 1, 6]
+
+
+# Define function to get the picture format from a file name (by extension)
+def get_format(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    for image_format, format_extension in C.PICTURE_EXTENSIONS.items():
+        if extension == format_extension or (image_format == FORMAT_JPEG and extension == ".jpeg"):
+            return image_format
+    raise ValueError(f"Unknown picture extension '{extension}', use one of {list(C.PICTURE_EXTENSIONS.values())}")
+
+
+# Define function to encode an RGB array into bytes (file contents)
+def encode_image(image, image_format, quality=None, compress_level=None):
+    """image is an (height, width, 3) uint8 RGB array. quality/compress_level default to settings."""
+    import numpy as np
+    from PIL import Image
+
+    if image.ndim == 3 and image.shape[2] == 4:
+        # picamera2 XRGB/XBGR formats have a 4th (unused) byte
+        image = image[:, :, :3]
+    buffer = io.BytesIO()
+    if image_format == FORMAT_NPY:
+        np.save(buffer, np.ascontiguousarray(image))
+    elif image_format == FORMAT_JPEG:
+        Image.fromarray(image).save(buffer, "JPEG", quality=C.JPEG_QUALITY if quality is None else quality)
+    elif image_format == FORMAT_PNG:
+        Image.fromarray(image).save(buffer, "PNG",
+                                    compress_level=C.PNG_COMPRESS_LEVEL if compress_level is None else compress_level)
+    elif image_format == FORMAT_WEBP:
+        Image.fromarray(image).save(buffer, "WEBP", lossless=True)
+    else:
+        raise ValueError(f"Unknown picture format '{image_format}', use one of {FORMATS}")
+    return buffer.getvalue()
+
+
+# Define function to save an RGB array in the format its file name asks for
+def save_image(image, file_path):
+    data = encode_image(image, get_format(file_path))
+    with open(file_path, "wb") as file:
+        file.write(data)
+
+
+# Define function to decode file contents into an RGB array (any of the formats above)
+def decode_image(data):
+    import numpy as np
+    from PIL import Image
+
+    if data[:6] == b"\x93NUMPY":
+        return np.load(io.BytesIO(data))
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+
+# Define function to load a picture file as an RGB array
+def load_image(file_path):
+    with open(file_path, "rb") as file:
+        return decode_image(file.read())
+
+
+# ==== BENCHMARK ====
+
+def get_benchmark_options(jpeg_qualities=BENCHMARK_JPEG_QUALITIES, png_levels=BENCHMARK_PNG_LEVELS):
+    # (label, format, encode keyword arguments) for every option to test
+    options = [(f"JPEG q{quality}", FORMAT_JPEG, {"quality": quality}) for quality in jpeg_qualities]
+    options += [(f"PNG level {level}", FORMAT_PNG, {"compress_level": level}) for level in png_levels]
+    options.append(("WebP lossless", FORMAT_WEBP, {}))
+    options.append(("numpy raw", FORMAT_NPY, {}))
+    return options
+
+
+def benchmark_image(image, options):
+    """
+    Encodes image with every option. Returns one dictionary per option: encode and decode
+    time (sec), bytes, bytes per pixel, mean absolute error and the largest shift of the
+    mean colour of any channel (both in 0-255 grey levels).
+    """
+    import numpy as np
+
+    reference = image.astype(np.float32)
+    mean_colour = reference.mean(axis=(0, 1))
+    num_pixels = image.shape[0] * image.shape[1]
+    results = []
+    for label, image_format, kwargs in options:
+        start = time.perf_counter()
+        data = encode_image(image, image_format, **kwargs)
+        encode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        decoded = decode_image(data).astype(np.float32)
+        decode_seconds = time.perf_counter() - start
+        results.append({
+            "label": label,
+            "encode_seconds": encode_seconds,
+            "decode_seconds": decode_seconds,
+            "bytes": len(data),
+            "bytes_per_pixel": len(data) / num_pixels,
+            "num_pixels": num_pixels,
+            "mean_abs_error": float(np.abs(decoded - reference).mean()),
+            "mean_colour_shift": float(np.abs(decoded.mean(axis=(0, 1)) - mean_colour).max()),
+        })
+    return results
+
+
+def format_benchmark(all_results):
+    # Averages over the pictures, one line per option
+    lines = [f"{'Option':<16}{'Encode s':>10}{'Decode s':>10}{'MB':>8}{'B/px':>7}{'MP/s':>8}{'MAE':>8}{'Colour':>8}"]
+    for option_index, first in enumerate(all_results[0]):
+        rows = [results[option_index] for results in all_results]
+        encode = sum(row["encode_seconds"] for row in rows) / len(rows)
+        decode = sum(row["decode_seconds"] for row in rows) / len(rows)
+        size = sum(row["bytes"] for row in rows) / len(rows)
+        bytes_per_pixel = sum(row["bytes_per_pixel"] for row in rows) / len(rows)
+        error = sum(row["mean_abs_error"] for row in rows) / len(rows)
+        shift = max(row["mean_colour_shift"] for row in rows)
+        megapixels_per_second = sum(row["num_pixels"] for row in rows) / 1e6 / sum(row["encode_seconds"] for row in rows)
+        lines.append(f"{first['label']:<16}{encode:>10.3f}{decode:>10.3f}{size / 1e6:>8.2f}{bytes_per_pixel:>7.2f}"
+                     f"{megapixels_per_second:>8.1f}{error:>8.3f}{shift:>8.3f}")
+    lines.append("MAE: mean absolute error per pixel, Colour: largest shift of a mean channel value (0-255)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark picture formats on real well pictures.")
+    parser.add_argument("images", nargs="+", help="Well pictures (ideally lossless: .png/.npy, else high quality JPEG)")
+    parser.add_argument("--jpeg-quality", type=int, nargs="+", default=BENCHMARK_JPEG_QUALITIES)
+    parser.add_argument("--png-level", type=int, nargs="+", default=BENCHMARK_PNG_LEVELS)
+    args = parser.parse_args()
+
+    options = get_benchmark_options(args.jpeg_quality, args.png_level)
+    all_results = []
+    for image_path in args.images:
+        image = load_image(image_path)
+        print(f"{image_path}: {image.shape[1]}x{image.shape[0]}")
+        all_results.append(benchmark_image(image, options))
+    print(format_benchmark(all_results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Module for one contact sheet per round: every well's picture, small, in plate layout
+
+Description: Checking a round meant opening its pictures one by one. A MontageWorker
+builds a contact sheet of the round while it runs: each picture is decoded straight at
+tile size (JPEG draft mode, the full picture is never decoded) on a low priority
+background thread and pasted into a canvas allocated once for the whole plate, at the
+well's row and column in the snake path (module_snake_path). At the end of the round
+the sheet is saved and the canvas is cleared for the next round:
+
+    <experiment folder>/montages/round_0001.jpg
+
+Memory is the canvas (rows x cols tiles, 8 x 12 tiles of 256 x 192 is 14 MB) plus the
+few encoded pictures waiting in the queue. Wells not sampled in a round stay grey.
+
+Usage:
+    rows, cols = get_snake_shape(path_list)
+    worker = MontageWorker(folder_path, rows, cols, tile_size=(256, 192))
+    worker.start()
+    worker.add_image(well_number, image_bytes)   # for every picture of the round
+    worker.end_round("round_0001")               # saves montages/round_0001.jpg
+    worker.close()
+
+Changelog:
+18 Oct 2026: Created PlateMontage and MontageWorker.
+"""
+import io
+import os
+import queue
+import threading
+
+from module_snake_path import get_snake_row_col
+
+# Montages go in this subfolder of the experiment folder
+MONTAGE_FOLDER = "montages"
+
+MONTAGE_QUALITY = 85
+
+# Pixels between tiles, and the colour of the gaps and of wells without a picture
+TILE_GAP = 4
+BACKGROUND_COLOUR = (48, 48, 48)
+LABEL_COLOUR = (255, 255, 0)
+
+# Pictures waiting to be pasted; add_image() blocks when this many are queued (bounds memory)
+QUEUE_SIZE = 8
+
+# Niceness of the worker thread
+MONTAGE_NICENESS = 15
+
+
+# Define function to get the size of a tile that fits in longest_side, for pictures of picture_size
+def get_tile_size(picture_size, longest_side):
+    width, height = picture_size
+    scale = longest_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class PlateMontage:
+    """A canvas of rows x cols tiles, wells placed in snake path order (well 1 is index 0)."""
+
+    def __init__(self, rows, cols, tile_size, gap=TILE_GAP):
+        from PIL import Image
+
+        self.rows = rows
+        self.cols = cols
+        self.tile_size = tuple(tile_size)
+        self.gap = gap
+        width = cols * (self.tile_size[0] + gap) + gap
+        height = rows * (self.tile_size[1] + gap) + gap
+        self.canvas = Image.new("RGB", (width, height), BACKGROUND_COLOUR)
+        self.num_tiles = 0
+        self.clear()
+
+    def get_tile_origin(self, well_number):
+        # Top left pixel of a well's tile (ValueError if the well is outside the plate)
+        if not 1 <= well_number <= self.rows * self.cols:
+            raise ValueError(f"Well {well_number} is not on a {self.rows} x {self.cols} plate")
+        row, col = get_snake_row_col(well_number - 1, self.cols)
+        return self.gap + col * (self.tile_size[0] + self.gap), self.gap + row * (self.tile_size[1] + self.gap)
+
+    def draw_label(self, well_number):
+        from PIL import ImageDraw
+
+        x, y = self.get_tile_origin(well_number)
+        ImageDraw.Draw(self.canvas).text((x + 3, y + 2), str(well_number), fill=LABEL_COLOUR)
+
+    def clear(self):
+        # Grey tiles with the well numbers, the canvas itself is reused
+        self.canvas.paste(BACKGROUND_COLOUR, (0, 0, *self.canvas.size))
+        for well_number in range(1, self.rows * self.cols + 1):
+            self.draw_label(well_number)
+        self.num_tiles = 0
+
+    def add_image_bytes(self, well_number, image_bytes):
+        """Decodes an encoded picture at tile size and pastes it at the well's place."""
+        from PIL import Image
+
+        if image_bytes[:6] == b"\x93NUMPY":
+            # Raw numpy pictures (settings.PICTURE_FORMAT "npy")
+            import numpy as np
+            image = Image.fromarray(np.load(io.BytesIO(image_bytes)))
+        else:
+            image = Image.open(io.BytesIO(image_bytes))
+            # JPEG only: decode at 1/2, 1/4 or 1/8 size, as long as it stays at least tile size
+            image.draft("RGB", self.tile_size)
+        self.add_tile(well_number, image)
+
+    def add_tile(self, well_number, image):
+        from PIL import Image
+
+        origin = self.get_tile_origin(well_number)
+        image = image.convert("RGB")
+        if image.size != self.tile_size:
+            reducing = image.width >= 2 * self.tile_size[0]
+            image = image.resize(self.tile_size, Image.BOX if reducing else Image.BILINEAR)
+        self.canvas.paste(image, origin)
+        self.draw_label(well_number)
+        self.num_tiles += 1
+
+    def save(self, path, quality=MONTAGE_QUALITY):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.canvas.save(path + ".tmp", "JPEG", quality=quality)
+        os.replace(path + ".tmp", path)
+
+
+class MontageWorker:
+    """Builds each round's contact sheet on a low priority background thread."""
+
+    def __init__(self, folder_path, rows, cols, tile_size):
+        self.folder_path = folder_path
+        self.montage = PlateMontage(rows, cols, tile_size)
+        self.images = queue.Queue(maxsize=QUEUE_SIZE)
+        self.thread = None
+        self.saved_rounds = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="plate-montage", daemon=True)
+        self.thread.start()
+
+    def add_image(self, well_number, image_bytes):
+        # image_bytes is the encoded picture (read before the file is moved or archived)
+        self.images.put((well_number, image_bytes))
+
+    def end_round(self, round_name):
+        # Saves the sheet of every picture added since the last end_round() as montages/<round_name>.jpg
+        self.images.put((None, round_name))
+
+    def get_montage_path(self, round_name):
+        return os.path.join(self.folder_path, MONTAGE_FOLDER, round_name + ".jpg")
+
+    def run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), MONTAGE_NICENESS)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self.images.get()
+            if item is None:
+                break
+            well_number, data = item
+            if well_number is None:
+                self.save_round(data)
+                continue
+            try:
+                self.montage.add_image_bytes(well_number, data)
+            except (OSError, ValueError) as e:
+                print(f"Could not add well {well_number} to the montage: {e}")
+
+    def save_round(self, round_name):
+        if self.montage.num_tiles == 0:
+            return
+        try:
+            self.montage.save(self.get_montage_path(round_name))
+            self.saved_rounds += 1
+        except OSError as e:
+            print(f"Could not save the montage of {round_name}: {e}")
+        self.montage.clear()
+
+    def close(self):
+        # Waits for the pictures still queued (a round without end_round() isn't saved)
+        if self.thread is None:
+            return
+        self.images.put(None)
+        self.thread.join()
+        self.thread = None
+        print(f"Montages: saved {self.saved_rounds} round contact sheet(s) in {MONTAGE_FOLDER}")
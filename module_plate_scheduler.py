@@ -0,0 +1,226 @@
+"""
+Module for running several plates (jobs) on one printer and camera
+
+Description: Each plate job has its own location CSV, sampling period, capture mode
+and priority. The scheduler picks which plate to visit next using earliest-deadline-first
+(a round is due at start + n * period and should be done before the next one is due).
+Plates that are due within a short merge window are run back to back, in the order
+(and direction) that needs the least travel between them.
+Lateness of every round is recorded so each job's timing can be checked afterwards.
+
+The scheduler never talks to the printer or the camera itself. The caller passes in a
+run_round function that moves to each well and takes the sample.
+
+Jobs File (YAML):
+    jobs:
+      - name: plate_a
+        csv: testing/Well_Location/location_file_snake.csv
+        period_min: 10
+        mode: Picture
+        priority: 1
+        rounds: 12
+
+Changelog:
+18 Oct 2026: Created PlateJob, PlateScheduler and YAML job loader.
+"""
+import csv
+import time
+
+import prepare_experiment as P
+from module_experiment_estimator import get_distance
+from utils import sleep_with_stop
+
+# Merge plates that are due within this many seconds of each other
+DEFAULT_MERGE_WINDOW = 30
+
+# Log file headers
+LOG_HEADERS = ["job", "round", "due_time", "start_time", "finish_time", "start_lateness", "finish_lateness", "merged"]
+
+
+class PlateJob:
+    """One plate: its locations, how often to sample it, and its timing history."""
+
+    def __init__(self, name, csv_filename, period_seconds, mode="Picture", priority=0, num_rounds=None, path_list=None):
+        self.name = name
+        self.csv_filename = csv_filename
+        self.period_seconds = period_seconds
+        self.mode = mode
+        self.priority = priority
+        self.num_rounds = num_rounds
+        self.path_list = path_list if path_list is not None else P.get_path_list_csv(csv_filename)
+        self.gcode_string_list = P.convert_list_to_gcode_strings(self.path_list)
+
+        # Timing, in seconds since the scheduler started
+        self.rounds_done = 0
+        self.start_lateness = []
+        self.finish_lateness = []
+
+    def is_done(self):
+        return self.num_rounds is not None and self.rounds_done >= self.num_rounds
+
+    def get_due_time(self):
+        # When the next round should start
+        return self.rounds_done * self.period_seconds
+
+    def get_deadline(self):
+        # When the next round should be finished (the round after it is due)
+        return self.get_due_time() + self.period_seconds
+
+    def get_stats(self):
+        # Summary of how late this job's rounds were (in seconds)
+        stats = {"name": self.name, "rounds": self.rounds_done}
+        for label, lateness in [("start", self.start_lateness), ("finish", self.finish_lateness)]:
+            if lateness:
+                stats[f"{label}_mean"] = sum(lateness) / len(lateness)
+                stats[f"{label}_max"] = max(lateness)
+            else:
+                stats[f"{label}_mean"] = 0.0
+                stats[f"{label}_max"] = 0.0
+        stats["late_rounds"] = sum(1 for lateness in self.finish_lateness if lateness > 0)
+        return stats
+
+
+class PlateScheduler:
+    """Earliest-deadline-first scheduler for PlateJobs sharing one gantry."""
+
+    def __init__(self, jobs, merge_window=DEFAULT_MERGE_WINDOW, log_path=None):
+        self.jobs = jobs
+        self.merge_window = merge_window
+        self.log_path = log_path
+        self.current_location = None
+
+        if self.log_path:
+            with open(self.log_path, "w", newline="") as f:
+                csv.writer(f).writerow(LOG_HEADERS)
+
+    def get_next_batch(self, now):
+        """
+        Returns the jobs to run next (most urgent first, plus any merged with it),
+        or an empty list if nothing is due yet.
+        """
+        # Earliest deadline first, higher priority wins a tie
+        active = sorted((job for job in self.jobs if not job.is_done()),
+                        key=lambda job: (job.get_deadline(), -job.priority))
+        ready = [job for job in active if job.get_due_time() <= now]
+        if not ready:
+            return []
+
+        first = ready[0]
+        batch = [first]
+        # Merge in other jobs that will be due soon anyway, saves a trip back later
+        for job in active:
+            if job is not first and job.get_due_time() <= now + self.merge_window:
+                batch.append(job)
+        return batch
+
+    def order_batch(self, batch):
+        """
+        Orders a batch of jobs (and picks the direction to walk each plate) so the gantry
+        travels the least between plates. Greedy: always go to the nearest plate end next.
+        Returns a list of (job, [(well_number, gcode_string, location), ...]).
+        """
+        remaining = list(batch)
+        ordered = []
+        location = self.current_location
+
+        # The most urgent job always goes first, only its direction is picked
+        while remaining:
+            candidates = remaining[:1] if not ordered else remaining
+            best = None
+            for job in candidates:
+                for is_reversed in [False, True]:
+                    start = job.path_list[-1] if is_reversed else job.path_list[0]
+                    distance = get_distance(location, start) if location is not None else 0.0
+                    if best is None or distance < best[0]:
+                        best = (distance, job, is_reversed)
+            distance, job, is_reversed = best
+            remaining.remove(job)
+
+            visits = [(index + 1, job.gcode_string_list[index], job.path_list[index]) for index in range(len(job.path_list))]
+            if is_reversed:
+                visits.reverse()
+            ordered.append((job, visits))
+            location = visits[-1][2]
+        return ordered
+
+    def run(self, run_round, stop_event, pause_event=None, idle_chunk=0.25):
+        """
+        Runs all jobs until they are done or stop_event is set.
+        run_round(job, visits, round_index) does the actual moving and sampling.
+        """
+        start_time = time.monotonic()
+
+        while not stop_event.is_set():
+            if pause_event is not None:
+                while pause_event.is_set() and not stop_event.is_set():
+                    time.sleep(0.1)
+
+            if all(job.is_done() for job in self.jobs):
+                break
+
+            now = time.monotonic() - start_time
+            batch = self.get_next_batch(now)
+            if not batch:
+                # Nothing due yet, wait until the next job is due
+                next_due = min(job.get_due_time() for job in self.jobs if not job.is_done())
+                sleep_with_stop(next_due - now, stop_event, chunk=idle_chunk)
+                continue
+
+            is_merged = len(batch) > 1
+            for job, visits in self.order_batch(batch):
+                if stop_event.is_set():
+                    break
+                due_time = job.get_due_time()
+                round_start = time.monotonic() - start_time
+                print(f"Plate '{job.name}' round #{job.rounds_done} (due {due_time:.0f} s, now {round_start:.0f} s)")
+
+                run_round(job, visits, job.rounds_done)
+                if stop_event.is_set():
+                    break
+
+                round_finish = time.monotonic() - start_time
+                self.current_location = visits[-1][2]
+                self.record_round(job, due_time, round_start, round_finish, is_merged)
+
+        self.print_stats()
+
+    def record_round(self, job, due_time, round_start, round_finish, is_merged):
+        start_lateness = round_start - due_time
+        finish_lateness = round_finish - (due_time + job.period_seconds)
+        job.start_lateness.append(start_lateness)
+        job.finish_lateness.append(finish_lateness)
+
+        if self.log_path:
+            row = [job.name, job.rounds_done, f"{due_time:.2f}", f"{round_start:.2f}", f"{round_finish:.2f}",
+                   f"{start_lateness:.2f}", f"{finish_lateness:.2f}", int(is_merged)]
+            with open(self.log_path, "a", newline="") as f:
+                csv.writer(f).writerow(row)
+
+        job.rounds_done += 1
+
+    def print_stats(self):
+        print("==== Plate Job Lateness (seconds) ====")
+        for job in self.jobs:
+            stats = job.get_stats()
+            print(f"{stats['name']}: {stats['rounds']} round(s), start late mean {stats['start_mean']:.1f} / "
+                  f"max {stats['start_max']:.1f}, finish late mean {stats['finish_mean']:.1f} / "
+                  f"max {stats['finish_max']:.1f}, late rounds: {stats['late_rounds']}")
+
+
+def load_jobs_yaml(yaml_file):
+    # Loads plate jobs from a YAML file (see module docstring for the format)
+    import yaml
+    with open(yaml_file) as file:
+        jobs_dict = yaml.load(file, Loader=yaml.FullLoader)
+
+    jobs = []
+    for entry in jobs_dict["jobs"]:
+        jobs.append(PlateJob(
+            name=entry["name"],
+            csv_filename=entry["csv"],
+            period_seconds=float(entry["period_min"]) * 60,
+            mode=entry.get("mode", "Picture"),
+            priority=int(entry.get("priority", 0)),
+            num_rounds=entry.get("rounds"),
+        ))
+    return jobs
@@ -0,0 +1,207 @@
+"""
+Module for loading printer profiles from connection_settings.yaml
+
+Description: Parses the YAML file once into checked, read-only PrinterProfile objects,
+one per project (cell_sensor, mht, FlyCamV2, ...). Values that are worked out from the
+profile (time/distance to reach full speed, longest move) are computed once here
+instead of every time they are needed.
+
+The registry remembers the file's modification time. reload_if_changed() only costs an
+os.stat() call, so the GUI can check it often and pick up edits without a restart.
+
+A profile is picked by name (the project key in the YAML file, or "project/printer"):
+command line (--profile), the PRINTER_PROFILE environment variable, the GUI, or the
+PROJECT constant in settings.py.
+
+Changelog:
+18 Oct 2026: Added optional open_without_reset.
+18 Oct 2026: Created PrinterProfile and ProfileRegistry.
+"""
+import math
+import os
+
+from dataclasses import dataclass, field
+
+# Environment variable that picks the profile
+PROFILE_ENV_VAR = "PRINTER_PROFILE"
+
+# Used if the YAML file leaves them out
+DEFAULT_ACCELERATION = 500
+DEFAULT_CAMERA_ROTATION = 0
+
+
+def number(value):
+    # int stays int (so GCode like "G0Y200" looks the same as before), anything else becomes float
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, int):
+        return value
+    return float(value)
+
+
+@dataclass(frozen=True)
+class PrinterProfile:
+    """One printer's connection settings and limits (read-only)."""
+    project: str
+    printer: str
+    name: str
+    device_path: str
+    baudrate: int
+    timeout_time: float
+    reboot_wait_time: float
+    camera_rotation: int
+    x_max: float
+    y_max: float
+    z_max: float
+    max_speed: float
+    acceleration: float
+    # Open the serial port without toggling DTR (board doesn't reboot), only some boards allow it
+    open_without_reset: bool = False
+    # Derived values, filled in by __post_init__
+    ramp_time: float = field(init=False)
+    ramp_distance: float = field(init=False)
+    max_distance: float = field(init=False)
+
+    def __post_init__(self):
+        # Time and distance to get up to max_speed from a standstill
+        object.__setattr__(self, "ramp_time", self.max_speed / self.acceleration)
+        object.__setattr__(self, "ramp_distance", self.max_speed * self.max_speed / (2 * self.acceleration))
+        # Longest straight move on this printer (corner to corner)
+        object.__setattr__(self, "max_distance", math.sqrt(self.x_max ** 2 + self.y_max ** 2 + self.z_max ** 2))
+
+    @property
+    def key(self):
+        return f"{self.project}/{self.printer}"
+
+
+def get_profile_from_dict(project, printer, settings):
+    """
+    Builds a PrinterProfile from one printer entry of the YAML file.
+    Raises ValueError with every problem found.
+    """
+    problems = []
+    max_settings = settings.get("max") or {}
+
+    def get_value(source, key, value_type, default=None, minimum=None):
+        if key not in source:
+            if default is None:
+                problems.append(f"missing '{key}'")
+            return default
+        try:
+            value = value_type(source[key])
+        except (TypeError, ValueError):
+            problems.append(f"'{key}' should be a {value_type.__name__}, got {source[key]!r}")
+            return default
+        if minimum is not None and value < minimum:
+            problems.append(f"'{key}' should be at least {minimum}, got {value}")
+        return value
+
+    profile_values = {
+        "name": get_value(settings, "name", str, default=f"{project}/{printer}"),
+        "device_path": get_value(settings, "device_path", str),
+        "baudrate": get_value(settings, "baudrate", int, minimum=1),
+        "timeout_time": get_value(settings, "timeout_time", number, minimum=0),
+        "reboot_wait_time": get_value(settings, "reboot_wait_time", number, minimum=0),
+        "camera_rotation": get_value(settings, "camera_rotation", int, default=DEFAULT_CAMERA_ROTATION),
+        "x_max": get_value(max_settings, "x", number, minimum=1),
+        "y_max": get_value(max_settings, "y", number, minimum=1),
+        "z_max": get_value(max_settings, "z", number, minimum=1),
+        "max_speed": get_value(max_settings, "speed", number, minimum=1),
+        "acceleration": get_value(max_settings, "acceleration", number, default=DEFAULT_ACCELERATION, minimum=1),
+        "open_without_reset": bool(settings.get("open_without_reset", False)),
+    }
+    if profile_values["camera_rotation"] is not None and profile_values["camera_rotation"] % 90 != 0:
+        problems.append(f"'camera_rotation' should be 0, 90, 180 or 270, got {profile_values['camera_rotation']}")
+    if problems:
+        raise ValueError(f"Profile {project}/{printer}: " + "; ".join(problems))
+    return PrinterProfile(project=project, printer=printer, **profile_values)
+
+
+class ProfileRegistry:
+    """All printer profiles from a YAML file, reloaded when the file changes."""
+
+    def __init__(self, settings_file):
+        self.settings_file = settings_file
+        self.profiles = {}
+        self.mtime = None
+        self.load()
+
+    def load(self):
+        # Parse and check the whole file, only replace the profiles if all of them are valid
+        import yaml
+
+        mtime = os.stat(self.settings_file).st_mtime
+        with open(self.settings_file) as file:
+            settings_dict = yaml.load(file, Loader=yaml.FullLoader) or {}
+
+        profiles = {}
+        problems = []
+        for project, printers in settings_dict.items():
+            if not isinstance(printers, dict):
+                continue
+            for printer, settings in printers.items():
+                try:
+                    profile = get_profile_from_dict(project, printer, settings or {})
+                except ValueError as e:
+                    problems.append(str(e))
+                    continue
+                profiles[profile.key] = profile
+        if problems:
+            raise ValueError(f"{self.settings_file}:\n" + "\n".join(problems))
+
+        self.profiles = profiles
+        self.mtime = mtime
+
+    def reload_if_changed(self):
+        """
+        Reloads the file if it was modified since the last load. Returns True if it was.
+        If the new file has errors, they are printed and the old profiles are kept.
+        """
+        try:
+            mtime = os.stat(self.settings_file).st_mtime
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Not reloading printer profiles, {e}")
+            # Don't try again until the file changes again
+            self.mtime = mtime
+            return False
+        print(f"Reloaded printer profiles from {self.settings_file}")
+        return True
+
+    def get_names(self):
+        # Profile names for the GUI, "project/printer"
+        return sorted(self.profiles)
+
+    def get(self, name):
+        """
+        Returns the profile for "project/printer", or for "project" if that project has
+        exactly one printer. Raises KeyError if there is no such profile.
+        """
+        if name in self.profiles:
+            return self.profiles[name]
+        matches = [profile for profile in self.profiles.values() if profile.project == name]
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise KeyError(f"Project '{name}' has several printers, use one of: "
+                           f"{', '.join(profile.key for profile in matches)}")
+        raise KeyError(f"No printer profile '{name}', choose from: {', '.join(self.get_names())}")
+
+
+def get_selected_profile_name(default, argv=None):
+    """
+    Profile name from --profile NAME (or --profile=NAME) in argv, else the
+    PRINTER_PROFILE environment variable, else default.
+    """
+    if argv:
+        for index, arg in enumerate(argv):
+            if arg == "--profile" and index + 1 < len(argv):
+                return argv[index + 1]
+            if arg.startswith("--profile="):
+                return arg.split("=", 1)[1]
+    return os.environ.get(PROFILE_ENV_VAR, default)
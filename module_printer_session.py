@@ -0,0 +1,140 @@
+"""
+Module for remembering if the printer is already homed between GUI sessions
+
+Description: Homing (G28 plus the waits around it) costs 20-40 seconds on every start,
+even when the printer stayed powered and homed since the last session. This keeps a
+small JSON session file, one entry per printer (keyed by the USB serial number, so it
+doesn't matter if the board comes up as ttyUSB0 or ttyUSB1):
+    {"<serial>": {"homed": true, "position": {"X": 0.0, "Y": 200.0, "Z": 50.0}, "time": ...}}
+
+Homing can be skipped only if all of these are true:
+-The entry says the printer was homed, and it is not older than SESSION_MAX_AGE
+-The firmware did not reboot when the port was opened (no "start" boot banner)
+-M114 reports the same position that was saved when the last session closed
+-That position is not 0,0,0
+
+Marlin forgets its position when it reboots and reports 0,0,0. That is also where these
+printers are right after G28, and with open_without_reset there is no boot banner, so a
+saved 0,0,0 can't tell a homed printer from a power-cycled one and is never trusted.
+When homing is skipped, HOME_IF_NEEDED_GCODE (G28 O) is still sent: Marlin homes only
+the axes it doesn't know are homed, and does nothing if they are. If the steppers were
+turned off and the axes pushed by hand, nothing can tell; use force_home then.
+
+Changelog:
+18 Oct 2026: A saved position of 0,0,0 is never trusted, and skipping homing still sends G28 O.
+18 Oct 2026: Created PrinterSession.
+"""
+import json
+import os
+import time
+
+# Positions must match within this (mm) to trust the saved homed state
+POSITION_TOLERANCE = 0.05
+
+# Don't trust a session older than this (in seconds), steppers may have been moved by hand
+SESSION_MAX_AGE = 12 * 60 * 60
+
+# Where Marlin thinks it is after power on (before homing)
+POWER_ON_POSITION = {"X": 0.0, "Y": 0.0, "Z": 0.0}
+
+# Sent instead of G28 when homing is skipped: Marlin homes only axes that aren't homed
+# (firmware without the O option homes everything, which is safe)
+HOME_IF_NEEDED_GCODE = "G28 O"
+
+# Text Marlin prints when it boots
+BOOT_BANNERS = ("start", "Marlin")
+
+
+# Define function to get the USB serial number of the board behind device_path
+def get_device_serial(device_path):
+    # Falls back to the (resolved) device path if the USB adapter has no serial number
+    from serial.tools import list_ports
+
+    real_path = os.path.realpath(device_path)
+    for port in list_ports.comports():
+        if port.device in (device_path, real_path):
+            if port.serial_number:
+                return port.serial_number
+            if port.vid is not None:
+                return f"{port.vid:04x}:{port.pid:04x}:{port.location}"
+    return real_path
+
+
+# Define function to check serial text for the firmware's boot banner
+def is_boot_banner(serial_text):
+    return any(line.strip().startswith(BOOT_BANNERS) for line in serial_text.splitlines())
+
+
+# Define function to compare two {"X", "Y", "Z"} positions
+def is_same_position(position_1, position_2, tolerance=POSITION_TOLERANCE):
+    if not position_1 or not position_2:
+        return False
+    try:
+        return all(abs(float(position_1[axis]) - float(position_2[axis])) <= tolerance for axis in ("X", "Y", "Z"))
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+class PrinterSession:
+    """Homed state and last known position of each printer, saved in a JSON file."""
+
+    def __init__(self, session_file):
+        self.session_file = session_file
+        self.entries = self.load()
+
+    def load(self):
+        try:
+            with open(self.session_file) as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def save(self):
+        # Write to a temporary file first, so a crash never leaves half a file
+        temp_file = f"{self.session_file}.tmp"
+        try:
+            with open(temp_file, "w") as file:
+                json.dump(self.entries, file, indent=2)
+            os.replace(temp_file, self.session_file)
+        except OSError as e:
+            print(f"Could not save printer session to {self.session_file}: {e}")
+
+    def get(self, device_serial):
+        return self.entries.get(device_serial, {})
+
+    def set_homed(self, device_serial, position):
+        self.entries[device_serial] = {"homed": True, "position": dict(position), "time": time.time()}
+        self.save()
+
+    def set_position(self, device_serial, position):
+        # Only keeps the homed flag if the printer was homed before
+        entry = self.get(device_serial)
+        if not entry.get("homed"):
+            return
+        self.set_homed(device_serial, position)
+
+    def clear(self, device_serial):
+        # Homing failed or was interrupted
+        if self.entries.pop(device_serial, None) is not None:
+            self.save()
+
+    def can_skip_homing(self, device_serial, position, did_reboot):
+        """
+        Returns (True, reason) if the printer is still homed, else (False, reason).
+        position is what M114 reports now (None if it didn't answer).
+        """
+        entry = self.get(device_serial)
+        if not entry.get("homed"):
+            return False, "no saved session for this printer"
+        if did_reboot:
+            return False, "printer rebooted when the port was opened"
+        if time.time() - entry.get("time", 0) > SESSION_MAX_AGE:
+            return False, "saved session is too old"
+        if position is None:
+            return False, "printer did not report its position (M114)"
+        if is_same_position(position, POWER_ON_POSITION):
+            return False, "printer reports 0,0,0, same as after a power cycle"
+        if not is_same_position(position, entry.get("position")):
+            return False, f"position {position} does not match saved {entry.get('position')}"
+        return True, "printer is still homed at the saved position"
@@ -0,0 +1,247 @@
+"""
+Module for packing each finished round into one archive file in the background
+
+Description: Copying an experiment off the Pi means moving thousands of small pictures,
+which is slow on SD/USB and over scp. A RoundArchiver packs the pictures of a finished
+round into one uncompressed archive (tar, or zip with ZIP_STORED: JPEGs don't compress
+anyway), in <experiment folder>/archives/round_0001.tar, with an index next to it
+(round_0001.tar.index.json) giving the byte offset and size of every file, so one
+picture can be read straight out of the archive with a seek.
+
+Loose files are deleted only after the archive is verified: every file is read back
+from the archive at its indexed offset and must have the same SHA-256 as the loose file.
+
+The packing thread runs at low priority (per-thread nice) and is rate limited, so it
+doesn't compete with capturing for the CPU or the disk.
+
+Usage:
+    archiver = RoundArchiver(archive_format="tar", max_rate_mb=20)
+    archiver.start()
+    archiver.add_round(folder_path, "round_0001", file_paths)  # after the round is done
+    archiver.close()  # waits for rounds still being packed
+
+    data = read_archived_file(folder_path, "round_0001/well_037.jpg")
+
+Changelog:
+18 Oct 2026: Added get_archived_files() (where every archived file is, for tools reading many).
+18 Oct 2026: Created RoundArchiver, archive index and read_archived_file().
+"""
+import glob
+import hashlib
+import json
+import os
+import queue
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+
+# Archive Formats
+FORMAT_TAR = "tar"
+FORMAT_ZIP = "zip"
+FORMATS = [FORMAT_TAR, FORMAT_ZIP]
+
+# Archives (and their indexes) go in this subfolder of the experiment folder
+ARCHIVE_FOLDER = "archives"
+INDEX_SUFFIX = ".index.json"
+
+# Niceness of the packing thread
+ARCHIVER_NICENESS = 15
+
+# How long to wait for a file that isn't written yet (e.g. still in staging), in seconds
+FILE_WAIT_TIMEOUT = 120
+
+CHUNK_SIZE = 1024 * 1024
+
+# Zip local file header: fixed size, then the file name and extra field (lengths at fields 10 and 11)
+ZIP_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+# Define function to get the SHA-256 of a file or of a byte range in a file
+def get_checksum(file_path, offset=0, size=None):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        file.seek(offset)
+        remaining = size
+        while remaining is None or remaining > 0:
+            chunk = file.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+# Define function to find where each member's data starts in an archive, returns {name: (offset, size)}
+def get_member_offsets(archive_path, archive_format):
+    offsets = {}
+    if archive_format == FORMAT_TAR:
+        with tarfile.open(archive_path) as tar:
+            for member in tar.getmembers():
+                offsets[member.name] = (member.offset_data, member.size)
+    else:
+        with zipfile.ZipFile(archive_path) as archive, open(archive_path, "rb") as file:
+            for info in archive.infolist():
+                file.seek(info.header_offset)
+                header = ZIP_LOCAL_HEADER.unpack(file.read(ZIP_LOCAL_HEADER.size))
+                offset = info.header_offset + ZIP_LOCAL_HEADER.size + header[10] + header[11]
+                offsets[info.filename] = (offset, info.file_size)
+    return offsets
+
+
+# Define function to read one file back out of an experiment's round archives (None if it isn't archived)
+def read_archived_file(folder_path, relative_path):
+    relative_path = relative_path.replace(os.sep, "/")
+    for index_path in sorted(glob.glob(os.path.join(folder_path, ARCHIVE_FOLDER, "*" + INDEX_SUFFIX))):
+        with open(index_path) as file:
+            index = json.load(file)
+        member = index["members"].get(relative_path)
+        if member is not None:
+            archive_path = os.path.join(os.path.dirname(index_path), index["archive"])
+            with open(archive_path, "rb") as archive:
+                archive.seek(member["offset"])
+                return archive.read(member["size"])
+    return None
+
+
+# Define function to list every archived file of an experiment, returns {relative path: (archive path, offset, size)}
+def get_archived_files(folder_path):
+    archived_files = {}
+    for index_path in sorted(glob.glob(os.path.join(folder_path, ARCHIVE_FOLDER, "*" + INDEX_SUFFIX))):
+        with open(index_path) as file:
+            index = json.load(file)
+        archive_path = os.path.join(os.path.dirname(index_path), index["archive"])
+        for name, member in index["members"].items():
+            archived_files[name] = (archive_path, member["offset"], member["size"])
+    return archived_files
+
+
+class RoundArchiver:
+    """Packs finished rounds into stored (uncompressed) archives on a low priority thread."""
+
+    def __init__(self, archive_format=FORMAT_TAR, delete_loose=True, max_rate_mb=None, is_pending=None):
+        """
+        max_rate_mb limits how fast files are packed (MB/s, None for no limit).
+        is_pending(path) returns True while a file is still being written (e.g. staged, not moved yet).
+        """
+        if archive_format not in FORMATS:
+            raise ValueError(f"Unknown archive format '{archive_format}', use one of {FORMATS}")
+        self.archive_format = archive_format
+        self.delete_loose = delete_loose
+        self.max_rate_mb = max_rate_mb
+        self.is_pending = is_pending
+        self.rounds = queue.Queue()
+        self.thread = None
+        self.packed_rounds = 0
+        self.failed_rounds = []
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="round-archiver", daemon=True)
+        self.thread.start()
+
+    def add_round(self, folder_path, round_name, file_paths):
+        # Packs file_paths (all inside folder_path) into folder_path/archives/<round_name>.<format>
+        if file_paths:
+            self.rounds.put((folder_path, round_name, list(file_paths)))
+
+    def run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), ARCHIVER_NICENESS)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self.rounds.get()
+            if item is None:
+                break
+            folder_path, round_name, file_paths = item
+            try:
+                self.pack_round(folder_path, round_name, file_paths)
+                self.packed_rounds += 1
+            except (OSError, ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+                # Loose files are kept, nothing is lost
+                print(f"Could not archive {round_name}: {e}")
+                self.failed_rounds.append(round_name)
+
+    def wait_for_files(self, file_paths):
+        # Returns the files that exist, after waiting for any still being written
+        if self.is_pending is not None:
+            end_time = time.monotonic() + FILE_WAIT_TIMEOUT
+            while any(self.is_pending(path) for path in file_paths) and time.monotonic() < end_time:
+                time.sleep(1)
+        return [path for path in file_paths if os.path.isfile(path)]
+
+    def pack_round(self, folder_path, round_name, file_paths):
+        file_paths = self.wait_for_files(file_paths)
+        if not file_paths:
+            return
+        archive_folder = os.path.join(folder_path, ARCHIVE_FOLDER)
+        os.makedirs(archive_folder, exist_ok=True)
+        archive_name = f"{round_name}.{self.archive_format}"
+        archive_path = os.path.join(archive_folder, archive_name)
+        part_path = archive_path + ".part"
+
+        # Member names are relative to the experiment folder (same as in the folder layout)
+        members = {os.path.relpath(path, folder_path).replace(os.sep, "/"): path for path in file_paths}
+        checksums = {name: get_checksum(path) for name, path in members.items()}
+
+        start = time.monotonic()
+        packed_bytes = 0
+        if self.archive_format == FORMAT_TAR:
+            archive = tarfile.open(part_path, "w")
+        else:
+            archive = zipfile.ZipFile(part_path, "w", compression=zipfile.ZIP_STORED)
+        with archive:
+            for name, path in members.items():
+                if self.archive_format == FORMAT_TAR:
+                    archive.add(path, arcname=name)
+                else:
+                    archive.write(path, arcname=name)
+                packed_bytes += os.path.getsize(path)
+                self.throttle(packed_bytes, start)
+
+        # Verify every member at its offset before anything is deleted
+        offsets = get_member_offsets(part_path, self.archive_format)
+        index = {"archive": archive_name, "format": self.archive_format, "members": {}}
+        for name, path in members.items():
+            if name not in offsets:
+                raise ValueError(f"{name} is missing from {archive_name}")
+            offset, size = offsets[name]
+            if size != os.path.getsize(path) or get_checksum(part_path, offset, size) != checksums[name]:
+                raise ValueError(f"{name} does not match in {archive_name}")
+            index["members"][name] = {"offset": offset, "size": size, "sha256": checksums[name]}
+        os.replace(part_path, archive_path)
+        with open(archive_path + INDEX_SUFFIX + ".tmp", "w") as file:
+            json.dump(index, file, indent=1)
+        os.replace(archive_path + INDEX_SUFFIX + ".tmp", archive_path + INDEX_SUFFIX)
+
+        if self.delete_loose:
+            for path in members.values():
+                os.remove(path)
+            # The round's folder (round layout) is empty now. Well folders (well layout) are kept,
+            # the next rounds are written into them
+            round_folder = os.path.join(folder_path, round_name)
+            if os.path.isdir(round_folder) and not os.listdir(round_folder):
+                os.rmdir(round_folder)
+        print(f"Archived {round_name}: {len(members)} files, {packed_bytes / 1e6:.1f} MB "
+              f"in {time.monotonic() - start:.1f} sec")
+
+    def throttle(self, packed_bytes, start):
+        # Sleep so packing stays under max_rate_mb on average
+        if not self.max_rate_mb:
+            return
+        ahead = packed_bytes / 1e6 / self.max_rate_mb - (time.monotonic() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    def close(self):
+        # Waits for rounds still queued or being packed
+        if self.thread is None:
+            return
+        if not self.rounds.empty():
+            print(f"Waiting for {self.rounds.qsize()} round(s) to be archived...")
+        self.rounds.put(None)
+        self.thread.join()
+        self.thread = None
+        print(f"Archived {self.packed_rounds} round(s), {len(self.failed_rounds)} failed")
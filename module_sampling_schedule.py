@@ -0,0 +1,172 @@
+"""
+Module for sparse and staggered well sampling
+
+Description: Lets an experiment visit only some wells each round.
+-Per-well interval: a well with interval N is visited every Nth round (1 = every round).
+ Intervals come from an optional "Interval" column in the location CSV.
+-Staggered subsets: wells are split into N groups and one group is visited per round
+ (rotating subset), so every well is still visited every Nth round.
+
+Wells that share an interval are spread across rounds (staggered) so rounds stay about
+the same length. The whole schedule is worked out before the experiment starts: the
+pattern of active wells repeats every lcm(intervals) rounds, and each distinct set of
+active wells gets its own short visiting order (nearest neighbour, then 2-opt).
+During the experiment, getting a round's wells is a list lookup. If the pattern is longer
+than MAX_PATTERN_ROUNDS, each round's wells are worked out when the round is reached instead.
+
+Changelog:
+18 Oct 2026: Added get_total_visits() for the disk estimate.
+18 Oct 2026: Patterns longer than MAX_PATTERN_ROUNDS are planned per round (were cut short, breaking intervals).
+18 Oct 2026: Created SamplingSchedule and CSV interval loader.
+"""
+import csv
+import math
+
+from module_experiment_estimator import get_distance
+
+# Sampling Modes (match the GUI combo box)
+SAMPLING_ALL = "All wells"
+SAMPLING_CSV_INTERVAL = "Per-well interval (CSV)"
+SAMPLING_STAGGERED = "Staggered subsets"
+SAMPLING_MODES = [SAMPLING_ALL, SAMPLING_CSV_INTERVAL, SAMPLING_STAGGERED]
+
+# Name of the optional interval column in the location CSV
+INTERVAL_COLUMN = "interval"
+
+# Longest repeating pattern planned before the experiment (longer ones are planned round by round)
+MAX_PATTERN_ROUNDS = 5000
+
+
+def get_well_intervals_csv(csv_filename):
+    """
+    Reads the optional "Interval" column from a location CSV.
+    Returns a list with one interval per well (1 if the column or value is missing).
+    """
+    intervals = []
+    with open(csv_filename, newline="") as f:
+        reader = csv.reader(f)
+        headers = [header.strip().lower() for header in next(reader)]
+        column = headers.index(INTERVAL_COLUMN) if INTERVAL_COLUMN in headers else None
+        for row in reader:
+            if not row:
+                continue
+            interval = 1
+            if column is not None and column < len(row) and row[column].strip():
+                interval = max(1, int(float(row[column])))
+            intervals.append(interval)
+    return intervals
+
+
+def get_path_length(path_list, order):
+    return sum(get_distance(path_list[a], path_list[b]) for a, b in zip(order, order[1:]))
+
+
+def get_visiting_order(path_list, wells):
+    """
+    Short open path through the given wells (indices into path_list).
+    Starts at the active well that comes first in the CSV, builds a nearest neighbour
+    path, improves it with 2-opt, and keeps the CSV order if that is still shorter.
+    """
+    wells = sorted(wells)
+    if len(wells) <= 2:
+        return wells
+
+    # Nearest neighbour
+    order = [wells[0]]
+    remaining = set(wells[1:])
+    while remaining:
+        last = path_list[order[-1]]
+        next_well = min(remaining, key=lambda well: (get_distance(last, path_list[well]), well))
+        order.append(next_well)
+        remaining.remove(next_well)
+
+    # 2-opt: reverse a section of the path whenever that makes it shorter
+    is_improved = True
+    while is_improved:
+        is_improved = False
+        for i in range(1, len(order) - 1):
+            for j in range(i + 1, len(order)):
+                a, b = path_list[order[i - 1]], path_list[order[i]]
+                c = path_list[order[j]]
+                before = get_distance(a, b)
+                after = get_distance(a, c)
+                if j + 1 < len(order):
+                    d = path_list[order[j + 1]]
+                    before += get_distance(c, d)
+                    after += get_distance(b, d)
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    is_improved = True
+
+    if get_path_length(path_list, wells) <= get_path_length(path_list, order):
+        return wells
+    return order
+
+
+def get_staggered_phases(intervals):
+    # Spread wells that share an interval over the rounds, so every round has about the same number of wells
+    phases = []
+    seen = {}
+    for interval in intervals:
+        count = seen.get(interval, 0)
+        phases.append(count % interval)
+        seen[interval] = count + 1
+    return phases
+
+
+class SamplingSchedule:
+    """Precomputed list of which wells to visit (and in what order) for each round."""
+
+    def __init__(self, path_list, intervals=None, stagger=True):
+        self.path_list = path_list
+        self.intervals = intervals if intervals is not None else [1] * len(path_list)
+        if len(self.intervals) != len(path_list):
+            raise ValueError(f"Got {len(self.intervals)} intervals for {len(path_list)} wells")
+        self.phases = get_staggered_phases(self.intervals) if stagger else [0] * len(path_list)
+
+        # Pattern of active wells repeats every lcm(intervals) rounds
+        pattern_rounds = 1
+        for interval in set(self.intervals):
+            pattern_rounds = pattern_rounds * interval // math.gcd(pattern_rounds, interval)
+        self.pattern_rounds = pattern_rounds
+
+        # Only plan each distinct set of active wells once
+        self.orders = {}
+        self.pattern = None
+        if pattern_rounds <= MAX_PATTERN_ROUNDS:
+            self.pattern = [self.plan_round(round_index) for round_index in range(pattern_rounds)]
+
+    def plan_round(self, round_index):
+        # Visiting order of the wells active in round_index
+        active = frozenset(well for well, (interval, phase) in enumerate(zip(self.intervals, self.phases))
+                           if round_index % interval == phase)
+        if active not in self.orders:
+            self.orders[active] = tuple(get_visiting_order(self.path_list, active))
+        return self.orders[active]
+
+    def get_round(self, round_index):
+        # Well indices (0 based, into path_list) to visit in this round, in visiting order
+        if self.pattern is None:
+            return self.plan_round(round_index)
+        return self.pattern[round_index % self.pattern_rounds]
+
+    def get_mean_wells_per_round(self):
+        if self.pattern is None:
+            return sum(1 / interval for interval in self.intervals)
+        return sum(len(order) for order in self.pattern) / self.pattern_rounds
+
+    def get_total_visits(self, num_rounds):
+        # Well visits (samples) in the first num_rounds rounds, counted without planning the rounds
+        return sum(max(0, -(-(num_rounds - phase) // interval))
+                   for interval, phase in zip(self.intervals, self.phases))
+
+
+def get_sampling_schedule(path_list, sampling_mode, csv_filename=None, num_groups=1):
+    # Builds the SamplingSchedule for one of the GUI sampling modes
+    if sampling_mode == SAMPLING_CSV_INTERVAL:
+        intervals = get_well_intervals_csv(csv_filename)
+    elif sampling_mode == SAMPLING_STAGGERED:
+        intervals = [max(1, num_groups)] * len(path_list)
+    else:
+        intervals = None
+    return SamplingSchedule(path_list, intervals)
@@ -0,0 +1,170 @@
+"""
+Module for adaptive dwell: wait at a well only until the image stops moving
+
+Description: After a move, the gantry (and the plate on the bed) keeps ringing for a bit.
+Instead of always waiting a fixed time, watch consecutive low resolution (lores) frames
+and fire the still as soon as the motion between frames is below a threshold for a few
+frames in a row, or when the timeout is hit.
+
+Motion is measured one of two ways:
+-"diff": mean absolute difference of the grey frames (in grey levels, 0-255)
+-"phase": shift between frames found with phase correlation (in lores pixels)
+
+How long it took to settle is learned per move distance (in buckets of a few mm) and saved
+to a small JSON file, so later rounds skip polling for the time the gantry is known to need.
+
+Changelog:
+18 Oct 2026: A move of unknown length waits the full timeout before checking (could pass before the move began).
+18 Oct 2026: Created SettleDetector with frame difference and phase correlation modes.
+"""
+import json
+import os
+import time
+
+import settings as C
+from module_experiment_estimator import get_move_time
+
+# Motion Measurement Methods
+METHOD_DIFF = "diff"
+METHOD_PHASE = "phase"
+
+# Default thresholds, "diff" is in grey levels, "phase" is in lores pixels
+DEFAULT_THRESHOLDS = {METHOD_DIFF: 1.5, METHOD_PHASE: 0.3}
+
+# Number of still frame pairs in a row before the image counts as settled
+STABLE_FRAMES = 3
+
+# Width of a distance bucket for learned settle times (in mm)
+BUCKET_MM = 10
+
+# How much a new settle time changes the learned one (0 to 1)
+LEARN_RATE = 0.3
+
+# Start polling a bit before the learned settle time, in case this move settles faster
+PREDICTION_MARGIN = 0.8
+
+# Width of the grey frame when falling back to the main stream (no lores stream configured)
+FALLBACK_WIDTH = 320
+
+
+class SettleDetector:
+    """Waits until consecutive preview frames stop changing after a move."""
+
+    def __init__(self, method=METHOD_DIFF, threshold=None, stable_frames=STABLE_FRAMES,
+                 bucket_mm=BUCKET_MM, cache_path=None):
+        self.method = method
+        self.threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+        self.stable_frames = stable_frames
+        self.bucket_mm = bucket_mm
+        self.cache_path = cache_path
+        # Learned settle time (seconds) per distance bucket
+        self.settle_times = {}
+        self._has_lores = True
+
+        if cache_path and os.path.isfile(cache_path):
+            with open(cache_path) as f:
+                self.settle_times = {int(k): v for k, v in json.load(f).items()}
+
+    def get_bucket(self, distance):
+        return int(distance // self.bucket_mm)
+
+    def predict(self, distance):
+        # Learned settle time for this distance, or None if not seen yet
+        if distance is None:
+            return None
+        return self.settle_times.get(self.get_bucket(distance))
+
+    def learn(self, distance, settle_time):
+        bucket = self.get_bucket(distance)
+        if bucket in self.settle_times:
+            self.settle_times[bucket] += LEARN_RATE * (settle_time - self.settle_times[bucket])
+        else:
+            self.settle_times[bucket] = settle_time
+
+    def save(self):
+        if not self.cache_path:
+            return
+        with open(self.cache_path, "w") as f:
+            json.dump({str(k): round(v, 3) for k, v in sorted(self.settle_times.items())}, f, indent=2)
+
+    def grab_gray_frame(self, camera, camera_lock=None):
+        # Grey (luminance) frame from the lores stream, or a downscaled main stream frame
+        import cv2
+
+        if camera_lock:
+            with camera_lock:
+                return self._grab_gray_frame(camera, cv2)
+        return self._grab_gray_frame(camera, cv2)
+
+    def _grab_gray_frame(self, camera, cv2):
+        if self._has_lores:
+            try:
+                frame = camera.capture_array("lores")
+            except Exception:
+                print("No lores stream configured, using main stream for settle detection")
+                self._has_lores = False
+            else:
+                if frame.ndim == 2:
+                    # YUV420: the first 2/3 of the rows are the Y (grey) plane
+                    return frame[:frame.shape[0] * 2 // 3]
+                return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+
+        frame = camera.capture_array("main")
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY if frame.shape[2] == 3 else cv2.COLOR_RGBA2GRAY)
+        height = int(gray.shape[0] * FALLBACK_WIDTH / gray.shape[1])
+        return cv2.resize(gray, (FALLBACK_WIDTH, height), interpolation=cv2.INTER_AREA)
+
+    def get_motion(self, previous_frame, frame):
+        import cv2
+        import numpy as np
+
+        if self.method == METHOD_PHASE:
+            (dx, dy), response = cv2.phaseCorrelate(previous_frame.astype(np.float32), frame.astype(np.float32))
+            return (dx * dx + dy * dy) ** 0.5
+        return float(cv2.absdiff(previous_frame, frame).mean())
+
+    def wait_until_settled(self, camera, distance, stop_event, timeout, camera_lock=None):
+        """
+        Call right after sending the move. Blocks until the image is still, the timeout
+        is hit, or stop_event is set. distance is the move length in mm (None if unknown:
+        the move could be anything, so the full timeout is waited before checking).
+        Returns the number of seconds waited.
+        """
+        start = time.monotonic()
+
+        # The image can't be still before the move is done, and the gantry took
+        # about this long last time for a move of this size
+        if distance is None:
+            # First well of a run or plate job: still frames may be from before the gantry starts moving
+            min_wait = timeout
+        else:
+            min_wait = get_move_time(distance, C.MAX_SPEED, C.ACCELERATION)
+            predicted = self.predict(distance)
+            if predicted is not None:
+                min_wait = max(min_wait, predicted * PREDICTION_MARGIN)
+        timeout = max(timeout, min_wait + 1.0)
+
+        while time.monotonic() - start < min_wait and not stop_event.is_set():
+            time.sleep(min(0.05, min_wait))
+
+        previous_frame = None
+        stable_count = 0
+        is_settled = False
+        while not stop_event.is_set() and time.monotonic() - start < timeout:
+            frame = self.grab_gray_frame(camera, camera_lock)
+            if previous_frame is not None:
+                if self.get_motion(previous_frame, frame) < self.threshold:
+                    stable_count += 1
+                else:
+                    stable_count = 0
+                if stable_count >= self.stable_frames:
+                    is_settled = True
+                    break
+            previous_frame = frame
+
+        waited = time.monotonic() - start
+        if is_settled and distance is not None:
+            self.learn(distance, waited)
+        if not is_settled and not stop_event.is_set():
+            print(f"Image did not settle within {timeout:.1f} sec, taking sample anyway")
+        return waited
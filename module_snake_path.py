@@ -33,3 +33,39 @@ def generate_snake_csv(corners, rows, cols, outfile, z_override=None):
                     pt["Z"] = z_override
                 writer.writerow([idx, f"{pt['X']:.2f}", f"{pt['Y']:.2f}", f"{pt['Z']:.2f}"])
                 idx += 1
+
+
+# Define function to get the (row, col) of a well from its index in the snake path (row 0 is the first row visited)
+def get_snake_row_col(idx, cols):
+    r, position = divmod(idx, cols)
+    c = position if r % 2 == 0 else cols - 1 - position
+    return r, c
+
+
+# Define function to get the index in the snake path of the well at (row, col)
+def get_snake_index(r, c, cols):
+    return r * cols + (c if r % 2 == 0 else cols - 1 - c)
+
+
+def get_snake_shape(path_list, min_cos=0.5):
+    """
+    Guesses (rows, cols) of a snake path from its points ([X, Y, Z] or {"X", "Y"}):
+    a row ends where the path stops going the way it went from the first well to the second.
+    A path that never turns is one row.
+    """
+    points = [(p["X"], p["Y"]) if isinstance(p, dict) else (p[0], p[1]) for p in path_list]
+    if len(points) < 3:
+        return 1, len(points)
+    first_dx = points[1][0] - points[0][0]
+    first_dy = points[1][1] - points[0][1]
+    first_length = (first_dx ** 2 + first_dy ** 2) ** 0.5
+    cols = len(points)
+    for idx in range(1, len(points) - 1):
+        dx = points[idx + 1][0] - points[idx][0]
+        dy = points[idx + 1][1] - points[idx][1]
+        length = (dx ** 2 + dy ** 2) ** 0.5
+        if first_length == 0 or length == 0 or (dx * first_dx + dy * first_dy) / (length * first_length) < min_cos:
+            cols = idx + 1
+            break
+    rows = -(-len(points) // cols)
+    return rows, cols
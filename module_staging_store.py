@@ -0,0 +1,238 @@
+"""
+Module for staging captures on a fast local folder and moving them to the slow save folder
+
+Description: PIC_SAVE_FOLDER is often a USB disk, and a still capture waits for that disk
+(write latency, spin-ups). With a StagingStore the camera writes into a staging folder
+on tmpfs (/dev/shm, RAM) or the SD card instead, and a background thread moves each file
+to its final path:
+-Copies to "<final path>.part", checksums while copying, reads the copy back to verify
+ (size and SHA-256, or size only), then renames it into place and deletes the staged file
+-Retries a failed move a few times, then leaves the file in staging (listed in the journal
+ and in failed). It no longer counts against the quota or as pending, so captures and the
+ round archiver don't wait on it
+-Staged bytes are limited by quota_bytes: wait_for_room() blocks the capture until the mover
+ has made room (backpressure), and gives up after a timeout so the caller can write straight
+ to the final folder instead of waiting forever on a disk that is gone
+
+Every staged file is listed in a journal in the staging folder until it is moved, so files
+left behind by a crash (SD card staging) are moved on the next start. tmpfs is lost on
+power loss, so at most the files not moved yet (quota_bytes) are lost then.
+
+Usage:
+    store = StagingStore("/dev/shm/3dprinter_staging", quota_bytes=512 * 1024 * 1024)
+    store.start()
+    staging_path = store.get_staging_path(file_full_path)
+    if store.wait_for_room():
+        capture_still(camera, staging_path)
+        store.commit(staging_path, file_full_path)
+    store.close()  # waits until every file is moved
+
+Changelog:
+18 Oct 2026: A file that can't be moved is no longer pending and frees its quota.
+18 Oct 2026: Created StagingStore.
+"""
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import time
+
+# Verification of moved files
+VERIFY_SHA256 = "sha256"
+VERIFY_SIZE = "size"
+
+# Size used for backpressure before the first file is staged (a 12MP JPEG is ~4-8 MB)
+FILE_SIZE_ESTIMATE = 8 * 1024 * 1024
+
+# Copy block size
+CHUNK_SIZE = 1024 * 1024
+
+# Attempts per file before leaving it in staging, and the wait between attempts (seconds)
+MOVE_ATTEMPTS = 3
+RETRY_WAIT = 2
+
+# Lists staged files not moved yet: "<staging path>\t<final path>" per line
+JOURNAL_FILENAME = "pending.tsv"
+
+# Niceness of the mover thread, so moving never competes with the experiment thread
+MOVER_NICENESS = 10
+
+
+# Define function to copy a file to dest_path, returning the SHA-256 of what was read
+def copy_with_checksum(source_path, dest_path):
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as source, open(dest_path, "wb") as dest:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            dest.write(chunk)
+        dest.flush()
+        os.fsync(dest.fileno())
+    return digest.hexdigest()
+
+
+# Define function to get the SHA-256 of a file
+def get_checksum(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StagingStore:
+    """Stages captures in a fast folder and moves them to their final path in the background."""
+
+    def __init__(self, staging_dir, quota_bytes, verify=VERIFY_SHA256, room_timeout=60):
+        self.staging_dir = staging_dir
+        self.quota_bytes = quota_bytes
+        self.verify = verify
+        self.room_timeout = room_timeout
+        self.journal_path = os.path.join(staging_dir, JOURNAL_FILENAME)
+        os.makedirs(staging_dir, exist_ok=True)
+
+        self.moves = queue.Queue()
+        # Final path -> size, for files staged but not moved yet
+        self.pending = {}
+        self.staged_bytes = 0
+        self.largest_file = FILE_SIZE_ESTIMATE
+        self.room = threading.Condition()
+        self.names = itertools.count()
+        self.thread = None
+
+        # Stats
+        self.moved_files = 0
+        self.moved_bytes = 0
+        self.move_seconds = 0.0
+        self.failed = []
+
+    def start(self):
+        # Re-queue files a previous run left behind, then start the mover
+        self.recover()
+        self.thread = threading.Thread(target=self.run_mover, name="staging-mover", daemon=True)
+        self.thread.start()
+
+    def get_staging_path(self, final_path):
+        # Unique name in the staging folder (keeps the file name, so the extension still picks the format)
+        return os.path.join(self.staging_dir, f"{os.getpid()}_{next(self.names)}_{os.path.basename(final_path)}")
+
+    def wait_for_room(self, expected_bytes=None, timeout=None):
+        """
+        Blocks until expected_bytes (default: the largest file so far) fit in the quota.
+        Returns False if there is still no room after timeout seconds (write to the final path then).
+        """
+        if expected_bytes is None:
+            expected_bytes = self.largest_file
+        if timeout is None:
+            timeout = self.room_timeout
+        end_time = time.monotonic() + timeout
+        with self.room:
+            while self.staged_bytes > 0 and self.staged_bytes + expected_bytes > self.quota_bytes:
+                time_left = end_time - time.monotonic()
+                if time_left <= 0:
+                    print(f"Staging is full ({self.staged_bytes / 1e6:.0f} MB waiting to be moved)")
+                    return False
+                self.room.wait(time_left)
+        return True
+
+    def commit(self, staging_path, final_path):
+        # Hands a finished file to the mover
+        file_bytes = os.path.getsize(staging_path)
+        with self.room:
+            self.pending[final_path] = file_bytes
+            self.staged_bytes += file_bytes
+            self.largest_file = max(self.largest_file, file_bytes)
+            with open(self.journal_path, "a") as journal:
+                journal.write(f"{staging_path}\t{final_path}\n")
+        self.moves.put((staging_path, final_path, file_bytes))
+
+    def get_pending_bytes(self, final_path):
+        # Size of a file that is staged but not moved yet (None if it isn't staged)
+        with self.room:
+            return self.pending.get(final_path)
+
+    def is_pending(self, final_path):
+        # True while a file is staged but not at final_path yet
+        return self.get_pending_bytes(final_path) is not None
+
+    def recover(self):
+        # Journal entries whose staged file still exists were never moved
+        try:
+            with open(self.journal_path) as journal:
+                entries = [line.rstrip("\n").split("\t") for line in journal if "\t" in line]
+        except OSError:
+            return
+        os.remove(self.journal_path)
+        for staging_path, final_path in entries:
+            if os.path.exists(staging_path):
+                print(f"Moving file left in staging: {final_path}")
+                self.commit(staging_path, final_path)
+
+    def run_mover(self):
+        try:
+            # Per thread on Linux: only the mover runs at lower priority
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), MOVER_NICENESS)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self.moves.get()
+            if item is None:
+                break
+            staging_path, final_path, file_bytes = item
+            start = time.monotonic()
+            for attempt in range(1, MOVE_ATTEMPTS + 1):
+                try:
+                    self.move_file(staging_path, final_path, file_bytes)
+                    break
+                except (OSError, ValueError) as e:
+                    print(f"Could not move {staging_path} to {final_path} (attempt {attempt}): {e}")
+                    time.sleep(RETRY_WAIT)
+            else:
+                # Stays staged and in the journal (moved on the next start), but no longer waited for
+                with self.room:
+                    self.failed.append((staging_path, final_path))
+                    self.pending.pop(final_path, None)
+                    self.staged_bytes -= file_bytes
+                    self.room.notify_all()
+                continue
+            self.move_seconds += time.monotonic() - start
+            self.moved_files += 1
+            self.moved_bytes += file_bytes
+            with self.room:
+                self.pending.pop(final_path, None)
+                self.staged_bytes -= file_bytes
+                if not self.pending and not self.failed:
+                    # Everything is moved, start the journal over
+                    open(self.journal_path, "w").close()
+                self.room.notify_all()
+
+    def move_file(self, staging_path, final_path, file_bytes):
+        # Copy, verify, rename into place, then delete the staged file
+        part_path = final_path + ".part"
+        checksum = copy_with_checksum(staging_path, part_path)
+        if os.path.getsize(part_path) != file_bytes:
+            os.remove(part_path)
+            raise ValueError(f"size mismatch, expected {file_bytes} bytes")
+        if self.verify == VERIFY_SHA256 and get_checksum(part_path) != checksum:
+            os.remove(part_path)
+            raise ValueError("checksum mismatch")
+        os.replace(part_path, final_path)
+        os.remove(staging_path)
+
+    def close(self):
+        # Waits until every staged file is moved (or has failed), then stops the mover
+        if self.thread is None:
+            return
+        if not self.moves.empty():
+            print(f"Waiting for {self.moves.qsize()} staged file(s) to be moved...")
+        self.moves.put(None)
+        self.thread.join()
+        self.thread = None
+        print(self.format_stats())
+        for staging_path, final_path in self.failed:
+            print(f"NOT MOVED, still in staging: {staging_path} (should be {final_path})")
+
+    def format_stats(self):
+        rate = self.moved_bytes / self.move_seconds / 1e6 if self.move_seconds else 0
+        return (f"Staging: moved {self.moved_files} file(s), {self.moved_bytes / 1e6:.1f} MB "
+                f"at {rate:.1f} MB/s, {len(self.failed)} failed")
@@ -0,0 +1,99 @@
+"""
+Module for checking how long it takes to import the GUI and helper modules
+
+Description: Imports a module in a fresh Python with "-X importtime" and prints the
+total import time, the slowest imports, and which heavy libraries (camera stack,
+OpenCV, pandas, ...) got loaded. Importing a module should not open the printer
+or the camera, so this never touches the hardware.
+
+Usage (command line):
+    python3 module_startup_report.py                      # GUI and helper modules
+    python3 module_startup_report.py module_snake_path --top 20
+
+Changelog:
+18 Oct 2026: Created startup report.
+"""
+import argparse
+import subprocess
+import sys
+
+# Modules to check by default
+DEFAULT_MODULES = [
+    "3dprinter_sampler_gui_fly2",
+    "prepare_experiment",
+    "printer_connection",
+    "settings",
+    "module_experiment_estimator",
+    "module_snake_path",
+]
+
+# Libraries that are slow to import on the Pi, reported if a module pulls them in
+HEAVY_MODULES = ["picamera2", "libcamera", "cv2", "numpy", "pandas", "serial", "Xlib", "yaml", "PIL"]
+
+# Number of slowest imports to list
+TOP_IMPORTS = 10
+
+
+def get_import_times(module_name):
+    """
+    Imports module_name in a new Python with -X importtime.
+    Returns (list of (cumulative_us, self_us, name), error text or "").
+    """
+    command = [sys.executable, "-X", "importtime", "-c", f"import importlib; importlib.import_module({module_name!r})"]
+    result = subprocess.run(command, capture_output=True, text=True)
+
+    import_times = []
+    other_lines = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:"):
+            other_lines.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        self_us = int(fields[0])
+        cumulative_us = int(fields[1])
+        # One space after the "|", nested imports are indented further
+        name = fields[2][1:].rstrip()
+        import_times.append((cumulative_us, self_us, name))
+
+    error = "\n".join(other_lines[-5:]) if result.returncode != 0 else ""
+    return import_times, error
+
+
+def format_report(module_name, import_times, error="", top=TOP_IMPORTS):
+    lines = [f"==== {module_name} ===="]
+    if error:
+        lines.append(f"Import failed (times below are up to the failure):\n{error}")
+    if not import_times:
+        return "\n".join(lines)
+
+    # Top level imports (no leading spaces) add up to the total
+    total_us = sum(cumulative for cumulative, self_us, name in import_times if not name.startswith(" "))
+    lines.append(f"Total import time: {total_us / 1000:.0f} ms ({len(import_times)} modules)")
+
+    lines.append("Slowest imports (cumulative):")
+    for cumulative, self_us, name in sorted(import_times, reverse=True)[:top]:
+        lines.append(f"  {cumulative / 1000:8.1f} ms  {name.strip()}")
+
+    loaded = {name.strip().split(".")[0] for cumulative, self_us, name in import_times}
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    lines.append(f"Heavy libraries loaded: {', '.join(heavy) if heavy else 'none'}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show import (startup) time of the GUI and helper modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--top", type=int, default=TOP_IMPORTS, help="Number of slowest imports to list")
+    args = parser.parse_args()
+
+    for module_name in args.modules:
+        import_times, error = get_import_times(module_name)
+        print(format_report(module_name, import_times, error, args.top))
+        print()
+
+
+if __name__ == "__main__":
+    main()
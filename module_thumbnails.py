@@ -0,0 +1,170 @@
+"""
+Module for making small thumbnails and mid-size previews of every captured picture
+
+Description: Reviewing an experiment meant opening 12MP pictures one by one. A
+ThumbnailWorker makes a pyramid of smaller JPEGs for each picture on a low priority
+background thread, in folders next to the pictures that mirror the experiment layout:
+
+    <experiment folder>/round_0001/well_037.jpg            (the picture)
+    <experiment folder>/previews/round_0001/well_037.jpg   (1024 px on the long side)
+    <experiment folder>/thumbs/round_0001/well_037.jpg     (256 px on the long side)
+
+The picture is decoded once, straight at the size of the largest level (JPEG draft
+mode: the decoder skips the detail, it doesn't decode 12MP and shrink it), and each
+smaller level is shrunk from the one above. get_pyramid_path() finds a level's file, so
+browsing tools, contact sheets and time-lapse videos never need the full pictures.
+
+Usage:
+    worker = ThumbnailWorker(folder_path)
+    worker.start()
+    worker.add_image(file_full_path, image_bytes)
+    worker.close()
+
+    python3 module_thumbnails.py "<experiment folder>"   # make any that are missing
+
+Changelog:
+18 Oct 2026: Created ThumbnailWorker, get_pyramid_path() and the command line backfill.
+"""
+import argparse
+import io
+import os
+import queue
+import threading
+
+# Pyramid levels, largest first: folder name -> longest side in pixels
+PYRAMID_LEVELS = {"previews": 1024, "thumbs": 256}
+
+THUMBNAIL_QUALITY = 85
+
+# Pictures waiting to be shrunk; add_image() blocks when this many are queued (bounds memory)
+QUEUE_SIZE = 8
+
+# Niceness of the worker thread
+THUMBNAIL_NICENESS = 15
+
+# Folders in an experiment folder that aren't pictures
+SKIP_FOLDERS = {"archives", "stacks", "montages", "timelapse", *PYRAMID_LEVELS}
+
+PICTURE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".npy")
+
+
+# Define function to get the path of a picture's pyramid level (always .jpg)
+def get_pyramid_path(folder_path, file_full_path, level):
+    relative_path = os.path.relpath(file_full_path, folder_path)
+    return os.path.join(folder_path, level, os.path.splitext(relative_path)[0] + ".jpg")
+
+
+# Define function to open encoded picture bytes with PIL (raw numpy pictures too)
+def open_image(image_bytes):
+    from PIL import Image
+
+    if image_bytes[:6] == b"\x93NUMPY":
+        import numpy as np
+        return Image.fromarray(np.load(io.BytesIO(image_bytes)))
+    return Image.open(io.BytesIO(image_bytes))
+
+
+# Define function to get the size of a picture that fits in longest_side (keeps the aspect ratio)
+def get_fit_size(size, longest_side):
+    width, height = size
+    scale = min(1.0, longest_side / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def make_pyramid(folder_path, file_full_path, image_bytes, levels=PYRAMID_LEVELS, quality=THUMBNAIL_QUALITY):
+    """Saves every level of one picture. Returns the paths written."""
+    from PIL import Image
+
+    image = open_image(image_bytes)
+    largest = max(levels.values())
+    # JPEG only: decode at 1/2, 1/4 or 1/8 size, as long as it stays at least as big as the largest level
+    image.draft("RGB", get_fit_size(image.size, largest))
+    image = image.convert("RGB")
+    paths = []
+    for level, longest_side in sorted(levels.items(), key=lambda item: -item[1]):
+        size = get_fit_size(image.size, longest_side)
+        if size != image.size:
+            image = image.resize(size, Image.BILINEAR if image.width < 2 * size[0] else Image.BOX)
+        path = get_pyramid_path(folder_path, file_full_path, level)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image.save(path, "JPEG", quality=quality)
+        paths.append(path)
+    return paths
+
+
+class ThumbnailWorker:
+    """Makes the pyramid of every picture on a low priority background thread."""
+
+    def __init__(self, folder_path, levels=PYRAMID_LEVELS):
+        self.folder_path = folder_path
+        self.levels = dict(levels)
+        self.images = queue.Queue(maxsize=QUEUE_SIZE)
+        self.thread = None
+        self.done_images = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="thumbnails", daemon=True)
+        self.thread.start()
+
+    def add_image(self, file_full_path, image_bytes):
+        # image_bytes is the encoded picture (read before the file is moved or archived)
+        self.images.put((file_full_path, image_bytes))
+
+    def run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), THUMBNAIL_NICENESS)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self.images.get()
+            if item is None:
+                break
+            file_full_path, image_bytes = item
+            try:
+                make_pyramid(self.folder_path, file_full_path, image_bytes, self.levels)
+                self.done_images += 1
+            except (OSError, ValueError) as e:
+                print(f"Could not make thumbnails of {file_full_path}: {e}")
+
+    def close(self):
+        # Waits for the pictures still queued
+        if self.thread is None:
+            return
+        self.images.put(None)
+        self.thread.join()
+        self.thread = None
+        print(f"Thumbnails: made previews/thumbnails of {self.done_images} picture(s)")
+
+
+# Define function to find the pictures of an experiment folder that have no thumbnail yet
+def get_missing(folder_path, levels=PYRAMID_LEVELS):
+    smallest = min(levels, key=levels.get)
+    missing = []
+    for root, folders, files in os.walk(folder_path):
+        if root == folder_path:
+            folders[:] = [folder for folder in folders if folder not in SKIP_FOLDERS]
+        for file_name in sorted(files):
+            if file_name.lower().endswith(PICTURE_EXTENSIONS):
+                file_full_path = os.path.join(root, file_name)
+                if not os.path.exists(get_pyramid_path(folder_path, file_full_path, smallest)):
+                    missing.append(file_full_path)
+    return sorted(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Make previews/thumbnails of an experiment's pictures.")
+    parser.add_argument("folder_path", help="Experiment folder")
+    args = parser.parse_args()
+
+    missing = get_missing(args.folder_path)
+    print(f"{len(missing)} picture(s) without thumbnails")
+    for count, file_full_path in enumerate(missing, start=1):
+        with open(file_full_path, "rb") as file:
+            make_pyramid(args.folder_path, file_full_path, file.read())
+        if count % 100 == 0:
+            print(f"{count}/{len(missing)}")
+    print("Done")
+
+
+if __name__ == "__main__":
+    main()
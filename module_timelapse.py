@@ -0,0 +1,373 @@
+"""
+Module for making one time-lapse video per well from an experiment's pictures
+
+Description: A well's pictures across rounds become one video in the experiment folder:
+
+    <experiment folder>/timelapse/well_037.mp4
+    <experiment folder>/timelapse/<plate>/well_037.mp4   (plate jobs)
+
+The pictures of a well are found with the experiment index (experiment_index.sqlite),
+or by their names (round_0001/well_037.jpg, well_037/round_0001.jpg or the flat
+names) for experiments without one, including pictures packed in round archives.
+For a video smaller than the pictures, the previews or thumbnails
+(module_thumbnails) are used when they are big enough, else the picture is decoded
+straight at a reduced size (JPEG draft mode).
+
+Wells are made in parallel, one process per well (up to the number of CPUs), at low
+priority. Frames are streamed: each one is decoded, labelled and handed to the
+encoder before the next is read, so memory doesn't grow with the number of rounds.
+The encoder is ffmpeg (H.264) if it is installed, else OpenCV (mp4v).
+
+Usage:
+    make_timelapses(folder_path, size=1024, fps=10, timestamp=True)
+
+    python3 module_timelapse.py "<experiment folder>" --size 1024 --fps 10
+    python3 module_timelapse.py "<experiment folder>" --wells 1 37 --size 256 --no-timestamp
+
+Changelog:
+18 Oct 2026: Created make_timelapses() and the command line tool.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from module_experiment_index import INDEX_FILENAME
+from module_round_archiver import get_archived_files
+from module_thumbnails import PICTURE_EXTENSIONS, PYRAMID_LEVELS, SKIP_FOLDERS, get_fit_size, get_pyramid_path
+
+# Videos go in this subfolder of the experiment folder
+TIMELAPSE_FOLDER = "timelapse"
+
+DEFAULT_FPS = 10
+
+# ffmpeg H.264 quality (lower is better, 23 is ffmpeg's default)
+H264_CRF = 23
+
+# Niceness of the worker processes
+TIMELAPSE_NICENESS = 10
+
+# Picture names for experiments without an index (rounds in names are 1-based)
+ROUND_NAME_PATTERN = re.compile(r"round_(\d+)[/\\]well_(\d+)\.")
+WELL_NAME_PATTERN = re.compile(r"well_(\d+)[/\\]round_(\d+)\.")
+FLAT_NAME_PATTERN = re.compile(r"well_(\d+)_(\d{4}-\d\d-\d\d_\d{6})_")
+
+# Archive contents per experiment folder, read once per worker process
+_archived_files = {}
+
+
+# Define function to move a path recorded in another folder (e.g. on the Pi) into folder_path
+def get_moved_path(file_path, recorded_folder, folder_path):
+    if recorded_folder and os.path.commonpath([os.path.abspath(file_path), os.path.abspath(recorded_folder)]) == \
+            os.path.abspath(recorded_folder):
+        return os.path.join(folder_path, os.path.relpath(file_path, recorded_folder))
+    return file_path
+
+
+def find_indexed_frames(folder_path):
+    """
+    Frames of every well from the experiment index: {(plate, well): [frame, ...]} in round order,
+    a frame being (round_index, capture_time, layout folder, path relative to the layout folder).
+    """
+    connection = sqlite3.connect(os.path.join(folder_path, INDEX_FILENAME))
+    try:
+        rows = connection.execute(
+            "SELECT c.round, c.well, c.plate, c.capture_time, c.file_path, e.folder FROM captures c "
+            "LEFT JOIN experiments e ON c.experiment_id = e.id ORDER BY c.round, c.capture_time").fetchall()
+    finally:
+        connection.close()
+    well_frames = {}
+    for round_index, well, plate, capture_time, file_path, recorded_folder in rows:
+        if not file_path or not file_path.lower().endswith(PICTURE_EXTENSIONS):
+            continue
+        file_path = get_moved_path(file_path, recorded_folder, folder_path)
+        # Plate jobs: each plate's pictures (and previews, archives) are in its own subfolder
+        layout_folder = os.path.join(folder_path, plate) if plate else folder_path
+        relative_path = os.path.relpath(file_path, layout_folder)
+        well_frames.setdefault((plate or "", well), []).append((round_index, capture_time, layout_folder,
+                                                                relative_path))
+    return well_frames
+
+
+def find_named_frames(folder_path):
+    """Same as find_indexed_frames(), from the picture names (loose and archived) of one layout folder."""
+    relative_paths = set(get_archived_files(folder_path))
+    for root, folders, files in os.walk(folder_path):
+        if root == folder_path:
+            folders[:] = [folder for folder in folders if folder not in SKIP_FOLDERS]
+        for file_name in files:
+            if file_name.lower().endswith(PICTURE_EXTENSIONS):
+                relative_path = os.path.relpath(os.path.join(root, file_name), folder_path)
+                relative_paths.add(relative_path.replace(os.sep, "/"))
+
+    well_frames = {}
+    flat_frames = {}
+    for relative_path in sorted(relative_paths):
+        loose_path = os.path.join(folder_path, relative_path)
+        capture_time = os.path.getmtime(loose_path) if os.path.exists(loose_path) else None
+        match = ROUND_NAME_PATTERN.search(relative_path)
+        if match:
+            round_index, well = int(match.group(1)) - 1, int(match.group(2))
+        elif WELL_NAME_PATTERN.search(relative_path):
+            match = WELL_NAME_PATTERN.search(relative_path)
+            well, round_index = int(match.group(1)), int(match.group(2)) - 1
+        elif FLAT_NAME_PATTERN.search(relative_path):
+            # Flat names have no round, the pictures of a well are in time order
+            match = FLAT_NAME_PATTERN.search(relative_path)
+            capture_time = time.mktime(time.strptime(match.group(2), "%Y-%m-%d_%H%M%S"))
+            flat_frames.setdefault(int(match.group(1)), []).append((capture_time, relative_path))
+            continue
+        else:
+            continue
+        well_frames.setdefault(("", well), []).append((round_index, capture_time, folder_path, relative_path))
+    for well, frames in flat_frames.items():
+        for round_index, (capture_time, relative_path) in enumerate(sorted(frames)):
+            well_frames.setdefault(("", well), []).append((round_index, capture_time, folder_path, relative_path))
+    for frames in well_frames.values():
+        frames.sort(key=lambda frame: frame[0])
+    return well_frames
+
+
+# Define function to find the frames of every well, from the index if the experiment has one
+def find_well_frames(folder_path):
+    if os.path.exists(os.path.join(folder_path, INDEX_FILENAME)):
+        well_frames = find_indexed_frames(folder_path)
+        if well_frames:
+            return well_frames
+    return find_named_frames(folder_path)
+
+
+# Define function to pick the smallest pyramid level that is at least size (None: the picture itself)
+def get_source_level(size, levels=PYRAMID_LEVELS):
+    if size is None:
+        return None
+    big_enough = [level for level, longest_side in levels.items() if longest_side >= size]
+    return min(big_enough, key=levels.get) if big_enough else None
+
+
+def read_frame_bytes(layout_folder, relative_path, level=None):
+    """Encoded bytes of a frame: its preview/thumbnail if level is given and it exists, else the picture
+    (loose, or out of a round archive). None if it can't be found."""
+    file_full_path = os.path.join(layout_folder, relative_path)
+    paths = [get_pyramid_path(layout_folder, file_full_path, level)] if level else []
+    for path in paths + [file_full_path]:
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except OSError:
+            pass
+    if layout_folder not in _archived_files:
+        _archived_files[layout_folder] = get_archived_files(layout_folder)
+    archived = _archived_files[layout_folder].get(relative_path.replace(os.sep, "/"))
+    if archived is None:
+        return None
+    archive_path, offset, size = archived
+    with open(archive_path, "rb") as archive:
+        archive.seek(offset)
+        return archive.read(size)
+
+
+def decode_frame(image_bytes, frame_size=None, size=None):
+    """
+    Decodes a frame as a PIL RGB image: frame_size (width, height) if given, else fitted in
+    size on the longest side (even width and height, for the encoder).
+    """
+    from PIL import Image
+
+    if image_bytes[:6] == b"\x93NUMPY":
+        import numpy as np
+        image = Image.fromarray(np.load(io.BytesIO(image_bytes)))
+    else:
+        image = Image.open(io.BytesIO(image_bytes))
+    if frame_size is None:
+        width, height = get_fit_size(image.size, size) if size else image.size
+        frame_size = (max(2, width - width % 2), max(2, height - height % 2))
+    # JPEG only: decode at 1/2, 1/4 or 1/8 size, as long as it stays at least frame_size
+    image.draft("RGB", frame_size)
+    image = image.convert("RGB")
+    if image.size != frame_size:
+        image = image.resize(frame_size, Image.BOX if image.width >= 2 * frame_size[0] else Image.BILINEAR)
+    return image
+
+
+def get_label_font(frame_height):
+    from PIL import ImageFont
+
+    try:
+        # Pillow 10.1+ scales its built-in font
+        return ImageFont.load_default(size=max(12, frame_height // 28))
+    except TypeError:
+        return ImageFont.load_default()
+
+
+# Define function to write the well, round and time on a frame
+def burn_in_label(image, text, font):
+    from PIL import ImageDraw
+
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+    margin = max(2, (bottom - top) // 3)
+    draw.rectangle((0, 0, right - left + 2 * margin, bottom - top + 2 * margin), fill=(0, 0, 0))
+    draw.text((margin - left, margin - top), text, fill=(255, 255, 255), font=font)
+
+
+# Define function to get the burn-in text of a frame
+def get_frame_label(well, round_index, capture_time, start_time):
+    text = f"Well {well}  Round {round_index + 1}"
+    if capture_time is not None:
+        elapsed = int(capture_time - start_time)
+        text += (f"  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture_time))}"
+                 f"  +{elapsed // 3600}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d}")
+    return text
+
+
+class VideoWriter:
+    """Writes RGB frames to a video file: ffmpeg (H.264) through a pipe if installed, else OpenCV (mp4v)."""
+
+    def __init__(self, path, frame_size, fps):
+        self.path = path
+        self.process = None
+        self.writer = None
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg:
+            width, height = frame_size
+            command = [ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                       "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                       "-c:v", "libx264", "-preset", "veryfast", "-crf", str(H264_CRF), "-pix_fmt", "yuv420p",
+                       "-threads", "2", "-f", "mp4", path]
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        else:
+            import cv2
+            self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, tuple(frame_size))
+            if not self.writer.isOpened():
+                raise OSError(f"OpenCV could not open {path} for writing")
+
+    def write(self, image):
+        if self.process:
+            self.process.stdin.write(image.tobytes())
+        else:
+            import cv2
+            import numpy as np
+            self.writer.write(cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR))
+
+    def close(self):
+        if self.process:
+            self.process.stdin.close()
+            if self.process.wait() != 0:
+                raise OSError(f"ffmpeg failed writing {self.path}")
+        else:
+            self.writer.release()
+
+
+def make_well_video(output_path, well, frames, size=None, fps=DEFAULT_FPS, timestamp=True):
+    """
+    Makes one well's video from its frames (see find_indexed_frames), one frame in memory at a time.
+    Returns (output_path, frames written, frames not found).
+    """
+    level = get_source_level(size)
+    writer = None
+    font = None
+    frame_size = None
+    start_time = next((frame[1] for frame in frames if frame[1] is not None), None)
+    written = 0
+    missing = 0
+    # Keeps the extension, OpenCV picks the container by it
+    part_path = os.path.splitext(output_path)[0] + ".part.mp4"
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    try:
+        for round_index, capture_time, layout_folder, relative_path in frames:
+            image_bytes = read_frame_bytes(layout_folder, relative_path, level)
+            if image_bytes is None:
+                missing += 1
+                continue
+            image = decode_frame(image_bytes, frame_size, size)
+            if writer is None:
+                frame_size = image.size
+                writer = VideoWriter(part_path, frame_size, fps)
+                font = get_label_font(frame_size[1])
+            if timestamp:
+                burn_in_label(image, get_frame_label(well, round_index, capture_time, start_time), font)
+            writer.write(image)
+            written += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    if written:
+        os.replace(part_path, output_path)
+    return output_path, written, missing
+
+
+def _lower_priority():
+    # Worker process initializer
+    try:
+        os.nice(TIMELAPSE_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def make_timelapses(folder_path, size=None, fps=DEFAULT_FPS, timestamp=True, wells=None, workers=None,
+                    overwrite=False):
+    """
+    Makes a video of every well (or only wells, a list of well numbers) in folder_path/timelapse.
+    size is the longest side of the video in pixels (None: the pictures' size).
+    Existing videos are kept unless overwrite. Returns the list of make_well_video() results.
+    """
+    well_frames = find_well_frames(folder_path)
+    jobs = []
+    for (plate, well), frames in sorted(well_frames.items()):
+        if wells and well not in wells:
+            continue
+        output_path = os.path.join(folder_path, TIMELAPSE_FOLDER, plate, f"well_{well:03d}.mp4")
+        if overwrite or not os.path.exists(output_path):
+            jobs.append((output_path, well, frames))
+    if not jobs:
+        print("Time-lapse: no videos to make")
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    print(f"Time-lapse: making {len(jobs)} video(s) with {workers} process(es)")
+    start = time.monotonic()
+    results = []
+    # Spawned, not forked: the GUI calls this with threads running and the camera open
+    with ProcessPoolExecutor(max_workers=workers, initializer=_lower_priority,
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(make_well_video, output_path, well, frames, size, fps, timestamp)
+                   for output_path, well, frames in jobs]
+        for future in futures:
+            try:
+                output_path, written, missing = future.result()
+            except (OSError, ValueError) as e:
+                print(f"Could not make a time-lapse video: {e}")
+                continue
+            results.append((output_path, written, missing))
+            if missing:
+                print(f"{output_path}: {missing} picture(s) not found")
+    frames_written = sum(result[1] for result in results)
+    print(f"Time-lapse: {len(results)} video(s), {frames_written} frames in {time.monotonic() - start:.1f} sec")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Make one time-lapse video per well from an experiment's pictures.")
+    parser.add_argument("folder_path", help="Experiment folder")
+    parser.add_argument("--size", type=int, default=None,
+                        help="Longest side of the video in pixels (default: the pictures' size); "
+                             f"{' or '.join(str(side) for side in PYRAMID_LEVELS.values())} or less use the previews/thumbnails")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="Frames (rounds) per second")
+    parser.add_argument("--wells", type=int, nargs="+", help="Only these well numbers")
+    parser.add_argument("--workers", type=int, help="Processes (default: number of CPUs)")
+    parser.add_argument("--no-timestamp", action="store_true", help="Don't write the well, round and time on the frames")
+    parser.add_argument("--overwrite", action="store_true", help="Make videos that already exist again")
+    args = parser.parse_args()
+
+    make_timelapses(args.folder_path, size=args.size, fps=args.fps, timestamp=not args.no_timestamp,
+                    wells=args.wells, workers=args.workers, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
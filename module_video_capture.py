@@ -0,0 +1,136 @@
+"""
+Module for per-well video clips using the Pi's hardware H.264 encoder (picamera2)
+
+Description: Records a short clip at each well. The encoder writes straight to disk
+(FileOutput), so clips are never held in RAM. The camera is switched to a video
+configuration once at the start of the experiment (not once per well), so the gap
+between wells is only the move and the dwell.
+
+If the .mp4 container is chosen, each raw .h264 clip is copied into an .mp4 by ffmpeg
+(no re-encode, "-c copy") in the background, so the remux runs while the printer moves
+to the next well. finish() waits for any remux still running.
+
+Usage:
+    recorder = WellVideoRecorder(camera, res=(1920, 1080), bitrate=10000000, clip_seconds=10, camera_lock=CAMERA_LOCK)
+    recorder.start()
+    recorder.record_clip("well_001.h264", stop_event=stop_event)
+    recorder.finish()
+
+Changelog:
+18 Oct 2026: Created WellVideoRecorder (H264Encoder + FileOutput, background mp4 remux).
+"""
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import settings as C
+
+# Containers
+CONTAINER_H264 = ".h264"
+CONTAINER_MP4 = ".mp4"
+CONTAINERS = [CONTAINER_MP4, CONTAINER_H264]
+
+# Low resolution stream kept on during video, so adaptive dwell still works
+LORES_RES = (320, 240)
+
+
+class WellVideoRecorder:
+    """Records one clip per well with the hardware H.264 encoder."""
+
+    def __init__(self, camera, res=None, framerate=None, bitrate=None, clip_seconds=None, container=None,
+                 camera_lock=None, keep_h264=False):
+        self.camera = camera
+        self.res = tuple(res) if res is not None else (C.VIDEO_WIDTH, C.VIDEO_HEIGHT)
+        self.framerate = framerate if framerate is not None else C.VIDEO_FRAMERATE
+        self.bitrate = bitrate if bitrate is not None else C.VIDEO_BITRATE
+        self.clip_seconds = clip_seconds if clip_seconds is not None else C.VIDEO_CLIP_TIME
+        self.container = container if container is not None else C.VIDEO_CONTAINER
+        self.camera_lock = camera_lock if camera_lock is not None else threading.Lock()
+        self.keep_h264 = keep_h264
+        # Background ffmpeg remux processes, (process, h264 path, mp4 path)
+        self.remuxes = []
+
+        if self.container == CONTAINER_MP4 and shutil.which("ffmpeg") is None:
+            print("ffmpeg not found, saving raw .h264 clips instead of .mp4")
+            self.container = CONTAINER_H264
+
+    def start(self):
+        # Switch the camera to the video configuration (do this once, before the first well)
+        with self.camera_lock:
+            self.camera.stop()
+            video_config = self.camera.create_video_configuration(
+                main={"size": self.res}, lores={"size": LORES_RES},
+                controls={"FrameRate": self.framerate})
+            self.camera.configure(video_config)
+            self.camera.start()
+        print(f"Video mode: {self.res[0]}x{self.res[1]} @ {self.framerate} fps, "
+              f"{self.bitrate / 1e6:.1f} Mbps, saving {self.container}")
+
+    def record_clip(self, file_full_path, clip_seconds=None, stop_event=None):
+        """
+        Records clip_seconds (default: self.clip_seconds) of video to file_full_path
+        (any extension is replaced with .h264).
+        Returns the path the clip ends up at (.mp4 once the background remux is done).
+        """
+        from picamera2.encoders import H264Encoder
+        from picamera2.outputs import FileOutput
+
+        if clip_seconds is None:
+            clip_seconds = self.clip_seconds
+        h264_path = os.path.splitext(file_full_path)[0] + CONTAINER_H264
+        encoder = H264Encoder(bitrate=self.bitrate)
+
+        with self.camera_lock:
+            self.camera.start_encoder(encoder, FileOutput(h264_path))
+        try:
+            # Record, but stop early if the experiment is stopped
+            end_time = time.monotonic() + clip_seconds
+            while time.monotonic() < end_time:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                time.sleep(min(0.1, max(0.0, end_time - time.monotonic())))
+        finally:
+            with self.camera_lock:
+                self.camera.stop_encoder()
+        print(f"Recorded Video: {h264_path}")
+
+        if self.container == CONTAINER_MP4:
+            return self.start_remux(h264_path)
+        return h264_path
+
+    def start_remux(self, h264_path):
+        # Copy the H.264 stream into an .mp4 in the background (no re-encode)
+        mp4_path = os.path.splitext(h264_path)[0] + CONTAINER_MP4
+        command = ["ffmpeg", "-y", "-loglevel", "error", "-framerate", str(self.framerate),
+                   "-i", h264_path, "-c", "copy", mp4_path]
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL)
+        self.remuxes.append((process, h264_path, mp4_path))
+        self.check_remuxes()
+        return mp4_path
+
+    def check_remuxes(self, wait=False):
+        # Clean up finished remuxes (or wait for all of them), removing the raw clip if it worked
+        still_running = []
+        for process, h264_path, mp4_path in self.remuxes:
+            if wait:
+                process.wait()
+            if process.poll() is None:
+                still_running.append((process, h264_path, mp4_path))
+            elif process.returncode == 0:
+                if not self.keep_h264:
+                    os.remove(h264_path)
+            else:
+                print(f"ffmpeg could not remux {h264_path}, keeping the raw clip")
+        self.remuxes = still_running
+
+    def finish(self, preview_config=None):
+        # Wait for remuxes, then put the camera back into preview mode
+        self.check_remuxes(wait=True)
+        if preview_config is None:
+            return
+        with self.camera_lock:
+            self.camera.stop()
+            self.camera.configure(preview_config)
+            self.camera.start()
@@ -14,15 +14,16 @@ Future Ideas
 
 Changelog:
 8-27-2022: Started changelog. Working Cross hair GUI. Create dummy PiCamera class for easier RPi transfer.
+10-18-2026: numpy and PIL are imported on first use too, importing this module only loads FreeSimpleGUI.
+10-18-2026: cv2 is imported on first use.
+10-18-2026: Crosshair overlay images are cached (LRU) and built with one colour lookup. Moving the preview reuses the buffer.
 
 """
-import cv2
 import FreeSimpleGUI as sg
-import numpy as np
 
+from collections import OrderedDict
 from os import remove
 from os.path import join
-from PIL import ImageColor
 
 
 # For Testing Code when not connected to a Raspberry Pi Camera and 3D printer
@@ -76,6 +77,12 @@ temp_filename = "temp.jpg"
 # Overlay defaults
 CROSSHAIR_PREVIEW_RES = (640, 480)
 
+# Number of crosshair images to keep (see get_crosshair_rgba)
+OVERLAY_CACHE_SIZE = 8
+_overlay_cache = OrderedDict()
+# Crosshair image each camera is currently showing, by id(camera)
+_applied_overlays = {}
+
 
 def get_dummy_image():
     # Dummy Image as placeholder
@@ -89,6 +96,7 @@ def get_dummy_image():
     # image_file = r'test_2022-08-24_161919_640x480.jpg'
 
     # image_location
+    import cv2
     image_path = join(image_folder, image_file)
     # Dummy resize to 640, 480
     image = cv2.imread(image_path)
@@ -133,6 +141,7 @@ def draw_on_image(camera, camera_lock=None):
 
 
 def draw_cross_hairs(image):
+    import cv2
     # Make a copy of the image
     image_edit = image.copy()
 
@@ -157,33 +166,58 @@ def draw_cross_hairs(image):
     return image_edit
 
 
-def create_crosshair_overlay(camera, radius, thickness, color_bgr, alpha, preview_window, camera_lock=None, existing_overlay=None):
+def get_crosshair_rgba(w, h, radius, thickness, color_bgr, alpha):
     """
-    Draw crosshair into an RGBA buffer and add/update a PiCamera overlay.
-    preview_window: (x, y, w, h) matches camera preview window.
-    Returns the overlay object.
+    Returns the RGBA crosshair image (padded for PiCamera) for a w x h preview window.
+    Cached by (w, h, radius, thickness, color, alpha) with LRU eviction, so moving the
+    preview window or going back to an earlier radius doesn't redraw anything.
+    The returned array is shared by the cache, so it is read-only.
     """
-    x, y, w, h = preview_window
+    key = (w, h, radius, thickness, tuple(color_bgr), alpha)
+    if key in _overlay_cache:
+        _overlay_cache.move_to_end(key)
+        return _overlay_cache[key]
+
     # PiCamera overlay requires width multiple of 32, height multiple of 16
     w_pad = int((w + 31) // 32 * 32)
     h_pad = int((h + 15) // 16 * 16)
 
-    # Build a single-channel mask, then set RGB manually to avoid channel order confusion
+    # cv2 and numpy are imported on first use (slow to import on the Pi)
+    import cv2
+    import numpy as np
+    # Draw index 1 into a single-channel mask, then look up the RGBA colour for each pixel
     mask = np.zeros((h_pad, w_pad), dtype=np.uint8)
 
     center_x = w // 2
     center_y = h // 2
 
-    cv2.line(mask, (0, center_y), (w, center_y), 255, thickness, lineType=cv2.LINE_8)
-    cv2.line(mask, (center_x, 0), (center_x, h), 255, thickness, lineType=cv2.LINE_8)
-    cv2.circle(mask, (center_x, center_y), radius, 255, thickness, lineType=cv2.LINE_8)
+    cv2.line(mask, (0, center_y), (w, center_y), 1, thickness, lineType=cv2.LINE_8)
+    cv2.line(mask, (center_x, 0), (center_x, h), 1, thickness, lineType=cv2.LINE_8)
+    cv2.circle(mask, (center_x, center_y), radius, 1, thickness, lineType=cv2.LINE_8)
 
     r, g, b = color_bgr[::-1]  # convert BGR to RGB
-    overlay_img = np.zeros((h_pad, w_pad, 4), dtype=np.uint8)
-    overlay_img[..., 0][mask == 255] = r
-    overlay_img[..., 1][mask == 255] = g
-    overlay_img[..., 2][mask == 255] = b
-    overlay_img[..., 3][mask == 255] = alpha
+    colors = np.array([[0, 0, 0, 0], [r, g, b, alpha]], dtype=np.uint8)
+    overlay_img = colors[mask]
+    overlay_img.flags.writeable = False
+
+    _overlay_cache[key] = overlay_img
+    if len(_overlay_cache) > OVERLAY_CACHE_SIZE:
+        _overlay_cache.popitem(last=False)
+    return overlay_img
+
+
+def create_crosshair_overlay(camera, radius, thickness, color_bgr, alpha, preview_window, camera_lock=None, existing_overlay=None):
+    """
+    Draw crosshair into an RGBA buffer and add/update a PiCamera overlay.
+    preview_window: (x, y, w, h) matches camera preview window.
+    If existing_overlay is showing the same crosshair (only the window moved), the buffer is
+    not sent again: picamera2 keeps its overlay, legacy PiCamera only moves its window.
+    Returns the overlay object.
+    """
+    x, y, w, h = preview_window
+    overlay_img = get_crosshair_rgba(w, h, radius, thickness, color_bgr, alpha)
+    h_pad, w_pad = overlay_img.shape[:2]
+    is_same_image = existing_overlay and _applied_overlays.get(id(camera)) is overlay_img
 
     # Picamera2 uses set_overlay(numpy array); legacy PiCamera uses add_overlay(bytes, ...).
     is_picamera2 = hasattr(camera, 'set_overlay') and not hasattr(camera, 'add_overlay')
@@ -191,9 +225,14 @@ def create_crosshair_overlay(camera, radius, thickness, color_bgr, alpha, previe
     def _apply():
         if is_picamera2:
             # Picamera2: set_overlay expects (height, width, 4) RGBA numpy array; clear with set_overlay(None).
-            camera.set_overlay(overlay_img)
+            # The overlay is drawn relative to the preview, so a moved window needs nothing new.
+            if not is_same_image:
+                camera.set_overlay(overlay_img)
             return True  # Caller should use camera.set_overlay(None) to remove.
         else:
+            if is_same_image:
+                existing_overlay.window = (x, y, w, h)
+                return existing_overlay
             if existing_overlay:
                 camera.remove_overlay(existing_overlay)
             buf = overlay_img.tobytes()
@@ -201,15 +240,18 @@ def create_crosshair_overlay(camera, radius, thickness, color_bgr, alpha, previe
 
     if camera_lock:
         with camera_lock:
-            return _apply()
+            overlay = _apply()
     else:
-        return _apply()
+        overlay = _apply()
+    _applied_overlays[id(camera)] = overlay_img
+    return overlay
 
 
 def update_color(event, values, window):
     global CIRCLE_COLOR
     # print("Updating Circle and Line Colors")
     # print(f"New Color: {values[event]}")
+    from PIL import ImageColor
     rgb_color = ImageColor.getcolor(values[event], "RGB")
     # print(f"RGB: {rgb_color}")
     bgr_color = (rgb_color[2], rgb_color[1], rgb_color[0])
@@ -354,6 +396,7 @@ def main2():
 
     image_folder = r'/home/pi/Projects/3dprinter_sampling/Test Pictures/8-24-2022'
     image_file = r'test_2022-08-24_161919_640x480.jpg'
+    import cv2
     image_path = join(image_folder, image_file)
     # Dummy resize to 640, 480
     image = cv2.imread(image_path)
@@ -382,6 +425,7 @@ if __name__ == "__main__":
             def capture(self, save_filename):
                 # print("capture called")
 
+                import cv2
                 # Get dummy image
                 image = get_dummy_image()
                 # Save dummy image as save_filename
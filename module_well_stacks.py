@@ -0,0 +1,220 @@
+"""
+Module for per-well time-lapse stacks: every round's picture of a well in one array on disk
+
+Description: Analysis of a well across rounds used to mean opening and decoding every
+JPEG of that well. A WellStackWriter appends each captured picture, decoded (and
+downscaled) once, to a stack per well with time (the capture order) as the leading axis:
+
+    <experiment folder>/stacks/well_037/scale_4/stack.json
+    <experiment folder>/stacks/well_037/scale_4/frames.csv
+    <experiment folder>/stacks/well_037/scale_4/frames_00000.bin   (frames 0-63)
+    <experiment folder>/stacks/well_037/scale_4/frames_00001.bin   (frames 64-127)
+
+Each .bin file is a chunk of raw uint8 frames (height x width x 3, RGB), appended as the
+experiment runs, so any filesystem works (no sparse files) and a chunk can be
+memory-mapped with numpy. stack.json holds the frame shape and chunk size (written once),
+and frames.csv gets one line per frame (round index and capture time), appended like the
+frames, so adding a frame never rewrites what is already there. One stack per scale: scale 1 is full
+resolution, scale 4 is a quarter of the width and height (1/16 of the bytes).
+
+Pictures are decoded on a background thread at low priority. JPEGs are decoded at the
+reduced size directly (PIL draft mode), which is much faster than decoding full size.
+
+Usage:
+    writer = WellStackWriter(os.path.join(folder_path, STACK_FOLDER), scales=[4])
+    writer.start()
+    writer.add_frame(well_number, round_index, image_bytes, capture_time)
+    writer.close()
+
+    stack = WellStack(os.path.join(folder_path, STACK_FOLDER), well=12, scale=4)
+    frames = stack.get_frames()   # (rounds, height, width, 3), memory-mapped
+    print(stack.rounds, stack.capture_times)
+
+Changelog:
+18 Oct 2026: Rounds and capture times are appended to frames.csv (stack.json was rewritten every frame).
+18 Oct 2026: Created WellStackWriter and WellStack.
+18 Oct 2026: decode_image() also reads raw numpy pictures.
+"""
+import io
+import json
+import os
+import queue
+import threading
+
+# Stacks go in this subfolder of the experiment folder
+STACK_FOLDER = "stacks"
+STACK_FILENAME = "stack.json"
+FRAMES_FILENAME = "frames.csv"
+
+# Frames per chunk file
+CHUNK_ROUNDS = 64
+
+# Pictures waiting to be decoded; add_frame() blocks when this many are queued (bounds memory)
+QUEUE_SIZE = 8
+
+# Niceness of the decoding thread
+STACK_NICENESS = 15
+
+
+# Define function to get a stack's folder for one well and scale
+def get_stack_folder(stacks_folder, well, scale):
+    return os.path.join(stacks_folder, f"well_{well:03d}", f"scale_{scale}")
+
+
+# Define function to decode a picture at 1/scale of its size, returns an RGB numpy array
+def decode_image(image_bytes, scale=1):
+    import numpy as np
+    from PIL import Image
+
+    if image_bytes[:6] == b"\x93NUMPY":
+        # Raw numpy pictures (settings.PICTURE_FORMAT "npy")
+        image = Image.fromarray(np.load(io.BytesIO(image_bytes)))
+    else:
+        image = Image.open(io.BytesIO(image_bytes))
+    target = (max(1, image.width // scale), max(1, image.height // scale))
+    if scale > 1:
+        # JPEG: lets the decoder skip detail it would throw away (1/2, 1/4 or 1/8 size)
+        image.draft("RGB", target)
+    image = image.convert("RGB")
+    if image.size != target:
+        image = image.resize(target, Image.BILINEAR)
+    return np.asarray(image)
+
+
+class WellStackFile:
+    """Appends frames of one well at one scale to chunk files."""
+
+    def __init__(self, folder, chunk_rounds=CHUNK_ROUNDS):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.chunk_rounds = chunk_rounds
+        self.shape = None
+        self.rounds = []
+        self.capture_times = []
+
+    def append(self, frame, round_index, capture_time):
+        if self.shape is None:
+            self.shape = list(frame.shape)
+            self.save()
+        elif list(frame.shape) != self.shape:
+            raise ValueError(f"Frame is {frame.shape}, stack in {self.folder} is {tuple(self.shape)}")
+        chunk_index = len(self.rounds) // self.chunk_rounds
+        with open(os.path.join(self.folder, f"frames_{chunk_index:05d}.bin"), "ab") as file:
+            file.write(frame.tobytes())
+        # After the frame, so every line in frames.csv has its frame
+        with open(os.path.join(self.folder, FRAMES_FILENAME), "a") as file:
+            file.write(f"{round_index},{capture_time!r}\n")
+        self.rounds.append(round_index)
+        self.capture_times.append(capture_time)
+
+    def save(self):
+        # Shape and chunk size, written once with the first frame
+        info = {"shape": self.shape, "dtype": "uint8", "chunk_rounds": self.chunk_rounds}
+        stack_path = os.path.join(self.folder, STACK_FILENAME)
+        with open(stack_path + ".tmp", "w") as file:
+            json.dump(info, file)
+        os.replace(stack_path + ".tmp", stack_path)
+
+
+class WellStackWriter:
+    """Decodes captured pictures on a background thread and appends them to per-well stacks."""
+
+    def __init__(self, stacks_folder, scales=(4,), chunk_rounds=CHUNK_ROUNDS):
+        self.stacks_folder = stacks_folder
+        self.scales = list(scales)
+        self.chunk_rounds = chunk_rounds
+        self.frames = queue.Queue(maxsize=QUEUE_SIZE)
+        # (well, scale) -> WellStackFile
+        self.stack_files = {}
+        self.thread = None
+        self.added_frames = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="well-stacks", daemon=True)
+        self.thread.start()
+
+    def add_frame(self, well, round_index, image_bytes, capture_time):
+        # image_bytes is the encoded picture (read before the file is moved or archived)
+        self.frames.put((well, round_index, image_bytes, capture_time))
+
+    def run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), STACK_NICENESS)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            well, round_index, image_bytes, capture_time = item
+            try:
+                for scale in self.scales:
+                    stack_file = self.stack_files.get((well, scale))
+                    if stack_file is None:
+                        stack_file = WellStackFile(get_stack_folder(self.stacks_folder, well, scale), self.chunk_rounds)
+                        self.stack_files[(well, scale)] = stack_file
+                    stack_file.append(decode_image(image_bytes, scale), round_index, capture_time)
+                self.added_frames += 1
+            except (OSError, ValueError) as e:
+                print(f"Could not add well {well}, round {round_index} to its stack: {e}")
+
+    def close(self):
+        # Waits for the pictures still queued
+        if self.thread is None:
+            return
+        self.frames.put(None)
+        self.thread.join()
+        self.thread = None
+        print(f"Well stacks: added {self.added_frames} picture(s) to {len(self.stack_files)} stack(s)")
+
+
+class WellStack:
+    """Reads one well's stack (memory-mapped, nothing is loaded until it is used)."""
+
+    def __init__(self, stacks_folder, well, scale=4):
+        self.folder = get_stack_folder(stacks_folder, well, scale)
+        with open(os.path.join(self.folder, STACK_FILENAME)) as file:
+            info = json.load(file)
+        self.shape = tuple(info["shape"])
+        self.chunk_rounds = info["chunk_rounds"]
+        self.rounds = []
+        self.capture_times = []
+        with open(os.path.join(self.folder, FRAMES_FILENAME)) as file:
+            for line in file:
+                # A line cut short by a crash has no newline, and its frame may be incomplete
+                if line.endswith("\n"):
+                    round_index, capture_time = line.split(",")
+                    self.rounds.append(int(round_index))
+                    self.capture_times.append(float(capture_time))
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def get_chunk(self, chunk_index):
+        # All frames of one chunk file, as a read-only memory map
+        import numpy as np
+
+        num_frames = min(self.chunk_rounds, len(self.rounds) - chunk_index * self.chunk_rounds)
+        return np.memmap(os.path.join(self.folder, f"frames_{chunk_index:05d}.bin"), dtype=np.uint8,
+                         mode="r", shape=(num_frames, *self.shape))
+
+    def get_frames(self, start=0, stop=None):
+        """Frames start to stop (capture order) as one (frames, height, width, 3) array."""
+        import numpy as np
+
+        stop = len(self.rounds) if stop is None else min(stop, len(self.rounds))
+        parts = []
+        for chunk_index in range(start // self.chunk_rounds, (stop - 1) // self.chunk_rounds + 1):
+            chunk_start = chunk_index * self.chunk_rounds
+            chunk = self.get_chunk(chunk_index)
+            parts.append(chunk[max(start - chunk_start, 0):stop - chunk_start])
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty((0, *self.shape), dtype=np.uint8)
+
+    def get_frame(self, round_index):
+        # The frame taken in round_index (KeyError if the well wasn't sampled that round)
+        if round_index not in self.rounds:
+            raise KeyError(f"Round {round_index} is not in this stack")
+        position = self.rounds.index(round_index)
+        return self.get_chunk(position // self.chunk_rounds)[position % self.chunk_rounds]
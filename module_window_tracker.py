@@ -0,0 +1,106 @@
+"""
+Module for tracking where an X11 window is, without polling
+
+Description: Subscribes to ConfigureNotify (StructureNotifyMask) for one window, so the
+X server tells us when it is moved or resized. The last geometry is cached, and the
+on_change callback is called from the tracker thread whenever the position or size
+changes (the GUI passes a function that calls window.write_event_value).
+
+Replaces walking the whole window tree with query_tree/get_geometry every 0.2 sec to
+find out if the camera preview pseudo window was dragged.
+
+Usage:
+    tracker = WindowTracker(window_id, on_change=lambda geometry: print(geometry))
+    tracker.start()
+    x, y = tracker.get_location()
+    tracker.stop()
+
+Changelog:
+18 Oct 2026: Created WindowTracker.
+"""
+import select
+import threading
+
+from Xlib import X
+from Xlib.display import Display
+
+# How often the tracker thread checks if it should stop (in seconds)
+STOP_CHECK_INTERVAL = 0.5
+
+
+class WindowTracker:
+    """Caches an X11 window's geometry, updated by ConfigureNotify events."""
+
+    def __init__(self, window_id, on_change=None, default_location=(0, 0)):
+        self.window_id = window_id
+        self.on_change = on_change
+        # (x, y, width, height), x/y are relative to the top-left of the screen
+        self.geometry = (default_location[0], default_location[1], 0, 0)
+        self.geometry_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        # Opens its own X connection (Xlib connections are not shared between threads)
+        disp = Display()
+        root = disp.screen().root
+        win = disp.create_resource_object("window", self.window_id)
+        win.change_attributes(event_mask=X.StructureNotifyMask)
+        self.set_geometry(self.get_absolute_geometry(win, root))
+
+        self.thread = threading.Thread(target=self._run, args=(disp, root, win), name="window_tracker", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2 * STOP_CHECK_INTERVAL)
+
+    def get_geometry(self):
+        with self.geometry_lock:
+            return self.geometry
+
+    def get_location(self):
+        x, y, width, height = self.get_geometry()
+        return x, y
+
+    def set_geometry(self, geometry):
+        # Returns True if the geometry changed
+        with self.geometry_lock:
+            if geometry == self.geometry:
+                return False
+            self.geometry = geometry
+            return True
+
+    def get_absolute_geometry(self, win, root):
+        # One round trip: where the window's top-left corner is on the screen
+        geom = win.get_geometry()
+        coords = root.translate_coords(win, 0, 0)
+        return coords.x, coords.y, geom.width, geom.height
+
+    def _run(self, disp, root, win):
+        try:
+            while not self.stop_event.is_set():
+                # Sleep until the X server sends something (or it is time to check stop_event)
+                select.select([disp], [], [], STOP_CHECK_INTERVAL)
+                geometry = None
+                for _ in range(disp.pending_events()):
+                    event = disp.next_event()
+                    if event.type == X.DestroyNotify and event.window.id == self.window_id:
+                        return
+                    if event.type != X.ConfigureNotify or event.window.id != self.window_id:
+                        continue
+                    if event.send_event:
+                        # Synthetic event from the window manager, already in screen coordinates
+                        geometry = (event.x, event.y, event.width, event.height)
+                    else:
+                        # Coordinates are relative to the parent (may be a window manager frame)
+                        geometry = self.get_absolute_geometry(win, root)
+                # Only the last move of a drag matters
+                if geometry is not None and self.set_geometry(geometry) and self.on_change:
+                    self.on_change(geometry)
+        except Exception as e:
+            # Window vanished or X connection closed, keep the last known geometry
+            print(f"Stopped tracking window {self.window_id}: {e}")
+        finally:
+            disp.close()
@@ -7,6 +7,8 @@ Functions:
 -Open CSV file holding locations of wells, returns list
 -Convert Locations List to GCode String List
 -Create/Get Folder and File Path
+-OutputLayout: file paths for a whole experiment (flat, one folder per round, or one
+ folder per well) and the manifest.json describing them
 
 Notes:
 -Takes the functions from 3dprinter_start_experiment.py because that
@@ -18,11 +20,15 @@ TODO:
 
 Changelog
 27 April 2021: Started Document Creation, put in 4 functions, test code
+18 Oct 2026: get_file_full_path takes a file extension (for video clips)
+18 Oct 2026: pandas is imported on first use
+18 Oct 2026: Added OutputLayout (sharded round/well folders, manifest.json)
 
 """
 # ==== LIBRARIES ====
+import json
 import os
-import pandas as pd
+import time
 
 from datetime import datetime
 
@@ -30,6 +36,17 @@ from datetime import datetime
 import settings as C
 
 
+# ==== CONSTANTS ====
+# Output Layouts (where the pictures/clips of an experiment go)
+LAYOUT_FLAT = "flat"      # All in the experiment folder: well_037_2026-10-18_101500_.jpg
+LAYOUT_ROUND = "round"    # One folder per round: round_0001/well_037.jpg
+LAYOUT_WELL = "well"      # One folder per well: well_037/round_0001.jpg
+LAYOUTS = [LAYOUT_ROUND, LAYOUT_WELL, LAYOUT_FLAT]
+
+# Describes the layout of an experiment folder, so tools can build paths without listing folders
+MANIFEST_FILENAME = "manifest.json"
+
+
 # ==== USER DEFINED FUNCTIONS ====
 
 # Get path list from CSV file
@@ -39,8 +56,9 @@ def get_path_list_csv(csv_filename):
     Y = 1
     Z = 2
 
-    # Use Pandas to open up CSV File
+    # Use Pandas to open up CSV File (imported here, it is slow to import on the Pi)
     # index_col is 0, meaning no column label for index column
+    import pandas as pd
     dataframe = pd.read_csv(csv_filename, index_col=0, dtype="float")
     # print(dataframe)
 
@@ -150,7 +168,7 @@ def create_and_get_folder_path2(dest_folder):
 
 # Define function that creates the full file path to save video or pictures (folder and file name)
 # Creates a unique file name using current date and time
-def get_file_full_path(folder_path, well_number, total_wells=None):
+def get_file_full_path(folder_path, well_number, total_wells=None, extension=".jpg"):
     current_time = datetime.now()
     # file_name_suffix = current_time.strftime("%Y-%m-%d_%H%M%S_%f")
     file_name_suffix = current_time.strftime("%Y-%m-%d_%H%M%S")
@@ -159,12 +177,112 @@ def get_file_full_path(folder_path, well_number, total_wells=None):
     else:
         width = max(3, len(str(total_wells)))
     well_str = str(well_number).zfill(width)
-    file_name_full = f"well_{well_str}_{file_name_suffix}_.jpg"
+    file_name_full = f"well_{well_str}_{file_name_suffix}_{extension}"
     file_full_path = "{}/{}".format(folder_path, file_name_full)
     # print(file_full_path)
     return file_full_path
 
 
+class OutputLayout:
+    """
+    File paths for one experiment. Names and their zero padding are worked out once, and each
+    round/well folder is created the first time it is used, so building a path is only string
+    formatting (and no datetime call, except in the flat layout that keeps the old names).
+    Round folders/names start at 1 (round_index 0 is round_0001), like well numbers.
+    """
+
+    def __init__(self, folder_path, layout=None, total_wells=None, num_rounds=None):
+        self.folder_path = folder_path
+        self.layout = C.OUTPUT_LAYOUT if layout is None else layout
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown output layout '{self.layout}', use one of {LAYOUTS}")
+        self.total_wells = total_wells
+        self.num_rounds = num_rounds
+        self.well_digits = max(3, len(str(total_wells))) if total_wells else 3
+        self.round_digits = max(4, len(str(num_rounds))) if num_rounds else 4
+        self.well_format = f"well_{{:0{self.well_digits}d}}"
+        self.round_format = f"round_{{:0{self.round_digits}d}}"
+        # Folders already created (name -> full path)
+        self.folders = {}
+        self.manifest = None
+
+    def get_well_name(self, well_number):
+        return self.well_format.format(well_number)
+
+    def get_round_name(self, round_index):
+        return self.round_format.format(round_index + 1)
+
+    def get_folder(self, name):
+        folder = self.folders.get(name)
+        if folder is None:
+            folder = os.path.join(self.folder_path, name)
+            os.makedirs(folder, exist_ok=True)
+            self.folders[name] = folder
+        return folder
+
+    def get_file_full_path(self, round_index, well_number, extension=".jpg"):
+        if self.layout == LAYOUT_ROUND:
+            return os.path.join(self.get_folder(self.get_round_name(round_index)),
+                                self.get_well_name(well_number) + extension)
+        if self.layout == LAYOUT_WELL:
+            return os.path.join(self.get_folder(self.get_well_name(well_number)),
+                                self.get_round_name(round_index) + extension)
+        return get_file_full_path(self.folder_path, well_number, total_wells=self.total_wells, extension=extension)
+
+    def get_pattern(self):
+        # Path of a file relative to the experiment folder, as a str.format pattern
+        well = f"well_{{well:0{self.well_digits}d}}"
+        round_name = f"round_{{round:0{self.round_digits}d}}"
+        if self.layout == LAYOUT_ROUND:
+            return f"{round_name}/{well}{{extension}}"
+        if self.layout == LAYOUT_WELL:
+            return f"{well}/{round_name}{{extension}}"
+        return f"{well}_{{timestamp}}_{{extension}}"
+
+    def write_manifest(self, **info):
+        """
+        Writes manifest.json: layout, path pattern, padding, well/round counts and any extra
+        info (mode, CSV file, ...). Written once at the start, and again by finish().
+        """
+        manifest = {
+            "layout": self.layout,
+            "pattern": self.get_pattern(),
+            "first_round": 1,
+            "well_digits": self.well_digits,
+            "round_digits": self.round_digits,
+            "total_wells": self.total_wells,
+            "num_rounds": self.num_rounds,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        manifest.update(info)
+        self.manifest = manifest
+        self.save_manifest()
+
+    def save_manifest(self):
+        # Write to a temporary file first, so readers never see half a file
+        manifest_path = os.path.join(self.folder_path, MANIFEST_FILENAME)
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def finish(self, rounds_completed):
+        # Adds how many rounds were actually taken to the manifest
+        if self.manifest is None:
+            return
+        self.manifest["rounds_completed"] = rounds_completed
+        self.manifest["finished"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.save_manifest()
+
+
+# Define function to read an experiment folder's manifest.json (None if it has none, e.g. older experiments)
+def load_manifest(folder_path):
+    try:
+        with open(os.path.join(folder_path, MANIFEST_FILENAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
 # ==== TEST CODE ====
 
 def main():
@@ -1,21 +1,49 @@
 """
 Module that sets up 3D Printer with Serial connection and sends GCode
+
+Notes:
+-The serial port is opened by connect(), not on import, so modules that only need
+ the path/GCode helpers can import this without a printer plugged in.
+ pyserial, pandas and yaml are imported when first needed.
+
+-initial_setup() waits until the firmware answers (wait_until_ready) instead of sleeping
+ REBOOT_WAIT_TIME. connect(no_reset=True) opens the port with DTR/RTS low, so boards
+ that reset on DTR don't reboot at all (set open_without_reset in connection_settings.yaml).
+-If C.RELIABLE_GCODE is on, initial_setup() switches run_gcode to numbered, checksummed
+ lines that wait for "ok" (module_gcode_transport.py). Replies like the M114 position
+ are kept and returned by get_serial_data()/get_serial_data2() as before.
+-initial_setup() skips homing if the printer is still homed from the last session
+ (see module_printer_session.py), force_home=True always homes. Skipping still sends
+ G28 O, which Marlin ignores when it is homed.
+-Without the reliable transport, writes and reads on the serial port are done under
+ serial_lock, so a command from the GUI's command worker and one from another thread
+ don't interleave their bytes (the transport has its own lock).
+
+Changelog:
+18 Oct 2026: Added serial_lock around plain (non-transport) serial writes and reads.
+18 Oct 2026: home_if_needed() sends G28 O when it skips homing.
+18 Oct 2026: Added run_gcode_list() (streams with ADVANCED_OK).
+18 Oct 2026: Added reliable G-code mode (enable_reliable_transport, line numbers/checksums/resends).
+18 Oct 2026: Added wait_until_ready() (boot banner + M110/M105 probe) and connect(no_reset=...).
+18 Oct 2026: Added query_position() (M114) and home_if_needed(), saved homed state skips G28 on restart.
+18 Oct 2026: Added connect()/disconnect(), no longer opens the serial port on import.
 """
 
 # import libraries
-# camera, serial, time, yaml
+# camera, serial, time, yaml (serial, pandas and yaml are imported where they are used)
 import os
-import pandas as pd
 # from picamera2 import Picamera2  # Uncomment if camera is needed
-import serial
+import threading
 import time
-import yaml
 
+from collections import deque
 from datetime import datetime
 
 # Import module that loads up 3D Printer settings and such
 # Note: Bring over YAML files for 3D Printer Settings, and Path List
 import settings as C
+import module_gcode_transport as GT
+import module_printer_session as SES
 
 # Setup camera and printer
 # Create printer/camera variables
@@ -27,13 +55,225 @@ import settings as C
 # MHT: 270
 # Cell Sensor, at home, 90
 
-printer = serial.Serial(C.DEVICE_PATH, baudrate=C.BAUDRATE, timeout=C.TIMEOUT_TIME)
+# Serial connection to the printer, None until connect() is called
+printer = None
+
+# Seconds of no startup messages before the ready probe is sent
+PROBE_QUIET_TIME = 0.3
+
+# GcodeTransport when the reliable G-code mode is on (None: plain writes)
+transport = None
+# Held while writing/reading the port without the transport (reentrant: run_gcode_list calls run_gcode)
+serial_lock = threading.RLock()
+# Replies collected by the transport, handed out by get_serial_data() (only the last ones are kept)
+received_lines = deque(maxlen=100)
+
+# USB serial number of the connected printer (session file key), and the session file
+device_serial = None
+session = None
+
+
+# Define connect() function, opens the serial connection to the 3D printer (once)
+# no_reset=True keeps DTR/RTS low when opening, which stops most boards from rebooting
+# (boards with a different reset circuit, or the OS raising DTR on open, may still reset)
+def connect(device_path=None, baudrate=None, timeout=None, no_reset=None):
+    global printer, device_serial
+    import serial
+    
+    if printer is not None and printer.is_open:
+        return printer
+    if device_path is None:
+        device_path = C.DEVICE_PATH
+    if baudrate is None:
+        baudrate = C.BAUDRATE
+    if timeout is None:
+        timeout = C.TIMEOUT_TIME
+    if no_reset is None:
+        no_reset = C.OPEN_WITHOUT_RESET
+    if no_reset:
+        # Set the control lines before opening, pyserial applies them as the port opens
+        printer = serial.Serial(baudrate=baudrate, timeout=timeout, dsrdtr=False, rtscts=False)
+        printer.port = device_path
+        printer.dtr = False
+        printer.rts = False
+        printer.open()
+    else:
+        printer = serial.Serial(device_path, baudrate=baudrate, timeout=timeout)
+    device_serial = SES.get_device_serial(device_path)
+    return printer
+
+
+# Define disconnect() function, closes the serial connection if it is open
+# Saves where the printer is, so the next session can tell if it is still homed
+def disconnect(save_position=True):
+    global printer, transport
+    if printer is not None:
+        if save_position and printer.is_open:
+            try:
+                position = query_position()
+            except Exception as e:
+                print(f"Could not get position before closing: {e}")
+                position = None
+            if position is not None:
+                get_session().set_position(device_serial, position)
+            else:
+                get_session().clear(device_serial)
+        if transport is not None:
+            print(GT.format_stats(transport.get_stats()))
+        printer.close()
+    printer = None
+    transport = None
+
+
+# Define function to hand out (and forget) the replies the transport collected
+def get_received_lines():
+    output = "\n".join(received_lines)
+    received_lines.clear()
+    return output
+
+
+# Define function to get the printer session file (homed state of each printer)
+def get_session():
+    global session
+    if session is None:
+        session = SES.PrinterSession(C.PRINTER_SESSION_FILE)
+    return session
+
+
+# Define function to ask the printer where it is (M114)
+# Returns {"X": x, "Y": y, "Z": z}, or None if it didn't answer within timeout seconds
+def query_position(timeout=2):
+    if transport is not None:
+        # The transport waits for the "ok" and hands back the lines before it
+        lines = transport.send("M114", timeout=timeout)
+        position = get_position_from_lines(lines)
+        if position is None:
+            print(f"No position from M114, got: {lines!r}")
+        return position
+
+    text = ""
+    with serial_lock:
+        # Nobody else writes until the reply is read
+        run_gcode("M114")
+        end_time = time.monotonic() + timeout
+        while time.monotonic() < end_time:
+            line = printer.readline().decode("utf-8", errors="replace")
+            text += line
+            position = get_position_from_lines([line])
+            if position is not None:
+                return position
+    print(f"No position from M114, got: {text!r}")
+    return None
+
+
+# Define function to find the M114 position in reply lines, returns {"X", "Y", "Z"} or None
+def get_position_from_lines(lines):
+    import get_current_location_m114 as GCL
+
+    for line in lines:
+        # "X:0.00 Y:200.00 Z:50.00 E:0.00 Count X:0 Y:16000 Z:20000", the part before Count is in mm
+        reported = line.split("Count")[0]
+        if GCL.does_location_exist_m114(reported):
+            position, is_location_found = GCL.parse_m114(reported)
+            return {axis: float(position[axis]) for axis in ("X", "Y", "Z")}
+    return None
+
+
+# Define function to switch run_gcode to numbered, checksummed lines (call once the printer is ready)
+def enable_reliable_transport():
+    global transport
+    transport = GT.GcodeTransport(printer, ack_timeout=C.GCODE_ACK_TIMEOUT)
+    transport.reset_line_number()
+    print("Reliable G-code mode on (line numbers, checksums, resends)")
+    return transport
+
+
+# Define function to wait until the firmware answers, instead of sleeping a fixed time after opening the port
+# Reads the boot banner if the board rebooted, then probes with M110/M105 until an "ok" comes back.
+# Returns True if the printer rebooted (it forgot it was homed). Raises TimeoutError.
+def wait_until_ready(timeout=None, first_probe_delay=None, probe_interval=None):
+    if timeout is None:
+        timeout = C.READY_TIMEOUT
+    if first_probe_delay is None:
+        first_probe_delay = C.READY_FIRST_PROBE_DELAY
+    if probe_interval is None:
+        probe_interval = C.READY_PROBE_INTERVAL
+    
+    did_reboot = False
+    is_probing = False
+    start_time = time.monotonic()
+    # Don't send anything while a bootloader may be listening, wait for the banner or for a quiet port
+    next_probe_time = start_time + first_probe_delay
+    # Short reads so a probe goes out on time
+    old_timeout = printer.timeout
+    printer.timeout = 0.1
+    try:
+        while time.monotonic() - start_time < timeout:
+            line = printer.readline().decode("utf-8", errors="replace").strip()
+            now = time.monotonic()
+            if line:
+                if is_probing and line.startswith("ok"):
+                    print(f"Printer ready after {now - start_time:.1f} seconds" + (" (rebooted)" if did_reboot else ""))
+                    return did_reboot
+                if SES.is_boot_banner(line):
+                    # Firmware is running (past the bootloader), no need to wait for first_probe_delay
+                    did_reboot = True
+                    next_probe_time = now + PROBE_QUIET_TIME
+                elif not is_probing:
+                    # Firmware is still printing its startup messages, probe once it goes quiet
+                    next_probe_time = max(next_probe_time, now + PROBE_QUIET_TIME)
+            if now >= next_probe_time:
+                # M110 resets the line number, M105 (temperatures) is answered by any Marlin state
+                if not is_probing:
+                    run_gcode("M110 N0")
+                run_gcode("M105")
+                is_probing = True
+                next_probe_time = now + probe_interval
+    finally:
+        printer.timeout = old_timeout
+    raise TimeoutError(f"Printer on {printer.port} did not answer M110/M105 within {timeout} seconds. "
+                       f"Check the cable, the power supply and the baudrate ({printer.baudrate}).")
+
+
+# Define function to home the printer, unless the saved session shows it is still homed
+# Returns True if it homed
+def home_if_needed(force_home=False, did_reboot=False):
+    printer_session = get_session()
+    if not force_home:
+        position = query_position()
+        can_skip, reason = printer_session.can_skip_homing(device_serial, position, did_reboot)
+        if can_skip:
+            print(f"Skipping homing: {reason}")
+            # Lets the firmware home anyway if it knows it isn't homed
+            run_gcode(SES.HOME_IF_NEEDED_GCODE)
+            return False
+        print(f"Homing: {reason}")
+    
+    # Forget the old homed state until homing is done
+    printer_session.clear(device_serial)
+    go_home()
+    time.sleep(C.REBOOT_WAIT_TIME)
+    position = query_position()
+    if position is not None:
+        printer_session.set_homed(device_serial, position)
+    return True
 
 
 # User Defined Functions
 
+# Define start_session() function: wait for the firmware, turn on reliable G-code, home if needed
+# Call after connect()
+def start_session(force_home=False):
+    did_reboot = wait_until_ready()
+    if C.RELIABLE_GCODE:
+        enable_reliable_transport()
+    print("Done Waiting, Moving Extruder and Build Plate to Origin/Home\n")
+    # printer.write(b'G28\n')
+    return home_if_needed(force_home, did_reboot)
+
+
 # Define initial_setup() function for 3D printer
-def initial_setup(path_list):
+def initial_setup(path_list, force_home=False):
     global printer
     FIRST_LOCATION = 0
     X = 0
@@ -52,14 +292,10 @@ def initial_setup(path_list):
     starting_location_x = 0
     starting_location_y = 200
 
-    # Wait for Printer to Finish Rebooting
-    print('Printer is rebooting...\n')
-    print("Waiting for", C.REBOOT_WAIT_TIME, "seconds")
-    time.sleep(C.REBOOT_WAIT_TIME)
-    print("Done Waiting, Moving Extruder and Build Plate to Origin/Home\n")
-    # printer.write(b'G28\n')
-    go_home()
-    time.sleep(C.REBOOT_WAIT_TIME)
+    # Wait for Printer to Finish Rebooting (if it did)
+    # Opening the port reboots most boards, they print a boot banner (and forget they were homed)
+    print('Waiting for printer to be ready...\n')
+    start_session(force_home)
     # time.sleep(10)
     
     # move_extruder_out_of_the_way(x=starting_location_x, y=starting_location_y, z=starting_location_z)
@@ -106,23 +342,45 @@ def run_gcode(gcode_string):
     global printer
     # Add new line character at the end of the string
     print(gcode_string)
+    if transport is not None:
+        # Numbered/checksummed, returns once the printer sent "ok"
+        received_lines.extend(transport.send(gcode_string))
+        return
     gcode_string = gcode_string + "\n"
 
     # Convert to Binary with UTF-8 encoding for string, write to serial
     # printer.write(bytes(gcode_string, "utf-8"))
-    printer.write(str.encode(gcode_string))
-    printer.flush()  # Ensure command is sent immediately; avoids printer "not responding"
+    with serial_lock:
+        printer.write(str.encode(gcode_string))
+        printer.flush()  # Ensure command is sent immediately; avoids printer "not responding"
 
     # Note: picamera2 preview handling differs from picamera
     # Preview window positioning requires DRM/Qt implementation
 
 
+# Define function to run several GCode strings back to back
+# With the reliable transport they are streamed (several in flight if the firmware has ADVANCED_OK),
+# otherwise they are written one by one with a short delay so the printer's buffer doesn't overflow
+def run_gcode_list(gcode_string_list, delay_seconds=0.15):
+    if transport is None:
+        # Held for the whole list, so e.g. G91 and the move after it stay together
+        with serial_lock:
+            for gcode_string in gcode_string_list:
+                run_gcode(gcode_string)
+                time.sleep(delay_seconds)
+        return
+    for gcode_string in gcode_string_list:
+        print(gcode_string)
+    received_lines.extend(transport.stream(gcode_string_list))
+
+
 # define function go_home() to go to home coordinates
 
 
 # Define function to open YAML paths file, then extracts/returns paths list
 def get_path_list(yaml_file):
     # TODO: Convert this to CSV grabber, then convert to a list.
+    import yaml
     with open(yaml_file) as file:
         path_list = yaml.load(file, Loader=yaml.FullLoader)
         # print(path_list)
@@ -138,6 +396,7 @@ def get_path_list_csv(csv_filename):
 
     # Use Pandas to open up CSV File
     # index_col is 0, meaning no column label for index column
+    import pandas as pd
     dataframe = pd.read_csv(csv_filename, index_col=0, dtype="float")
     # print(dataframe)
 
@@ -319,12 +578,16 @@ def output_serial_data():
 def get_serial_data():
     global printer
     
+    if transport is not None:
+        # Replies were already read by the transport
+        return get_received_lines()
     # output = printer.readline()
-    printer.flush()
-    # Note: .inWaiting() is deprecated in pyserial 3.0+, use .in_waiting instead
-    bytesToRead = printer.in_waiting
-    print("bytesToRead:", bytesToRead)
-    output = printer.read(bytesToRead)
+    with serial_lock:
+        printer.flush()
+        # Note: .inWaiting() is deprecated in pyserial 3.0+, use .in_waiting instead
+        bytesToRead = printer.in_waiting
+        print("bytesToRead:", bytesToRead)
+        output = printer.read(bytesToRead)
     # output = printer.read(512)
     # output = str(output)
     output = output.decode("utf-8")
@@ -334,6 +597,8 @@ def get_serial_data():
 def get_serial_data2():
     global printer
     
+    if transport is not None:
+        return get_received_lines()
     # init default output
     output = ""
     
@@ -347,7 +612,11 @@ def get_serial_data2():
     # while bytesToRead == 0:
         # printer.flush()
         # Note: .inWaiting() is deprecated in pyserial 3.0+, use .in_waiting instead
-        bytesToRead = printer.in_waiting
+        # The lock is only held for the read, not for the sleep
+        with serial_lock:
+            bytesToRead = printer.in_waiting
+            if bytesToRead > 0:
+                output = printer.read(bytesToRead)
         # If no serial data found, start loop again.
         if bytesToRead == 0:
             # if no bytes found, then maybe too many requests.
@@ -357,7 +626,6 @@ def get_serial_data2():
         else:
             # bytesToRead > 0, capture it and break the loop
             print("bytesToRead:", bytesToRead)
-            output = printer.read(bytesToRead)
             # output = printer.read(512)
             # output = str(output)
             output = output.decode("utf-8")
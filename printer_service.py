@@ -1,29 +1,69 @@
 """
 PrinterService: lightweight wrapper around a serial-connected 3D printer.
 Provides basic G-code send and home commands behind a simple API.
+home() skips G28 if the printer is still homed from the last session (see module_printer_session.py).
 """
 import serial
 import time
 
+import module_printer_session as SES
 from utils import sleep_with_stop
 
 
 class PrinterService:
-    def __init__(self, device_path: str, baudrate: int, timeout: float, reboot_wait: float = 5):
+    def __init__(self, device_path: str, baudrate: int, timeout: float, reboot_wait: float = 5,
+                 session_file: str = None):
         self.device_path = device_path
         self.baudrate = baudrate
         self.timeout = timeout
         self.reboot_wait = reboot_wait
         self.printer = serial.Serial(device_path, baudrate=baudrate, timeout=timeout)
+        self.device_serial = SES.get_device_serial(device_path)
+        self.session = SES.PrinterSession(session_file) if session_file else None
 
-    def home(self):
+    def home(self, force: bool = False) -> bool:
+        """Homes unless the session file shows the printer is still homed. Returns True if it homed."""
+        if self.session is not None and not force:
+            did_reboot = SES.is_boot_banner(self.read_available())
+            can_skip, reason = self.session.can_skip_homing(self.device_serial, self.query_position(), did_reboot)
+            if can_skip:
+                print(f"Skipping homing: {reason}")
+                # Lets the firmware home anyway if it knows it isn't homed
+                self.run_gcode(SES.HOME_IF_NEEDED_GCODE)
+                return False
+            print(f"Homing: {reason}")
+        if self.session is not None:
+            self.session.clear(self.device_serial)
         self.run_gcode("G28")
         time.sleep(self.reboot_wait)
+        if self.session is not None:
+            position = self.query_position()
+            if position is not None:
+                self.session.set_homed(self.device_serial, position)
+        return True
 
     def run_gcode(self, gcode: str):
         cmd = (gcode + "\n").encode("utf-8")
         self.printer.write(cmd)
 
+    def read_available(self) -> str:
+        return self.printer.read(self.printer.in_waiting).decode("utf-8", errors="replace")
+
+    def query_position(self, timeout: float = 2):
+        """Returns {"X", "Y", "Z"} from M114, or None if the printer didn't answer in time."""
+        import get_current_location_m114 as GCL
+
+        self.run_gcode("M114")
+        end_time = time.monotonic() + timeout
+        while time.monotonic() < end_time:
+            line = self.printer.readline().decode("utf-8", errors="replace")
+            # The part before "Count" is in mm
+            reported = line.split("Count")[0]
+            if GCL.does_location_exist_m114(reported):
+                position, is_location_found = GCL.parse_m114(reported)
+                return {axis: float(position[axis]) for axis in ("X", "Y", "Z")}
+        return None
+
     def run_path(self, gcode_list, dwell_seconds: float, stop_event):
         for g in gcode_list:
             if stop_event.is_set():
@@ -32,4 +72,11 @@ class PrinterService:
             sleep_with_stop(dwell_seconds, stop_event)
 
     def close(self):
+        # Save where the printer is, so the next session can skip homing
+        if self.session is not None:
+            position = self.query_position()
+            if position is not None:
+                self.session.set_position(self.device_serial, position)
+            else:
+                self.session.clear(self.device_serial)
         self.printer.close()
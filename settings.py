@@ -2,40 +2,92 @@
 Load Settings YAML files for 3dprinter_start_experiment
 
 Purpose: Replaces Common Python file, allows for future GUI usage where the YAML files can be edited and reloaded
+
+Notes:
+-The printer profile (DEVICE_PATH, BAUDRATE, X_MAX, MAX_SPEED, ...) is read from
+ connection_settings.yaml the first time one of those constants is used, not on import.
+ Tools that only use the other constants (dwell times, file names, GCode strings) never
+ read the YAML file. Call load_settings() to load (or reload) it explicitly.
+-The YAML file is parsed once into a ProfileRegistry (module_printer_profiles.py).
+ The profile is picked by --profile NAME, the PRINTER_PROFILE environment variable,
+ or PROJECT below, and can be switched at run time with select_profile().
+ PROFILE is the selected PrinterProfile (with derived values like ramp_distance).
+-reload_if_changed() re-reads the YAML file only if it was modified.
+
+Changelog:
+18 Oct 2026: reload_if_changed() keeps the open connection's settings (reconnect with select_profile()).
+18 Oct 2026: Added TIMELAPSE_AT_END, TIMELAPSE_SIZE, TIMELAPSE_FPS and TIMELAPSE_TIMESTAMP.
+18 Oct 2026: Added MONTAGES, MONTAGE_TILE_PX, MONTAGE_ROWS and MONTAGE_COLS.
+18 Oct 2026: Added THUMBNAILS.
+18 Oct 2026: Added PICTURE_FORMAT, JPEG_QUALITY and PNG_COMPRESS_LEVEL (FILENAME_PICTURE_EXTENSION follows PICTURE_FORMAT).
+18 Oct 2026: Added WELL_STACKS, WELL_STACK_SCALES and WELL_STACK_CHUNK_ROUNDS.
+18 Oct 2026: Added ARCHIVE_ROUNDS, ARCHIVE_FORMAT, ARCHIVE_DELETE_LOOSE and ARCHIVE_MAX_MB_PER_SEC.
+18 Oct 2026: Added OUTPUT_LAYOUT.
+18 Oct 2026: Added PREFLIGHT_STOP_ON_NO_GO.
+18 Oct 2026: Added USE_STAGING, STAGING_FOLDER, STAGING_QUOTA_MB and STAGING_VERIFY.
+18 Oct 2026: Added INDEX_ACTUAL_POSITION (experiment index).
+18 Oct 2026: Added RELIABLE_GCODE and GCODE_ACK_TIMEOUT.
+18 Oct 2026: Added READY_* timing and OPEN_WITHOUT_RESET (printer ready check instead of a fixed reboot wait).
+18 Oct 2026: Added PRINTER_SESSION_FILE (saved homed state, lets restarts skip homing).
+18 Oct 2026: Profiles come from a ProfileRegistry, picked by name (CLI/env/GUI), with hot reload.
+18 Oct 2026: Printer profile is loaded on first use (module __getattr__) instead of on import.
 """
+import os
 
-# Import libraries, yaml
-import yaml
 # Create Constants Variables, like in Common file
 
 # Load YAML files, store into constants
 # Load YAML Settings
 
-# Placeholder Constants
+# Placeholder Constants, replaced by the printer profile in connection_settings.yaml (see load_settings)
 # Monoprice Maker Select 3D Printer V2, Lab 3D Printer
-DEVICE_PATH = '/dev/ttyUSB0'
-BAUDRATE = 250000     # 115200: for Marlin Firmware
-TIMEOUT_TIME = 1      # Wait 1 second
-REBOOT_WAIT_TIME = 5  # 5 seconds
-
-# Maximum Values
-X_MAX = 200; Y_MAX = 200; Z_MAX = 175
-MAX_SPEED = 300  # In mm/sec, max speed of extruder in X/Y direction
+PROFILE_DEFAULTS = {
+    "DEVICE_PATH": '/dev/ttyUSB0',
+    "BAUDRATE": 250000,       # 115200: for Marlin Firmware
+    "TIMEOUT_TIME": 1,        # Wait 1 second
+    "REBOOT_WAIT_TIME": 5,    # 5 seconds
+    # Maximum Values
+    "X_MAX": 200,
+    "Y_MAX": 200,
+    "Z_MAX": 175,
+    "MAX_SPEED": 300,         # In mm/sec, max speed of extruder in X/Y direction
+    "ACCELERATION": 500,      # In mm/sec^2, used to estimate move times
+    "CAMERA_ROTATION_ANGLE": 180,
+    "OPEN_WITHOUT_RESET": False,  # Open the port with DTR/RTS low, so the board doesn't reboot
+}
 
 # Preview/Picture/Video Flags
 isPreviewModeOn = False
 isVideoCaptureModeOn = False
 isPictureCaptureModeOn = True
 
-# Camera Rotation
-CAMERA_ROTATION_ANGLE = 180
+# Dwell Times (in seconds), how long to wait at a well before taking a sample
+# The first well waits longer since the extruder may travel across the whole bed to get there
+FIRST_WELL_DWELL_TIME = 10
+WELL_DWELL_TIME = 4
 
 # File and Folder Names
 # TODO: Put in a settings file?
 FOLDERNAME_PREFIX = "Code"
 FILENAME_PREFIX = "well"
 FILENAME_VIDEO_EXTENSION = ".h264"
-FILENAME_PICTURE_EXTENSION = ".jpg"
+# Picture format (module_image_format): "jpeg", "png", "webp" (lossless) or "npy" (raw RGB array)
+PICTURE_FORMAT = "jpeg"
+JPEG_QUALITY = 90             # 1-100
+PNG_COMPRESS_LEVEL = 1        # 0 (no compression, fastest) to 9 (smallest, slowest)
+PICTURE_EXTENSIONS = {"jpeg": ".jpg", "png": ".png", "webp": ".webp", "npy": ".npy"}
+FILENAME_PICTURE_EXTENSION = PICTURE_EXTENSIONS[PICTURE_FORMAT]
+# Output layout of an experiment folder (prepare_experiment.OutputLayout):
+# "round": round_0001/well_037.jpg, "well": well_037/round_0001.jpg, "flat": all files in one folder
+OUTPUT_LAYOUT = "round"
+
+# Video Clips (one clip per well in Video mode, hardware H.264 encoder)
+VIDEO_CLIP_TIME = 10          # Clip length in seconds
+VIDEO_WIDTH = 1920
+VIDEO_HEIGHT = 1080
+VIDEO_FRAMERATE = 30
+VIDEO_BITRATE = 10000000      # In bits/sec (10 Mbps)
+VIDEO_CONTAINER = ".mp4"      # ".mp4" (remuxed with ffmpeg) or ".h264" (raw stream)
 
 # RPi Path
 FOLDERPATH = "/home/pi/"
@@ -50,37 +102,180 @@ ABSOLUTE_POS = "G90"
 RELATIVE_POS = "G91"
 
 # Which Project? Will influence which settings are loaded
+# Default profile, overridden by --profile NAME or the PRINTER_PROFILE environment variable
 # PROJECT = "mht"
 PROJECT = "mht"
 
+# YAML file with the printer profiles
+SETTINGS_FILE = "connection_settings.yaml"
+
+# Printer ready check after opening the port (in seconds), see printer_connection.wait_until_ready
+READY_TIMEOUT = 30            # Give up (TimeoutError) if the firmware hasn't answered by then
+READY_FIRST_PROBE_DELAY = 2   # Wait this long for a boot banner before probing (bootloader is listening)
+READY_PROBE_INTERVAL = 1      # Resend M105 this often until "ok"
+
+# Reliable G-code mode: line numbers, checksums and resends, each command waits for "ok"
+RELIABLE_GCODE = True
+GCODE_ACK_TIMEOUT = 60        # Seconds without "ok" (or "busy") before giving up
+
+# Experiment index (SQLite): also ask the printer where it is (M114) for every capture
+INDEX_ACTUAL_POSITION = True
+
+# Staging: captures are written to a fast local folder (tmpfs, in RAM) first and moved
+# to the save folder in the background, so a slow USB disk doesn't slow down capturing
+USE_STAGING = True
+STAGING_FOLDER = "/dev/shm/3dprinter_staging"
+STAGING_QUOTA_MB = 512        # Capturing waits for the mover when this much is waiting to be moved
+STAGING_VERIFY = "sha256"     # "sha256" (read back and checksum) or "size"
+
+# Round archives (module_round_archiver): pack each finished round of pictures into one
+# uncompressed archive in the background, for fast copying off the Pi
+ARCHIVE_ROUNDS = False
+ARCHIVE_FORMAT = "tar"        # "tar" or "zip" (stored, not compressed)
+ARCHIVE_DELETE_LOOSE = True   # Delete the loose pictures once the archive is verified
+ARCHIVE_MAX_MB_PER_SEC = 20   # Packing speed limit, so it doesn't compete with capturing
+
+# Thumbnails (module_thumbnails): a 1024 px preview and a 256 px thumbnail of every picture,
+# made in the background, in <experiment>/previews and <experiment>/thumbs
+THUMBNAILS = True
+
+# Round contact sheets (module_plate_montage): every well's picture of a round, small, in
+# plate layout, saved in <experiment>/montages/round_0001.jpg at the end of the round
+MONTAGES = True
+MONTAGE_TILE_PX = 256         # Longest side of one well's tile
+# Plate layout; None guesses it from the snake path in the CSV (where the path turns)
+MONTAGE_ROWS = None
+MONTAGE_COLS = None
+
+# Time-lapse videos (module_timelapse): one video per well in <experiment>/timelapse, made
+# when the experiment ends (or any time later with python3 module_timelapse.py <folder>)
+TIMELAPSE_AT_END = False
+TIMELAPSE_SIZE = 1024         # Longest side in pixels (1024/256 or less reuse previews/thumbs), None for full size
+TIMELAPSE_FPS = 10            # Rounds per second of video
+TIMELAPSE_TIMESTAMP = True    # Write the well, round and capture time on every frame
+
+# Well stacks (module_well_stacks): every picture is also decoded (downscaled) and appended
+# to a per-well time-lapse stack in <experiment>/stacks, for analysis without reopening JPEGs
+WELL_STACKS = False
+WELL_STACK_SCALES = [4]       # 1 = full resolution, 4 = 1/4 width and height; several make several stacks
+WELL_STACK_CHUNK_ROUNDS = 64  # Frames per chunk file
+
+# Disk check before an experiment (module_disk_preflight): don't start if space or write speed is short
+PREFLIGHT_STOP_ON_NO_GO = True
+
+# Homed state and last position of each printer, so restarts can skip homing
+PRINTER_SESSION_FILE = os.path.join(os.path.expanduser("~"), ".3dprinter_session.json")
+
+# ProfileRegistry for SETTINGS_FILE, created on first use
+_registry = None
+
+
+def get_registry(settings_file=SETTINGS_FILE):
+    # Parse the YAML file once, reuse it afterwards
+    global _registry
+    if _registry is None or _registry.settings_file != settings_file:
+        import module_printer_profiles as PP
+        _registry = PP.ProfileRegistry(settings_file)
+    return _registry
+
+
+def get_profile_names():
+    return get_registry().get_names()
+
+
+def apply_profile(profile):
+    # Set the profile constants on this module, so C.X_MAX etc. keep working
+    globals().update({
+        "PROFILE": profile,
+        "DEVICE_PATH": profile.device_path,
+        "BAUDRATE": profile.baudrate,
+        "TIMEOUT_TIME": profile.timeout_time,
+        "REBOOT_WAIT_TIME": profile.reboot_wait_time,
+        "X_MAX": profile.x_max,
+        "Y_MAX": profile.y_max,
+        "Z_MAX": profile.z_max,
+        "MAX_SPEED": profile.max_speed,
+        "ACCELERATION": profile.acceleration,
+        "CAMERA_ROTATION_ANGLE": profile.camera_rotation,
+        "OPEN_WITHOUT_RESET": profile.open_without_reset,
+    })
+
+
 # Load YAML Settings
-with open("connection_settings.yaml") as file:
-    # The fullloader parameter handles the conversion from YAML
-    # scalar values to Python the dictionary format
-    connection_settings_dict = yaml.load(file, Loader=yaml.FullLoader)
-    PRINTER_TYPES = {
-    "cell_sensor": "monoprice",
-    "mht": "monoprice",
-    "FlyCamV2": "Creality",
-    }
-    printer_key = PRINTER_TYPES.get(PROJECT, "monoprice")
-    profile = connection_settings_dict[PROJECT][printer_key]
-    # How to access dict items
-    # print(connection_settings_dict["cell_sensor"]["monoprice"]["device_path"])
-    DEVICE_PATH = profile["device_path"]
-    BAUDRATE = profile["baudrate"]
-    TIMEOUT_TIME = profile["timeout_time"]
-    REBOOT_WAIT_TIME = profile["reboot_wait_time"]
-    X_MAX = profile["max"]["x"]
-    Y_MAX = profile["max"]["y"]
-    Z_MAX = profile["max"]["z"]
-    MAX_SPEED = profile["max"]["speed"]
-    CAMERA_ROTATION_ANGLE = profile["camera_rotation"]
-    print("Loaded Settings for:", profile["name"])
-    print("Project:", PROJECT)
-    # print("CAMERA_ROTATION_ANGLE", CAMERA_ROTATION_ANGLE)
-
-# User Defined function that can change Constants by having user load up a YAML file and choosing a different 3D printer
-# TODO: Later feature
+def load_settings(settings_file=SETTINGS_FILE, project=None):
+    """
+    Selects the printer profile (project name or "project/printer") from the YAML file
+    and sets the profile constants (DEVICE_PATH, BAUDRATE, X_MAX, ...) on this module.
+    If project is None: --profile NAME, PRINTER_PROFILE or PROJECT.
+    """
+    import sys
+    import module_printer_profiles as PP
+
+    if project is None:
+        project = PP.get_selected_profile_name(PROJECT, sys.argv[1:])
+    profile = get_registry(settings_file).get(project)
+    apply_profile(profile)
+    print("Loaded Settings for:", profile.name)
+    print("Project:", profile.key)
+    return profile
+
+
+def select_profile(name):
+    """Switches to another profile at run time. Returns the new PrinterProfile."""
+    return load_settings(project=name)
+
+
+# Profile fields of the open serial connection, a reload can't change them without reconnecting
+CONNECTION_FIELDS = ("device_path", "baudrate", "timeout_time", "open_without_reset")
+
+
+def reload_if_changed():
+    """
+    Re-reads the YAML file if it was modified (only an os.stat() call otherwise) and
+    re-applies the selected profile. Returns True if the profile constants were updated
+    or the connection settings changed.
+    Connection fields (CONNECTION_FIELDS) keep their current values, so DEVICE_PATH and
+    BAUDRATE still describe the open port; has_connection_changed() is True until the
+    caller reconnects with select_profile().
+    """
+    if _registry is None or "PROFILE" not in globals():
+        return False
+    if not _registry.reload_if_changed():
+        return False
+    try:
+        profile = _registry.get(PROFILE.key)
+    except KeyError as e:
+        print(f"Keeping profile {PROFILE.key}: {e}")
+        return False
+    changed_fields = [name for name in CONNECTION_FIELDS if getattr(profile, name) != getattr(PROFILE, name)]
+    if changed_fields:
+        import dataclasses
+        print(f"Connection settings changed ({', '.join(changed_fields)}), still using the open connection")
+        profile = dataclasses.replace(profile, **{name: getattr(PROFILE, name) for name in CONNECTION_FIELDS})
+    if profile == PROFILE:
+        return bool(changed_fields)
+    apply_profile(profile)
+    print("Reloaded Settings for:", profile.name)
+    return True
+
+
+def has_connection_changed():
+    # True if the YAML file has other connection settings than the open connection (see reload_if_changed)
+    if _registry is None or "PROFILE" not in globals():
+        return False
+    try:
+        profile = _registry.get(PROFILE.key)
+    except KeyError:
+        return False
+    return any(getattr(profile, name) != getattr(PROFILE, name) for name in CONNECTION_FIELDS)
+
+
+def __getattr__(name):
+    # Only called for names that aren't set yet: load the printer profile on first use
+    if name in PROFILE_DEFAULTS or name == "PROFILE":
+        load_settings()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # TODO: Research project structure for GUI and Settings file
 